@@ -54,6 +54,9 @@ class Settings(BaseSettings):
     # Payments
     PAYMENTS_PROVIDER: str = "stub"
     PAYMENTS_REPO: str = "firestore"
+    # Repeat checkouts for the same uid/kind/scope/course/tier within this window
+    # return the pending intent's payment link instead of a new one (0 disables)
+    CHECKOUT_REUSE_WINDOW_SECONDS: int = 900
 
     # PayPlus
     PAYPLUS_ENV: str = "sandbox"                          # "sandbox" | "prod"
@@ -64,8 +67,17 @@ class Settings(BaseSettings):
     PAYPLUS_PAYMENT_PAGE_UID_SUBSCRIPTION: str = ""
     PAYPLUS_WEBHOOK_VERIFY_MODE: str = "enforce"          # "enforce" | "log_only"
     PAYPLUS_TIMEOUT_SECONDS: int = 15
+    PAYPLUS_MAX_CONNECTIONS: int = 20                     # pooled keep-alive connections per process
+    PAYPLUS_HTTP2: bool = False                           # requires the h2 package (httpx[http2])
     PUBLIC_WEBHOOK_BASE_URL: str = "http://localhost:8080"
     WEBHOOK_RATE_LIMIT_ENABLED: bool = True
+
+    # Webhook processing: "sync" (handled in the request) | "async" (verify, store, ack; worker processes)
+    WEBHOOK_PROCESSING_MODE: str = "sync"
+    WEBHOOK_WORKER_CONCURRENCY: int = 4
+    WEBHOOK_MAX_ATTEMPTS: int = 6
+    WEBHOOK_RETRY_BASE_SECONDS: float = 5.0
+    WEBHOOK_REPLAY_CONCURRENCY: int = 4       # admin bulk replay: events in flight
     
     # Phase 6.2A Additions
     PAYPLUS_CAPTURE_WEBHOOK_PAYLOADS: bool = True
@@ -75,9 +87,43 @@ class Settings(BaseSettings):
         "last_name", "card", "cc", "pan", "cvv", "exp", "address"
     ]
 
+    # Sessions: "firestore" (session docs) | "signed" (stateless HMAC cookies + revocation set)
+    SESSION_MODE: str = "firestore"
+    SESSION_SIGNING_SECRET: str = ""
+    SESSION_REVOCATION_REFRESH_SECONDS: int = 30
+
+    # Session validation cache (per instance)
+    SESSION_CACHE_MAX_ENTRIES: int = 10000
+    SESSION_CACHE_TTL_SECONDS: int = 60
+
     # Dev Seed
     SEED_DEBUG_UID: str = ""
 
+    # Public catalog HTTP caching (Cache-Control max-age; ETag/Last-Modified revalidation)
+    PUBLIC_CATALOG_MAX_AGE_SECONDS: int = 60
+
+    # Catalog replica (in-memory courses/lessons/plans fed by snapshot listeners)
+    CATALOG_REPLICA_ENABLED: bool = False
+
+    # Admin overview counts snapshot (served stale while a background refresh runs)
+    METRICS_OVERVIEW_TTL_SECONDS: int = 60
+
+    # Distinct active-user sketches: local sketches merged into Firestore on this interval
+    ACTIVITY_SKETCH_FLUSH_SECONDS: int = 60
+
+    # Background sink for activity events and admin audit (batched Firestore writes)
+    EVENT_SINK_MAX_BUFFER: int = 10000
+    EVENT_SINK_BATCH_SIZE: int = 200
+    EVENT_SINK_FLUSH_MS: int = 500
+
+    # Rate limiting: "memory" (per instance) | "firestore" (shared counters, leased token batches)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_LEASE_SECONDS: float = 5.0
+
+    # Search index (in-memory; fed by the catalog replica, else reloaded on this interval)
+    SEARCH_INDEX_ENABLED: bool = True
+    SEARCH_INDEX_REFRESH_SECONDS: int = 300
+
     @property
     def is_prod(self) -> bool:
         return self.ENV == "prod"
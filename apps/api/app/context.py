@@ -1,3 +1,8 @@
 from contextvars import ContextVar
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from app.repos.loader import DocumentLoader
 
 request_id_ctx: ContextVar[str] = ContextVar("request_id", default="")
+document_loader_ctx: ContextVar[Optional["DocumentLoader"]] = ContextVar("document_loader", default=None)
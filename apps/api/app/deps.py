@@ -3,6 +3,8 @@ from fastapi import Depends, HTTPException, status, Request
 # removed HTTPBearer
 from app.config import settings
 from app.models import UserContext
+from app.security.session_cache import session_cache
+from app.security import session_tokens
 from google.cloud import firestore
 
 # We no longer use Firebase Auth tokens in the backend.
@@ -11,12 +13,43 @@ from google.cloud import firestore
 # 2. Prod: ironmind_session cookie
 
 def get_db():
-    from app.repos.firestore import get_db as _get_db
-    return _get_db()
+    from app.repos.firestore import get_async_db
+    return get_async_db()
+
+async def _load_firestore_session(db: firestore.AsyncClient, session_id: str) -> dict:
+    """
+    Validate a Firestore-backed session id (cache first, then the sessions doc).
+    """
+    session_data = session_cache.get(session_id)
+    if session_data is not None:
+        return session_data
+
+    session_ref = db.collection("sessions").document(session_id)
+    session_doc = await session_ref.get()
+    
+    if not session_doc.exists:
+        raise HTTPException(status_code=401, detail="Invalid session")
+        
+    session_data = session_doc.to_dict()
+    
+    # Check Expiry
+    # Assuming firestore returns aware datetime
+    from datetime import datetime, timezone
+    now = datetime.now(timezone.utc)
+    expires_at = session_data.get("expiresAt")
+    
+    if expires_at and expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+        
+    if not expires_at or now > expires_at:
+        raise HTTPException(status_code=401, detail="Session expired")
+
+    session_cache.put(session_id, session_data, expires_at)
+    return session_data
 
 async def get_current_user_cookie(
     request: Request, 
-    db: firestore.Client = Depends(get_db)
+    db: firestore.AsyncClient = Depends(get_db)
 ) -> UserContext:
     """
     Validate Session Cookie (Prod) or Debug Header (Dev).
@@ -42,26 +75,16 @@ async def get_current_user_cookie(
             detail="Missing session cookie"
         )
 
-    # 3. Validate Session from Firestore
-    session_ref = db.collection("sessions").document(session_id)
-    session_doc = session_ref.get()
-    
-    if not session_doc.exists:
-        raise HTTPException(status_code=401, detail="Invalid session")
-        
-    session_data = session_doc.to_dict()
-    
-    # Check Expiry
-    # Assuming firestore returns aware datetime
-    from datetime import datetime, timezone
-    now = datetime.now(timezone.utc)
-    expires_at = session_data.get("expiresAt")
-    
-    if expires_at and expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-        
-    if not expires_at or now > expires_at:
-        raise HTTPException(status_code=401, detail="Session expired")
+    # 3. Validate Session
+    if settings.SESSION_MODE == "signed" and session_tokens.is_signed_token(session_id):
+        # Stateless: signature + expiry + in-process revocation set, no Firestore read
+        session_data = session_tokens.verify_token(session_id)
+        if session_data is None:
+            raise HTTPException(status_code=401, detail="Invalid session")
+        if session_data["sid"] in session_tokens.revocations:
+            raise HTTPException(status_code=401, detail="Session revoked")
+    else:
+        session_data = await _load_firestore_session(db, session_id)
         
     uid = session_data.get("uid")
     email = session_data.get("email")
@@ -81,6 +104,19 @@ async def get_current_user_cookie(
 # Alias for compatibility if needed, or we just update imports
 get_current_user = get_current_user_cookie
 
+async def get_optional_user(
+    request: Request,
+    db: firestore.AsyncClient = Depends(get_db)
+) -> Optional[UserContext]:
+    """
+    Like get_current_user, but returns None instead of 401 for anonymous callers
+    (for public endpoints that personalize when signed in).
+    """
+    try:
+        return await get_current_user_cookie(request, db)
+    except HTTPException:
+        return None
+
 def require_admin(user: UserContext = Depends(get_current_user)) -> UserContext:
     """
     Dependency to ensure the user is an admin.
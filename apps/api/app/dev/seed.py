@@ -7,7 +7,7 @@ Uses fixed document IDs for idempotency.
 
 import logging
 from datetime import datetime, timezone
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from app.config import settings
 from app.repos.firestore import get_db
@@ -175,21 +175,6 @@ def seed_demo_data(force: bool = False) -> dict:
         for doc_id, data in _build_plans(course_id, now).items():
             _upsert_doc(db, "plans", doc_id, data, force, created, updated, skipped)
 
-    # ── Optional debug entitlement ──────────────────────────────────
-    debug_uid = getattr(settings, "SEED_DEBUG_UID", "")
-    if debug_uid:
-        try:
-            entitlements.upsert_course_entitlement(
-                uid=debug_uid,
-                course_id="course_demo_one_time",
-                source="seed",
-            )
-            ent_id = f"ent_course_{debug_uid}_course_demo_one_time"
-            created.append(ent_id)
-            logger.info("Seeded debug entitlement", extra={"uid": debug_uid})
-        except Exception as e:
-            logger.warning(f"Failed to seed debug entitlement: {e}")
-
     logger.info(
         "Seed complete",
         extra={
@@ -200,3 +185,27 @@ def seed_demo_data(force: bool = False) -> dict:
     )
 
     return {"created": created, "updated": updated, "skipped": skipped}
+
+
+async def seed_debug_entitlement() -> Optional[str]:
+    """
+    Grant SEED_DEBUG_UID the one-time demo course, if set.
+
+    Goes through the entitlement write path so user_access/{uid} is kept in
+    step. Async, unlike seed_demo_data: call it from the event loop.
+    Returns the entitlement id, or None if not seeded.
+    """
+    debug_uid = getattr(settings, "SEED_DEBUG_UID", "")
+    if not debug_uid:
+        return None
+    try:
+        await entitlements.upsert_course_entitlement(
+            uid=debug_uid,
+            course_id="course_demo_one_time",
+            source="seed",
+        )
+    except Exception as e:
+        logger.warning(f"Failed to seed debug entitlement: {e}")
+        return None
+    logger.info("Seeded debug entitlement", extra={"uid": debug_uid})
+    return f"ent_course_{debug_uid}_course_demo_one_time"
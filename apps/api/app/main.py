@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 import logging
 from contextlib import asynccontextmanager
@@ -9,6 +10,12 @@ from app.config import settings
 from app.logging_config import setup_logging
 from app.routers import health, user, public, auth, checkout, webhooks, admin, access, upload, content, admin_vimeo, admin_payments, admin_activity, payments, admin_webhook_replay
 from app.middleware.request_id import RequestIdMiddleware
+from app.middleware.document_loader import DocumentLoaderMiddleware
+from app.repos import catalog_replica, search_index, activity_sketches
+from app.security import session_tokens
+from app.services.event_sink import event_sink
+from app.payments.worker import webhook_worker
+from app.payments.providers.payplus_client import close_http_clients
 
 # Setup logging first
 setup_logging()
@@ -25,6 +32,8 @@ async def lifespan(app: FastAPI):
         ]
         if settings.VIMEO_VERIFY_ENABLED:
             critical_vars.append(("VIMEO_ACCESS_TOKEN", settings.VIMEO_ACCESS_TOKEN))
+        if settings.SESSION_MODE == "signed":
+            critical_vars.append(("SESSION_SIGNING_SECRET", settings.SESSION_SIGNING_SECRET))
             
         for name, val in critical_vars:
             if not val or val == "http://localhost:8080":
@@ -32,9 +41,60 @@ async def lifespan(app: FastAPI):
                 
         if missing:
             raise RuntimeError(f"Missing critical production secrets: {', '.join(missing)}")
+
+    if settings.CATALOG_REPLICA_ENABLED:
+        try:
+            catalog_replica.start()
+        except Exception as e:
+            # Reads fall back to direct Firestore queries
+            logger.error(f"Catalog replica failed to start: {e}", exc_info=True)
+    
+    search_loader = None
+    if settings.SEARCH_INDEX_ENABLED:
+        # While the replica serves, its listeners keep the index current; if it
+        # failed to start or a listener drops, the loader takes over
+        search_loader = asyncio.create_task(search_index.run_loader(
+            settings.SEARCH_INDEX_REFRESH_SECONDS,
+            skip=catalog_replica.is_serving if settings.CATALOG_REPLICA_ENABLED else None,
+        ))
+
+    event_sink.start()
+    if settings.WEBHOOK_PROCESSING_MODE == "async":
+        webhook_worker.start()
+    sketch_flusher = asyncio.create_task(
+        activity_sketches.run_flusher(settings.ACTIVITY_SKETCH_FLUSH_SECONDS)
+    )
+
+    revocation_refresher = None
+    if settings.SESSION_MODE == "signed":
+        if not settings.SESSION_SIGNING_SECRET:
+            logger.warning("SESSION_SIGNING_SECRET not set: signing sessions with a per-process dev secret")
+        revocation_refresher = asyncio.create_task(
+            session_tokens.run_revocation_refresher(settings.SESSION_REVOCATION_REFRESH_SECONDS)
+        )
     
     yield
 
+    if revocation_refresher is not None:
+        revocation_refresher.cancel()
+        try:
+            await revocation_refresher
+        except asyncio.CancelledError:
+            pass
+    if search_loader is not None:
+        search_loader.cancel()
+        try:
+            await search_loader
+        except asyncio.CancelledError:
+            pass
+    sketch_flusher.cancel()
+    await activity_sketches.flush()
+    await event_sink.stop()
+    await webhook_worker.stop()
+    await close_http_clients()
+    if settings.CATALOG_REPLICA_ENABLED:
+        catalog_replica.stop()
+
 app = FastAPI(
     title="Iron Mind API",
     version=settings.APP_VERSION,
@@ -49,6 +109,7 @@ app = FastAPI(
 
 
 # Custom Middleware
+app.add_middleware(DocumentLoaderMiddleware)
 app.add_middleware(RequestIdMiddleware)
 
 # CORS
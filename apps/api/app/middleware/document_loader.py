@@ -0,0 +1,23 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.context import document_loader_ctx
+from app.repos.loader import DocumentLoader
+
+
+class DocumentLoaderMiddleware:
+    """
+    ASGI Middleware that installs a fresh DocumentLoader for every HTTP request,
+    so document reads within the request are batched and memoized.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        token = document_loader_ctx.set(DocumentLoader())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            document_loader_ctx.reset(token)
@@ -1,4 +1,4 @@
-from typing import List, Optional, Literal
+from typing import Dict, List, Optional, Literal
 from datetime import datetime
 from pydantic import BaseModel, Field
 
@@ -35,6 +35,7 @@ class LessonPublic(BaseModel):
     playbackEndpoint: Optional[str] = None
     orderIndex: int
     published: bool
+    updatedAt: Optional[datetime] = Field(default=None, exclude=True)  # ETag input only, not in public output
 
 class PlanPublic(BaseModel):
     id: str
@@ -46,6 +47,13 @@ class PlanPublic(BaseModel):
     hasPdf: bool = False
     pdfDownloadEndpoint: Optional[str] = None
     published: bool
+    updatedAt: Optional[datetime] = Field(default=None, exclude=True)  # ETag input only, not in public output
+
+class CourseBundle(BaseModel):
+    course: CoursePublic
+    lessons: List[LessonPublic] = []
+    plans: List[PlanPublic] = []
+    hasAccess: Optional[bool] = None       # None when the caller is anonymous
 
 class SearchResult(BaseModel):
     courses: List[CoursePublic] = []
@@ -146,6 +154,13 @@ class MetricsOverview(BaseModel):
     purchases_total: int
     subscriptions_total: int
     entitlements_total: int
+    generatedAt: Optional[datetime] = None     # when the cached counts were taken
+
+class ActiveUsersResponse(BaseModel):
+    date: str
+    dau: int        # HyperLogLog estimates (~1.6% standard error)
+    wau: int
+    mau: int
 
 class Entitlement(BaseModel):
     id: str
@@ -181,6 +196,13 @@ class AdminUserDetailResponse(BaseModel):
 class AccessCheckResponse(BaseModel):
     allowed: bool
 
+class AccessBatchRequest(BaseModel):
+    courseIds: List[str] = Field(..., max_length=100)
+
+class AccessBatchResponse(BaseModel):
+    allowed: Dict[str, bool]         # courseId -> allowed (False for unknown courses)
+    notFound: List[str] = []
+
 class PaymentIntentPublic(BaseModel):
     id: str
     kind: str
@@ -239,6 +261,18 @@ class WebhookReplayRequest(BaseModel):
     headers: dict[str, str] = {}
     force_log_only: bool = True
 
+class WebhookBulkReplayRequest(BaseModel):
+    """Filter over stored payment_events to replay (oldest first)."""
+    provider: str = "payplus"
+    event_type: Optional[str] = None
+    unmapped: Optional[bool] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    limit: int = Field(100, ge=1, le=1000)
+    dry_run: bool = True
+    force_log_only: bool = True
+    concurrency: Optional[int] = Field(None, ge=1, le=32)   # default: WEBHOOK_REPLAY_CONCURRENCY
+
 class WebhookReplayResponse(BaseModel):
     ok: bool
     result: dict
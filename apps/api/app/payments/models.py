@@ -33,10 +33,29 @@ class PaymentIntent(BaseModel):
     status: IntentStatus = "pending"
     provider: str                        # e.g. "stub"
     providerRef: Optional[str] = None    # stable ref returned by provider
+    checkoutUrl: Optional[str] = None    # provider redirect URL, reused by repeat checkouts
     createdAt: datetime = Field(default_factory=_utcnow)
     updatedAt: datetime = Field(default_factory=_utcnow)
 
 
+class IntentRef(BaseModel):
+    """
+    The fields of a PaymentIntent that never change once its providerRef is
+    set: what webhooks need to resolve and plan an event. Deliberately has
+    no status; read the intent itself for that.
+    """
+    id: str
+    uid: str
+    kind: IntentKind
+    scope: IntentScope
+    courseId: Optional[str] = None
+    tier: Optional[str] = None
+    provider: str
+    providerRef: str
+
+    model_config = {"extra": "ignore"}
+
+
 class Subscription(BaseModel):
     """Tracks a recurring subscription."""
     id: str                              # "sub_<uuid>"
@@ -56,3 +75,15 @@ class PaymentEvent(BaseModel):
     type: str                            # canonical event type
     receivedAt: datetime = Field(default_factory=_utcnow)
     payload: dict[str, Any] = Field(default_factory=dict)
+
+
+class StateTransition(BaseModel):
+    """
+    Every write a webhook event applies, committed together with the
+    event's idempotency record.
+    """
+    intentId: str
+    intentPatch: dict[str, Any] = Field(default_factory=dict)
+    subscription: Optional[Subscription] = None
+    entitlementId: Optional[str] = None
+    entitlement: Optional[dict[str, Any]] = None   # fields merged into entitlements/{entitlementId}
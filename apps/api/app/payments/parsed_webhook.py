@@ -0,0 +1,106 @@
+"""
+A webhook body parsed once and shared by the whole pipeline.
+
+handle_webhook() wraps the raw body in a ParsedWebhook and hands it to the
+provider's verify_webhook(), the payload capture and the capture log line.
+The JSON is decoded on first use, and the redacted copy and the
+PayPlus id candidates are computed on first access and then reused.
+"""
+
+import json
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.config import settings
+from app.payments.errors import WebhookPayloadError
+from app.payments.redact import redact_payload
+
+# Where PayPlus has been seen to put each id, in order of preference
+PROVIDER_REF_PATHS = (
+    ("payment_request_uid",),
+    ("page_request_uid",),
+    ("transaction", "payment_request_uid"),
+    ("transaction", "page_request_uid"),
+    ("data", "payment_request_uid"),
+    ("data", "page_request_uid"),
+)
+TRANSACTION_UID_PATHS = (
+    ("transaction", "uid"),
+    ("transaction_uid",),
+    ("transaction", "transaction_uid"),
+    ("data", "transaction", "uid"),
+    ("data", "transaction_uid"),
+)
+SUBSCRIPTION_ID_PATHS = (
+    ("recurring_id",),
+    ("token_uid",),
+    ("token",),
+    ("card_token",),
+    ("transaction", "recurring_id"),
+    ("transaction", "token_uid"),
+    ("transaction", "token"),
+    ("data", "recurring_id"),
+    ("data", "token_uid"),
+)
+
+MAX_CAPTURED_KEYS = 100
+
+
+def pick_first(parsed: dict, paths: Sequence[Sequence[str]]) -> Optional[str]:
+    """
+    Helper to extract the first matching path from a dictionary.
+    Handles nested paths like ["transaction", "uid"].
+    """
+    for path in paths:
+        curr = parsed
+        for key in path:
+            if isinstance(curr, dict) and key in curr:
+                curr = curr[key]
+            else:
+                curr = None
+                break
+        if curr is not None and isinstance(curr, str) and curr.strip():
+            return curr.strip()
+    return None
+
+
+class ParsedWebhook:
+    def __init__(self, raw_body: bytes):
+        self.raw_body = raw_body
+
+    @cached_property
+    def data(self) -> Any:
+        """The decoded JSON body. Raises WebhookPayloadError if it is not valid JSON."""
+        try:
+            return json.loads(self.raw_body.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            raise WebhookPayloadError(f"Invalid webhook JSON: {exc}") from exc
+
+    @cached_property
+    def transaction(self) -> dict:
+        """The `transaction` object, or the body itself when it has none (PayPlus shapes vary)."""
+        data = self.data
+        transaction = data.get("transaction", data) if isinstance(data, dict) else {}
+        return transaction if isinstance(transaction, dict) else {}
+
+    @cached_property
+    def redacted(self) -> Any:
+        return redact_payload(self.data, set(settings.PAYPLUS_PAYLOAD_REDACT_KEYS))
+
+    @cached_property
+    def payload_keys(self) -> List[str]:
+        return list(self.data.keys())[:MAX_CAPTURED_KEYS] if isinstance(self.data, dict) else []
+
+    @cached_property
+    def transaction_keys(self) -> Optional[List[str]]:
+        transaction = self.data.get("transaction") if isinstance(self.data, dict) else None
+        return list(transaction.keys())[:MAX_CAPTURED_KEYS] if isinstance(transaction, dict) else None
+
+    @cached_property
+    def candidates(self) -> Dict[str, Optional[str]]:
+        """PayPlus id candidates, for schema discovery on captured events."""
+        return {
+            "providerRefCandidate": pick_first(self.data, PROVIDER_REF_PATHS),
+            "transactionUidCandidate": pick_first(self.data, TRANSACTION_UID_PATHS),
+            "providerSubscriptionIdCandidate": pick_first(self.data, SUBSCRIPTION_ID_PATHS),
+        }
@@ -3,16 +3,18 @@ Provider interface for payment processing.
 
 All providers must implement PaymentProvider.
 verify_webhook takes raw bytes + headers (framework-agnostic) to support
-real signature verification in Phase 1.
+real signature verification in Phase 1, plus an optional ParsedWebhook so the
+body is parsed once per request.
 """
 
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Mapping, Protocol, runtime_checkable
+from typing import TYPE_CHECKING, Mapping, Optional, Protocol, runtime_checkable
 
 if TYPE_CHECKING:
     from app.payments.models import PaymentIntent
+    from app.payments.parsed_webhook import ParsedWebhook
 
 
 @dataclass(frozen=True)
@@ -41,7 +43,13 @@ class VerifiedWebhook:
 
 @runtime_checkable
 class PaymentProvider(Protocol):
-    """Protocol that every payment provider must implement."""
+    """
+    Protocol that every payment provider must implement.
+
+    Providers may also define create_one_time_checkout_async /
+    create_subscription_checkout_async; the service prefers those over
+    running the blocking methods in the threadpool.
+    """
 
     def create_one_time_checkout(self, intent: PaymentIntent) -> ProviderCheckoutResult:
         ...
@@ -53,5 +61,6 @@ class PaymentProvider(Protocol):
         self,
         raw_body: bytes,
         headers: Mapping[str, str],
+        parsed: Optional[ParsedWebhook] = None,
     ) -> VerifiedWebhook:
         ...
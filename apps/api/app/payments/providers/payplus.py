@@ -8,14 +8,14 @@ Uses PayPlusClient for HTTP transport — no direct httpx calls here.
 import base64
 import hashlib
 import hmac
-import json
 import logging
-from typing import Mapping
+from typing import Mapping, Optional
 
 from app.config import settings
 from app.payments import events
 from app.payments.errors import WebhookPayloadError, WebhookVerificationError
 from app.payments.models import PaymentIntent
+from app.payments.parsed_webhook import ParsedWebhook
 from app.payments.provider import (
     PaymentProvider,
     ProviderCheckoutResult,
@@ -26,12 +26,13 @@ from app.payments.providers.payplus_client import PayPlusClient
 logger = logging.getLogger(__name__)
 
 PROVIDER_NAME = "payplus"
+GENERATE_LINK_PATH = "/api/v1.0/PaymentPages/generateLink"
 
 
 class PayPlusProvider:
     """PayPlus implementation of PaymentProvider."""
 
-    def __init__(self):
+    def __init__(self, verify_mode: Optional[str] = None):
         self.client = PayPlusClient(
             env=settings.PAYPLUS_ENV,
             api_key=settings.PAYPLUS_API_KEY,
@@ -39,7 +40,8 @@ class PayPlusProvider:
             timeout=settings.PAYPLUS_TIMEOUT_SECONDS,
         )
         self.secret_key = settings.PAYPLUS_SECRET_KEY
-        self.verify_mode = settings.PAYPLUS_WEBHOOK_VERIFY_MODE
+        # Per-instance override (admin replays) instead of mutating settings
+        self.verify_mode = verify_mode or settings.PAYPLUS_WEBHOOK_VERIFY_MODE
         self.callback_url = f"{settings.PUBLIC_WEBHOOK_BASE_URL}/webhooks/payments"
 
     # ── Checkout ────────────────────────────────────────────────────
@@ -59,6 +61,25 @@ class PayPlusProvider:
         body["create_token"] = True
         return self._call_generate_link(body)
 
+    async def create_one_time_checkout_async(self, intent: PaymentIntent) -> ProviderCheckoutResult:
+        body = self._build_generate_link_body(
+            payment_page_uid=settings.PAYPLUS_PAYMENT_PAGE_UID_ONE_TIME,
+            intent=intent,
+        )
+        return self._parse_generate_link(
+            await self.client.post_json_async(GENERATE_LINK_PATH, body)
+        )
+
+    async def create_subscription_checkout_async(self, intent: PaymentIntent) -> ProviderCheckoutResult:
+        body = self._build_generate_link_body(
+            payment_page_uid=settings.PAYPLUS_PAYMENT_PAGE_UID_SUBSCRIPTION,
+            intent=intent,
+        )
+        body["create_token"] = True
+        return self._parse_generate_link(
+            await self.client.post_json_async(GENERATE_LINK_PATH, body)
+        )
+
     def _build_generate_link_body(
         self, payment_page_uid: str, intent: PaymentIntent
     ) -> dict:
@@ -76,7 +97,9 @@ class PayPlusProvider:
         return body
 
     def _call_generate_link(self, body: dict) -> ProviderCheckoutResult:
-        resp = self.client.post_json("/api/v1.0/PaymentPages/generateLink", body)
+        return self._parse_generate_link(self.client.post_json(GENERATE_LINK_PATH, body))
+
+    def _parse_generate_link(self, resp: dict) -> ProviderCheckoutResult:
         data = resp.get("data", resp)
 
         payment_page_link = data.get("payment_page_link", "")
@@ -99,15 +122,19 @@ class PayPlusProvider:
         self,
         raw_body: bytes,
         headers: Mapping[str, str],
+        parsed: Optional[ParsedWebhook] = None,
     ) -> VerifiedWebhook:
-        """Parse and verify PayPlus IPN/callback webhook."""
+        """
+        Parse and verify PayPlus IPN/callback webhook.
+        `parsed` lets the caller share one parse of the body with capture/logging.
+        """
 
         # 1. Parse JSON body (explicit UTF-8 decode for correctness)
-        try:
-            text = raw_body.decode("utf-8")
-            data = json.loads(text)
-        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
-            raise WebhookPayloadError(f"Invalid webhook JSON: {exc}") from exc
+        if parsed is None:
+            parsed = ParsedWebhook(raw_body)
+        data = parsed.data
+        if not isinstance(data, dict):
+            raise WebhookPayloadError("Invalid webhook JSON: expected an object")
 
         # 2. Verify signature
         sig_valid = self._verify_signature(raw_body, headers)
@@ -120,7 +147,7 @@ class PayPlusProvider:
             # log_only: already logged in _verify_signature, continue
 
         # 3. Extract required fields
-        transaction = data.get("transaction", data)
+        transaction = parsed.transaction
         payment_request_uid = (
             data.get("payment_request_uid")
             or data.get("page_request_uid")
@@ -182,13 +209,17 @@ class PayPlusProvider:
         }
         
         # DEBUG LOG FOR WEBHOOK CAPTURE (Requested by user)
-        logger.info(
-            "PayPlus Webhook Captured: transaction=%s | token_uid=%s | recurring_id=%s | top_level_keys=%s",
-            json.dumps(transaction),
-            data.get("token_uid") or transaction.get("token_uid"),
-            data.get("recurring_id") or transaction.get("recurring_id"),
-            list(data.keys())
-        )
+        # Logs the redacted transaction shared with payload capture; skipped
+        # entirely (no redaction work) when INFO is off.
+        if logger.isEnabledFor(logging.INFO):
+            redacted = parsed.redacted
+            logger.info(
+                "PayPlus Webhook Captured: transaction=%s | token_uid=%s | recurring_id=%s | top_level_keys=%s",
+                redacted.get("transaction", redacted),
+                data.get("token_uid") or transaction.get("token_uid"),
+                data.get("recurring_id") or transaction.get("recurring_id"),
+                parsed.payload_keys,
+            )
 
         return VerifiedWebhook(
             provider=PROVIDER_NAME,
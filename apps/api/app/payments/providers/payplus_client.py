@@ -4,16 +4,28 @@ PayPlus HTTP client helper.
 Thin httpx-based wrapper for PayPlus REST API.
 Handles base URL selection (sandbox/prod) and auth headers.
 No business logic — just HTTP transport.
+
+The underlying httpx clients are process-wide: connections to PayPlus are
+pooled and kept alive across checkouts (HTTP/2 when PAYPLUS_HTTP2 is set and
+the h2 package is installed), and closed from the app lifespan via
+close_http_clients(). PayPlusClient instances themselves are cheap.
 """
 
+import asyncio
 import json
 import logging
-from typing import Any
+import threading
+from typing import Any, Dict, Tuple
 
 import httpx
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
+# Idle pooled connections are dropped after this long
+KEEPALIVE_EXPIRY_SECONDS = 30.0
+
 
 class PayPlusClientError(Exception):
     """Raised on non-2xx responses from PayPlus API."""
@@ -30,6 +42,69 @@ _BASE_URLS = {
 }
 
 
+def _http2_enabled() -> bool:
+    if not settings.PAYPLUS_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("PAYPLUS_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+def _client_options(timeout: float) -> dict:
+    return {
+        "timeout": timeout,
+        "http2": _http2_enabled(),
+        "limits": httpx.Limits(
+            max_connections=settings.PAYPLUS_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.PAYPLUS_MAX_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    }
+
+
+_lock = threading.Lock()
+_sync_clients: Dict[float, httpx.Client] = {}
+# Async clients are tied to the event loop they were opened on
+_async_clients: Dict[float, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def get_http_client(timeout: float) -> httpx.Client:
+    """Shared pooled client for blocking calls (threadpool, scripts)."""
+    with _lock:
+        client = _sync_clients.get(timeout)
+        if client is None or client.is_closed:
+            client = _sync_clients[timeout] = httpx.Client(**_client_options(timeout))
+        return client
+
+
+def get_async_http_client(timeout: float) -> httpx.AsyncClient:
+    """Shared pooled client for calls made on the running event loop."""
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(timeout)
+    if entry is None or entry[0] is not loop or entry[1].is_closed:
+        entry = _async_clients[timeout] = (loop, httpx.AsyncClient(**_client_options(timeout)))
+    return entry[1]
+
+
+async def close_http_clients() -> None:
+    """Close pooled connections (called from the app lifespan on shutdown)."""
+    with _lock:
+        sync_clients = list(_sync_clients.values())
+        _sync_clients.clear()
+    for client in sync_clients:
+        client.close()
+
+    loop = asyncio.get_running_loop()
+    async_entries = list(_async_clients.values())
+    _async_clients.clear()
+    for owner, client in async_entries:
+        if owner is loop:
+            await client.aclose()
+
+
 class PayPlusClient:
     """HTTP client for PayPlus REST API."""
 
@@ -65,16 +140,27 @@ class PayPlusClient:
         POST JSON to PayPlus API and return parsed response.
         Raises PayPlusClientError on non-2xx responses.
         """
-        url = f"{self.base_url}{path}"
-        headers = self._build_headers()
+        try:
+            response = get_http_client(self.timeout).post(
+                f"{self.base_url}{path}", json=payload, headers=self._build_headers()
+            )
+        except httpx.HTTPError as exc:
+            logger.error("PayPlus HTTP transport error: %s", exc)
+            raise PayPlusClientError(0, f"Transport error: {exc}") from exc
+        return self._parse_response(path, response)
 
+    async def post_json_async(self, path: str, payload: dict[str, Any]) -> dict[str, Any]:
+        """Same as post_json, on the event loop's pooled AsyncClient."""
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(url, json=payload, headers=headers)
+            response = await get_async_http_client(self.timeout).post(
+                f"{self.base_url}{path}", json=payload, headers=self._build_headers()
+            )
         except httpx.HTTPError as exc:
             logger.error("PayPlus HTTP transport error: %s", exc)
             raise PayPlusClientError(0, f"Transport error: {exc}") from exc
+        return self._parse_response(path, response)
 
+    def _parse_response(self, path: str, response: httpx.Response) -> dict[str, Any]:
         if response.status_code >= 400:
             # Log safely — truncate response to avoid leaking sensitive data
             body_preview = response.text[:500] if response.text else "(empty)"
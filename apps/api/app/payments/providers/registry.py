@@ -13,10 +13,11 @@ def get_provider_name(name: str | None = None) -> str:
     return (name or settings.PAYMENTS_PROVIDER or "stub").strip().lower()
 
 
-def get_provider(name: str | None = None) -> PaymentProvider:
+def get_provider(name: str | None = None, verify_mode: str | None = None) -> PaymentProvider:
     """
     Return a PaymentProvider by name.
     Defaults to settings.PAYMENTS_PROVIDER (usually "stub").
+    `verify_mode` overrides PAYPLUS_WEBHOOK_VERIFY_MODE for this instance only.
     """
     provider_name = get_provider_name(name)
 
@@ -26,6 +27,6 @@ def get_provider(name: str | None = None) -> PaymentProvider:
 
     if provider_name == "payplus":
         from app.payments.providers.payplus import PayPlusProvider
-        return PayPlusProvider()
+        return PayPlusProvider(verify_mode=verify_mode)
 
     raise ValueError(f"Unknown payment provider: '{provider_name}'")
@@ -5,11 +5,11 @@ Returns predictable redirect URLs and provider refs.
 verify_webhook parses JSON directly — no signature check.
 """
 
-import json
-from typing import Mapping
+from typing import Mapping, Optional
 
 from app.payments.errors import WebhookPayloadError
 from app.payments.models import PaymentIntent
+from app.payments.parsed_webhook import ParsedWebhook
 from app.payments.provider import (
     PaymentProvider,
     ProviderCheckoutResult,
@@ -38,9 +38,10 @@ class StubProvider:
         self,
         raw_body: bytes,
         headers: Mapping[str, str],
+        parsed: Optional[ParsedWebhook] = None,
     ) -> VerifiedWebhook:
         """
-        Parse JSON body directly. No signature verification.
+        Parse JSON body directly (or reuse `parsed`). No signature verification.
 
         Expected body shape:
         {
@@ -50,10 +51,11 @@ class StubProvider:
             "payload": { ... }
         }
         """
-        try:
-            data = json.loads(raw_body)
-        except (json.JSONDecodeError, UnicodeDecodeError) as exc:
-            raise WebhookPayloadError(f"Invalid webhook body: {exc}") from exc
+        if parsed is None:
+            parsed = ParsedWebhook(raw_body)
+        data = parsed.data  # WebhookPayloadError on invalid JSON
+        if not isinstance(data, dict):
+            raise WebhookPayloadError("Invalid webhook body: expected an object")
 
         event_id = data.get("event_id")
         event_type = data.get("event_type")
@@ -65,7 +67,8 @@ class StubProvider:
 
         # Extract provider_ref: top-level first, then fallback to payload
         provider_ref = data.get("provider_ref")
-        payload = data.get("payload", {})
+        # Copy: the parsed body is shared with payload capture
+        payload = dict(data.get("payload") or {})
         if not provider_ref:
             provider_ref = payload.get("provider_ref")
         if provider_ref:
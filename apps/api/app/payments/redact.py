@@ -1,65 +1,123 @@
 import re
-from typing import Any, Set
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from app.config import settings
 
 _REDACTED_STR = "***redacted***"
+_MAX_DEPTH_STR = "***max_depth_exceeded***"
+
+# Characters dropped before the PAN/CVV digit checks
+_VALUE_SEPARATORS = str.maketrans("", "", " -")
+# Key fragments that make a 3-4 digit value look like a CVV
+_CVV_KEY_RE = re.compile("cv|sec|code")
+
+# Per-key decisions are memoised; keys come from provider payloads so the
+# memo is bounded and simply reset when it fills up.
+_KEY_MEMO_MAX_ENTRIES = 4096
 
-# Simple substring check (e.g. key contains 'cvv')
-def _is_sensitive_key(key: str, redact_keys: Set[str]) -> bool:
-    lk = key.lower()
-    return any(rk in lk for rk in redact_keys)
 
-def _is_sensitive_value(key: str, value: str) -> bool:
+class Redactor:
     """
-    Heuristics to redact values that look like PANs or CVVs 
-    even if the key name dodged the substring match.
+    Redaction for one set of key fragments, compiled once.
+
+    Key fragments are folded into a single regex; the (sensitive, cvv-ish)
+    decision for each key name is memoised since payloads of the same shape
+    repeat the same keys. Traversal is iterative.
     """
-    if not isinstance(value, str):
+
+    def __init__(self, redact_keys: Iterable[str]):
+        # Longest first so the alternation prefers the most specific fragment
+        fragments = sorted(set(redact_keys), key=len, reverse=True)
+        self._key_re = re.compile("|".join(map(re.escape, fragments))) if fragments else None
+        self._key_memo: Dict[str, Tuple[bool, bool]] = {}
+
+    def _key_flags(self, key: str) -> Tuple[bool, bool]:
+        flags = self._key_memo.get(key)
+        if flags is None:
+            lk = key.lower()
+            flags = (
+                self._key_re is not None and self._key_re.search(lk) is not None,
+                _CVV_KEY_RE.search(lk) is not None,
+            )
+            if len(self._key_memo) >= _KEY_MEMO_MAX_ENTRIES:
+                self._key_memo.clear()
+            self._key_memo[key] = flags
+        return flags
+
+    def redact(self, obj: Any, max_depth: int = 6, current_depth: int = 0) -> Any:
+        """
+        Traverse a dict/list and redact PII based on key substrings or value heuristics.
+        Truncates strings longer than 500 chars to prevent massive log dumps.
+        """
+        root = [None]
+        # (source, output container, slot in container, depth)
+        stack = [(obj, root, 0, current_depth)]
+        while stack:
+            value, parent, slot, depth = stack.pop()
+            if depth > max_depth:
+                parent[slot] = _MAX_DEPTH_STR
+            elif isinstance(value, dict):
+                out = parent[slot] = {}
+                for k, v in value.items():
+                    sensitive, cvv_key = self._key_flags(k if isinstance(k, str) else str(k))
+                    # 1. Match explicitly banned keys, 2. match heuristic values
+                    if sensitive or (isinstance(v, str) and _looks_like_card_data(v, cvv_key)):
+                        out[k] = _REDACTED_STR
+                    elif depth >= max_depth or isinstance(v, (dict, list)):
+                        # 3. Descend; the placeholder keeps the key order
+                        out[k] = None
+                        stack.append((v, out, k, depth + 1))
+                    else:
+                        out[k] = _scalar(v)
+            elif isinstance(value, list):
+                out = parent[slot] = [None] * len(value)
+                for i, item in enumerate(value):
+                    if depth >= max_depth or isinstance(item, (dict, list)):
+                        stack.append((item, out, i, depth + 1))
+                    else:
+                        out[i] = _scalar(item)
+            else:
+                parent[slot] = _scalar(value)
+        return root[0]
+
+
+def _scalar(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > 500:
+        return value[:200] + "...(truncated)"
+    # Ints, bools, floats, None and short strings pass through
+    return value
+
+
+def _looks_like_card_data(value: str, cvv_key: bool) -> bool:
+    # Cheap reject for the common case: text that can't be all digits once separators go
+    if not value or not (value[0].isdigit() or value[0] in " -"):
+        return False
+    v_clean = value.translate(_VALUE_SEPARATORS)
+    if not v_clean.isdigit():
         return False
-        
-    v_clean = value.replace(" ", "").replace("-", "")
-    
     # Heuristic 1: Looks like a PAN (13-19 digits)
-    if v_clean.isdigit() and 13 <= len(v_clean) <= 19:
+    if 13 <= len(v_clean) <= 19:
         return True
-        
     # Heuristic 2: Looks like a CVV (3-4 digits under a lightly suspicious key)
-    lk = key.lower()
-    if v_clean.isdigit() and len(v_clean) in (3, 4):
-        if "cv" in lk or "sec" in lk or "code" in lk:
-            return True
+    return cvv_key and len(v_clean) in (3, 4)
 
-    return False
 
-def redact_payload(obj: Any, redact_keys: Set[str], max_depth: int = 6, current_depth: int = 0) -> Any:
-    """
-    Recursively traverse a dict/list and redact PII based on key substrings or value heuristics.
-    Truncates strings longer than 500 chars to prevent massive log dumps.
-    """
-    if current_depth > max_depth:
-        return "***max_depth_exceeded***"
-
-    if isinstance(obj, dict):
-        redacted_dict = {}
-        for k, v in obj.items():
-            k_str = str(k)
-            # 1. Match explicitly banned keys
-            if _is_sensitive_key(k_str, redact_keys):
-                redacted_dict[k] = _REDACTED_STR
-            # 2. Match heuristic values
-            elif isinstance(v, str) and _is_sensitive_value(k_str, v):
-                redacted_dict[k] = _REDACTED_STR
-            # 3. Recurse
-            else:
-                redacted_dict[k] = redact_payload(v, redact_keys, max_depth, current_depth + 1)
-        return redacted_dict
+@lru_cache(maxsize=16)
+def compile_redactor(redact_keys: FrozenSet[str]) -> Redactor:
+    return Redactor(redact_keys)
+
 
-    elif isinstance(obj, list):
-        return [redact_payload(item, redact_keys, max_depth, current_depth + 1) for item in obj]
+def get_redactor(redact_keys: Optional[Iterable[str]] = None) -> Redactor:
+    """The compiled redactor for `redact_keys` (default: PAYPLUS_PAYLOAD_REDACT_KEYS)."""
+    if redact_keys is None:
+        redact_keys = settings.PAYPLUS_PAYLOAD_REDACT_KEYS
+    return compile_redactor(frozenset(redact_keys))
 
-    elif isinstance(obj, str):
-        if len(obj) > 500:
-            return obj[:200] + "...(truncated)"
-        return obj
 
-    # Ints, bools, floats, None pass through
-    return obj
+def redact_payload(obj: Any, redact_keys: Iterable[str], max_depth: int = 6, current_depth: int = 0) -> Any:
+    """
+    Traverse a dict/list and redact PII based on key substrings or value heuristics.
+    Truncates strings longer than 500 chars to prevent massive log dumps.
+    """
+    return get_redactor(redact_keys).redact(obj, max_depth, current_depth)
@@ -22,6 +22,8 @@ class RepoContainer:
     intents: object
     events: object
     subscriptions: object
+    inbox: object
+    transitions: object
 
 
 _memory_repos: Optional[RepoContainer] = None
@@ -38,22 +40,34 @@ def get_repos() -> RepoContainer:
         if _memory_repos is None:
             from app.payments.repo_memory import (
                 MemoryEventsRepo,
+                MemoryInboxRepo,
                 MemoryIntentsRepo,
                 MemorySubscriptionsRepo,
+                MemoryTransitionsRepo,
             )
             _memory_repos = RepoContainer(
                 intents=MemoryIntentsRepo(),
                 events=MemoryEventsRepo(),
                 subscriptions=MemorySubscriptionsRepo(),
+                inbox=MemoryInboxRepo(),
+                transitions=MemoryTransitionsRepo(),
             )
         return _memory_repos
 
     # Default: Firestore
-    from app.payments import repo_events, repo_intents, repo_subscriptions
+    from app.payments import (
+        repo_events,
+        repo_inbox,
+        repo_intents,
+        repo_subscriptions,
+        repo_transitions,
+    )
     return RepoContainer(
         intents=repo_intents,
         events=repo_events,
         subscriptions=repo_subscriptions,
+        inbox=repo_inbox,
+        transitions=repo_transitions,
     )
 
 def reset_repos_cache() -> None:
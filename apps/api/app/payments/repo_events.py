@@ -7,18 +7,19 @@ to prevent cross-provider collisions.
 """
 
 from datetime import datetime, timezone
+from typing import List, Optional
 
-from app.repos.firestore import get_db
+from app.repos.firestore import get_async_db
 
 COLLECTION = "payment_events"
 
 
-def create_event_if_absent(provider: str, event_id: str, event_doc: dict) -> bool:
+async def create_event_if_absent(provider: str, event_id: str, event_doc: dict) -> bool:
     """
     Atomically create an event document if it doesn't exist.
     Returns True if created (new event), False if already exists (duplicate).
     """
-    db = get_db()
+    db = get_async_db()
     doc_id = f"{provider}:{event_id}"
     doc_ref = db.collection(COLLECTION).document(doc_id)
 
@@ -27,9 +28,9 @@ def create_event_if_absent(provider: str, event_id: str, event_doc: dict) -> boo
 
     from google.cloud import firestore as fs
 
-    @fs.transactional
-    def txn_fn(txn: fs.Transaction) -> bool:
-        snapshot = doc_ref.get(transaction=txn)
+    @fs.async_transactional
+    async def txn_fn(txn: fs.AsyncTransaction) -> bool:
+        snapshot = await doc_ref.get(transaction=txn)
         if snapshot.exists:
             return False
 
@@ -38,4 +39,30 @@ def create_event_if_absent(provider: str, event_id: str, event_doc: dict) -> boo
         txn.create(doc_ref, event_doc)
         return True
 
-    return txn_fn(transaction)
+    return await txn_fn(transaction)
+
+
+async def list_events(
+    provider: str,
+    event_type: Optional[str] = None,
+    unmapped: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+) -> List[dict]:
+    """
+    Events for `provider` matching the filters, oldest first. Used by bulk
+    replay; type/unmapped filters with a receivedAt range need a composite index.
+    """
+    db = get_async_db()
+    query = db.collection(COLLECTION).where("provider", "==", provider)
+    if event_type:
+        query = query.where("type", "==", event_type)
+    if unmapped is not None:
+        query = query.where("unmapped", "==", unmapped)
+    if since is not None:
+        query = query.where("receivedAt", ">=", since)
+    if until is not None:
+        query = query.where("receivedAt", "<", until)
+    query = query.order_by("receivedAt").limit(limit)
+    return [doc.to_dict() async for doc in query.stream()]
@@ -0,0 +1,97 @@
+"""
+Firestore repository for the webhook inbox (WEBHOOK_PROCESSING_MODE=async).
+Collection: webhook_inbox
+
+Doc IDs match payment_events: "{provider}:{event_id}". Each doc holds the
+verified raw body and headers until the worker has processed it, plus the
+processing state: status ("queued" | "processing" | "processed" |
+"dead_letter"), attempts, lastError, nextAttemptAt and, while a worker
+holds it, leaseExpiresAt.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from google.api_core.exceptions import Conflict
+from google.cloud import firestore
+
+from app.repos.firestore import get_async_db
+
+COLLECTION = "webhook_inbox"
+
+
+async def create_if_absent(doc_id: str, doc: dict) -> bool:
+    """Store a new inbox entry. Returns False if one already exists (duplicate delivery)."""
+    db = get_async_db()
+    doc["id"] = doc_id
+    doc["receivedAt"] = doc["updatedAt"] = datetime.now(timezone.utc)
+    try:
+        await db.collection(COLLECTION).document(doc_id).create(doc)
+    except Conflict:
+        return False
+    return True
+
+
+async def get(doc_id: str) -> Optional[dict]:
+    db = get_async_db()
+    snap = await db.collection(COLLECTION).document(doc_id).get()
+    return snap.to_dict() if snap.exists else None
+
+
+def is_claimable(doc: dict, now: datetime) -> bool:
+    """Queued and due, or processing under a lease that has run out (worker died)."""
+    status = doc.get("status")
+    if status == "queued":
+        next_attempt = doc.get("nextAttemptAt")
+        return next_attempt is None or next_attempt <= now
+    if status == "processing":
+        lease = doc.get("leaseExpiresAt")
+        return lease is None or lease <= now
+    return False
+
+
+def claim_patch(doc: dict, now: datetime, lease_seconds: float) -> dict:
+    return {
+        "status": "processing",
+        "attempts": doc.get("attempts", 0) + 1,
+        "leaseExpiresAt": now + timedelta(seconds=lease_seconds),
+        "updatedAt": now,
+    }
+
+
+async def claim(doc_id: str, lease_seconds: float) -> Optional[dict]:
+    """
+    Atomically move a claimable entry to "processing" for this worker.
+    Returns the updated doc, or None if it is not claimable (another
+    instance has it, it is not due yet, or it is already done).
+    """
+    db = get_async_db()
+    ref = db.collection(COLLECTION).document(doc_id)
+
+    @firestore.async_transactional
+    async def txn_fn(txn: firestore.AsyncTransaction) -> Optional[dict]:
+        snap = await ref.get(transaction=txn)
+        if not snap.exists:
+            return None
+        doc = snap.to_dict()
+        now = datetime.now(timezone.utc)
+        if not is_claimable(doc, now):
+            return None
+        patch = claim_patch(doc, now, lease_seconds)
+        txn.update(ref, patch)
+        doc.update(patch)
+        return doc
+
+    return await txn_fn(db.transaction())
+
+
+async def update(doc_id: str, patch: dict) -> None:
+    db = get_async_db()
+    patch["updatedAt"] = datetime.now(timezone.utc)
+    await db.collection(COLLECTION).document(doc_id).update(patch)
+
+
+async def list_by_status(statuses: List[str], limit: int = 100) -> List[dict]:
+    db = get_async_db()
+    query = db.collection(COLLECTION).where("status", "in", statuses).limit(limit)
+    return [doc.to_dict() async for doc in query.stream()]
@@ -1,45 +1,143 @@
 """
 Firestore repository for payment intents.
 Collection: payment_intents
+
+provider_refs/{provider}:{providerRef} maps a provider reference to its
+intent. It is written in the same batch that sets an intent's providerRef
+and carries the intent's IntentRef (the fields that never change after that
+point), so webhook resolution is a single document get.
+
+checkout_intents/{checkout key} points at the latest intent created for a
+checkout (uid/kind/scope/course/tier/provider), written in that same batch,
+so repeat checkouts can find it without a composite-index query.
 """
 
+import logging
 from datetime import datetime, timezone
 from typing import Optional
+from urllib.parse import quote
 
-from app.payments.models import PaymentIntent
-from app.repos.firestore import get_db
+from app.payments.models import IntentRef, PaymentIntent
+from app.repos.firestore import get_async_db
+
+logger = logging.getLogger(__name__)
 
 COLLECTION = "payment_intents"
+REFS_COLLECTION = "provider_refs"
+CHECKOUTS_COLLECTION = "checkout_intents"
+
 
+def ref_doc_id(provider: str, provider_ref: str) -> str:
+    # Document ids cannot contain "/"
+    return f"{provider}:{quote(provider_ref, safe=':')}"
 
-def create_intent(intent: PaymentIntent) -> None:
-    db = get_db()
-    db.collection(COLLECTION).document(intent.id).set(intent.model_dump())
 
+def _ref_doc(ref: IntentRef) -> dict:
+    return {
+        "intentId": ref.id,
+        "provider": ref.provider,
+        "providerRef": ref.providerRef,
+        "intent": ref.model_dump(),
+        "createdAt": datetime.now(timezone.utc),
+    }
 
-def get_intent(intent_id: str) -> Optional[PaymentIntent]:
-    db = get_db()
-    doc = db.collection(COLLECTION).document(intent_id).get()
+
+async def create_intent(intent: PaymentIntent) -> None:
+    db = get_async_db()
+    await db.collection(COLLECTION).document(intent.id).set(intent.model_dump())
+
+
+async def get_intent(intent_id: str) -> Optional[PaymentIntent]:
+    db = get_async_db()
+    doc = await db.collection(COLLECTION).document(intent_id).get()
     if not doc.exists:
         return None
     return PaymentIntent(**doc.to_dict())
 
 
-def update_intent(intent_id: str, patch: dict) -> None:
-    db = get_db()
+async def update_intent(
+    intent_id: str,
+    patch: dict,
+    intent: Optional[PaymentIntent] = None,
+    checkout_key: Optional[str] = None,
+) -> None:
+    """
+    Apply `patch` to an intent. When it sets providerRef, the provider_refs
+    mapping (and the checkout_intents pointer for `checkout_key`) is written
+    in the same batch (`intent`, as created, saves reading it).
+    """
+    db = get_async_db()
     patch["updatedAt"] = datetime.now(timezone.utc)
-    db.collection(COLLECTION).document(intent_id).update(patch)
+    intent_ref = db.collection(COLLECTION).document(intent_id)
+
+    provider_ref = patch.get("providerRef")
+    if not provider_ref:
+        await intent_ref.update(patch)
+        return
 
+    if intent is None:
+        snap = await intent_ref.get()
+        if not snap.exists:
+            raise KeyError(f"Intent {intent_id} not found")
+        data = snap.to_dict()
+    else:
+        data = intent.model_dump()
+    data.update(patch)
 
-def find_by_provider_ref(provider: str, provider_ref: str) -> Optional[PaymentIntent]:
-    """Find an intent by its provider reference. Used by webhooks."""
-    db = get_db()
-    query = (
-        db.collection(COLLECTION)
-        .where("provider", "==", provider)
-        .where("providerRef", "==", provider_ref)
-        .limit(1)
+    batch = db.batch()
+    batch.update(intent_ref, patch)
+    batch.set(
+        db.collection(REFS_COLLECTION).document(ref_doc_id(data["provider"], provider_ref)),
+        _ref_doc(IntentRef(**data)),
     )
-    for doc in query.stream():
-        return PaymentIntent(**doc.to_dict())
-    return None
+    if checkout_key:
+        batch.set(
+            db.collection(CHECKOUTS_COLLECTION).document(quote(checkout_key, safe="")),
+            {"intentId": intent_id, "updatedAt": patch["updatedAt"]},
+        )
+    await batch.commit()
+
+
+async def get_checkout_intent(checkout_key: str) -> Optional[PaymentIntent]:
+    """The latest intent created for `checkout_key`, if any."""
+    db = get_async_db()
+    snap = await db.collection(CHECKOUTS_COLLECTION).document(quote(checkout_key, safe="")).get()
+    if not snap.exists:
+        return None
+    return await get_intent(snap.to_dict()["intentId"])
+
+
+async def find_by_provider_ref(provider: str, provider_ref: str) -> Optional[IntentRef]:
+    """
+    Resolve a provider reference to its intent's IntentRef. Used by webhooks.
+    Mappings written without the IntentRef, and intents whose providerRef
+    predates the mapping (found with the field query once), get it backfilled.
+    """
+    db = get_async_db()
+    ref_doc = db.collection(REFS_COLLECTION).document(ref_doc_id(provider, provider_ref))
+    snap = await ref_doc.get()
+    if snap.exists:
+        mapping = snap.to_dict()
+        if mapping.get("intent"):
+            return IntentRef(**mapping["intent"])
+        intent = await get_intent(mapping["intentId"])
+    else:
+        query = (
+            db.collection(COLLECTION)
+            .where("provider", "==", provider)
+            .where("providerRef", "==", provider_ref)
+            .limit(1)
+        )
+        intent = None
+        async for doc in query.stream():
+            intent = PaymentIntent(**doc.to_dict())
+            break
+
+    if intent is None:
+        return None
+    ref = IntentRef(**intent.model_dump())
+    try:
+        await ref_doc.set(_ref_doc(ref))
+    except Exception as e:
+        logger.warning(f"Failed to backfill provider ref mapping for {intent.id}: {e}")
+    return ref
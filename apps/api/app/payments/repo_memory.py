@@ -3,12 +3,17 @@ In-memory repository implementations for testing.
 
 Used when PAYMENTS_REPO=memory. All stores are module-level dicts
 so the singleton in repo.py returns the same data across calls.
+Entitlements are the exception: transitions write them through
+repos/entitlements.py, which keeps user_access/{uid} (what access checks
+read) in step.
 """
 
 from datetime import datetime, timezone
-from typing import Optional
+from typing import List, Optional
 
-from app.payments.models import PaymentIntent, Subscription
+from app.payments.models import IntentRef, PaymentIntent, StateTransition, Subscription
+from app.payments.repo_inbox import claim_patch, is_claimable
+from app.repos import entitlements
 
 
 # ── Module-level stores (shared singleton state) ────────────────────
@@ -16,6 +21,9 @@ from app.payments.models import PaymentIntent, Subscription
 _intents: dict[str, dict] = {}
 _events: dict[str, dict] = {}
 _subscriptions: dict[str, dict] = {}
+_inbox: dict[str, dict] = {}
+_provider_refs: dict[str, str] = {}   # "{provider}:{providerRef}" -> intent id
+_checkout_intents: dict[str, str] = {}  # checkout key -> latest intent id
 
 
 def reset() -> None:
@@ -23,40 +31,57 @@ def reset() -> None:
     _intents.clear()
     _events.clear()
     _subscriptions.clear()
+    _inbox.clear()
+    _provider_refs.clear()
+    _checkout_intents.clear()
 
 
 # ── Intents ─────────────────────────────────────────────────────────
 
 class MemoryIntentsRepo:
     @staticmethod
-    def create_intent(intent: PaymentIntent) -> None:
+    async def create_intent(intent: PaymentIntent) -> None:
         _intents[intent.id] = intent.model_dump()
+        if intent.providerRef:
+            _provider_refs[f"{intent.provider}:{intent.providerRef}"] = intent.id
 
     @staticmethod
-    def get_intent(intent_id: str) -> Optional[PaymentIntent]:
+    async def get_intent(intent_id: str) -> Optional[PaymentIntent]:
         data = _intents.get(intent_id)
         return PaymentIntent(**data) if data else None
 
     @staticmethod
-    def update_intent(intent_id: str, patch: dict) -> None:
+    async def update_intent(
+        intent_id: str, patch: dict, intent: Optional[PaymentIntent] = None, checkout_key: Optional[str] = None
+    ) -> None:
         if intent_id not in _intents:
             raise KeyError(f"Intent {intent_id} not found")
         patch["updatedAt"] = datetime.now(timezone.utc)
         _intents[intent_id].update(patch)
+        if patch.get("providerRef"):
+            data = _intents[intent_id]
+            _provider_refs[f"{data['provider']}:{patch['providerRef']}"] = intent_id
+            if checkout_key:
+                _checkout_intents[checkout_key] = intent_id
 
     @staticmethod
-    def find_by_provider_ref(provider: str, provider_ref: str) -> Optional[PaymentIntent]:
-        for data in _intents.values():
-            if data.get("provider") == provider and data.get("providerRef") == provider_ref:
-                return PaymentIntent(**data)
-        return None
+    async def get_checkout_intent(checkout_key: str) -> Optional[PaymentIntent]:
+        intent_id = _checkout_intents.get(checkout_key)
+        data = _intents.get(intent_id) if intent_id else None
+        return PaymentIntent(**data) if data else None
+
+    @staticmethod
+    async def find_by_provider_ref(provider: str, provider_ref: str) -> Optional[IntentRef]:
+        intent_id = _provider_refs.get(f"{provider}:{provider_ref}")
+        data = _intents.get(intent_id) if intent_id else None
+        return IntentRef(**data) if data else None
 
 
 # ── Events ──────────────────────────────────────────────────────────
 
 class MemoryEventsRepo:
     @staticmethod
-    def create_event_if_absent(provider: str, event_id: str, event_doc: dict) -> bool:
+    async def create_event_if_absent(provider: str, event_id: str, event_doc: dict) -> bool:
         doc_id = f"{provider}:{event_id}"
         if doc_id in _events:
             return False
@@ -65,10 +90,96 @@ class MemoryEventsRepo:
         _events[doc_id] = event_doc
         return True
 
+    @staticmethod
+    async def list_events(
+        provider: str,
+        event_type: Optional[str] = None,
+        unmapped: Optional[bool] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 100,
+    ) -> List[dict]:
+        matches = [
+            dict(d) for d in _events.values()
+            if d.get("provider") == provider
+            and (not event_type or d.get("type") == event_type)
+            and (unmapped is None or d.get("unmapped") == unmapped)
+            and (since is None or d["receivedAt"] >= since)
+            and (until is None or d["receivedAt"] < until)
+        ]
+        return sorted(matches, key=lambda d: d["receivedAt"])[:limit]
+
 
 # ── Subscriptions ───────────────────────────────────────────────────
 
 class MemorySubscriptionsRepo:
     @staticmethod
-    def upsert_subscription(sub: Subscription) -> None:
+    async def upsert_subscription(sub: Subscription) -> None:
         _subscriptions[sub.id] = sub.model_dump()
+
+
+# ── State transitions ───────────────────────────────────────────────
+
+class MemoryTransitionsRepo:
+    @staticmethod
+    async def apply_event(provider: str, event_id: str, event_doc: dict, transition: StateTransition) -> bool:
+        doc_id = f"{provider}:{event_id}"
+        if doc_id in _events:
+            return False
+        # Validate before writing anything, like the Firestore transaction
+        if transition.intentPatch and transition.intentId not in _intents:
+            raise KeyError(f"Intent {transition.intentId} not found")
+
+        # Entitlements live in Firestore even here, so access checks see them;
+        # write first so a failure leaves no event record behind
+        if transition.entitlement is not None:
+            await entitlements.merge_entitlement(transition.entitlementId, transition.entitlement)
+
+        now = datetime.now(timezone.utc)
+        _events[doc_id] = {**event_doc, "id": doc_id, "receivedAt": now}
+        if event_doc.get("replayOf") in _events:
+            _events[event_doc["replayOf"]]["replayedAs"] = doc_id
+        if transition.intentPatch:
+            _intents[transition.intentId].update({**transition.intentPatch, "updatedAt": now})
+        if transition.subscription is not None:
+            sub = transition.subscription
+            _subscriptions[sub.id] = {**_subscriptions.get(sub.id, {}), **sub.model_dump()}
+        return True
+
+
+# ── Webhook inbox ───────────────────────────────────────────────────
+
+class MemoryInboxRepo:
+    @staticmethod
+    async def create_if_absent(doc_id: str, doc: dict) -> bool:
+        if doc_id in _inbox:
+            return False
+        doc["id"] = doc_id
+        doc["receivedAt"] = doc["updatedAt"] = datetime.now(timezone.utc)
+        _inbox[doc_id] = doc
+        return True
+
+    @staticmethod
+    async def get(doc_id: str) -> Optional[dict]:
+        data = _inbox.get(doc_id)
+        return dict(data) if data else None
+
+    @staticmethod
+    async def claim(doc_id: str, lease_seconds: float) -> Optional[dict]:
+        data = _inbox.get(doc_id)
+        now = datetime.now(timezone.utc)
+        if data is None or not is_claimable(data, now):
+            return None
+        data.update(claim_patch(data, now, lease_seconds))
+        return dict(data)
+
+    @staticmethod
+    async def update(doc_id: str, patch: dict) -> None:
+        if doc_id not in _inbox:
+            raise KeyError(f"Inbox entry {doc_id} not found")
+        patch["updatedAt"] = datetime.now(timezone.utc)
+        _inbox[doc_id].update(patch)
+
+    @staticmethod
+    async def list_by_status(statuses: List[str], limit: int = 100) -> List[dict]:
+        return [dict(d) for d in _inbox.values() if d.get("status") in statuses][:limit]
@@ -0,0 +1,107 @@
+"""
+Shadow repositories for dry-run webhook replays.
+
+ShadowStore(base).repos is a RepoContainer whose writes land in the
+store's private dicts while intent reads fall through to `base`. Webhook
+processing against it behaves like the real thing (including duplicates
+within the run) without changing stored data. Event ids are not looked up
+in `base`: bulk replays record events under a fresh replay-scoped id, so a
+live run starts with none of them recorded either. Only the repo methods
+that webhook processing uses are implemented.
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.payments.models import IntentRef, PaymentIntent, StateTransition, Subscription
+from app.payments.repo import RepoContainer
+
+
+class ShadowStore:
+    """Everything a dry run would have written, keyed like the real stores."""
+
+    def __init__(self, base: RepoContainer):
+        self.base = base
+        self.events: dict[str, dict] = {}
+        self.intent_patches: dict[str, dict] = {}
+        self.subscriptions: dict[str, dict] = {}
+        self.entitlements: dict[str, dict] = {}
+        self.repos = RepoContainer(
+            intents=ShadowIntentsRepo(self),
+            events=ShadowEventsRepo(self),
+            subscriptions=ShadowSubscriptionsRepo(self),
+            inbox=None,  # not used by webhook processing
+            transitions=ShadowTransitionsRepo(self),
+        )
+
+    def overlay(self, intent: Optional[PaymentIntent]) -> Optional[PaymentIntent]:
+        patch = self.intent_patches.get(intent.id) if intent else None
+        return intent.model_copy(update=patch) if patch else intent
+
+    def summary(self) -> dict:
+        return {
+            "events": len(self.events),
+            "intents": len(self.intent_patches),
+            "subscriptions": len(self.subscriptions),
+            "entitlements": len(self.entitlements),
+        }
+
+
+class ShadowIntentsRepo:
+    def __init__(self, store: ShadowStore):
+        self._store = store
+
+    async def get_intent(self, intent_id: str) -> Optional[PaymentIntent]:
+        return self._store.overlay(await self._store.base.intents.get_intent(intent_id))
+
+    async def find_by_provider_ref(self, provider: str, provider_ref: str) -> Optional[IntentRef]:
+        # Nothing a dry run writes changes an IntentRef
+        return await self._store.base.intents.find_by_provider_ref(provider, provider_ref)
+
+
+class ShadowEventsRepo:
+    def __init__(self, store: ShadowStore):
+        self._store = store
+
+    async def create_event_if_absent(self, provider: str, event_id: str, event_doc: dict) -> bool:
+        doc_id = f"{provider}:{event_id}"
+        if doc_id in self._store.events:
+            return False
+        self._store.events[doc_id] = {**event_doc, "id": doc_id, "receivedAt": datetime.now(timezone.utc)}
+        return True
+
+
+class ShadowSubscriptionsRepo:
+    def __init__(self, store: ShadowStore):
+        self._store = store
+
+    async def upsert_subscription(self, sub: Subscription) -> None:
+        self._store.subscriptions[sub.id] = sub.model_dump()
+
+
+class ShadowTransitionsRepo:
+    def __init__(self, store: ShadowStore):
+        self._store = store
+
+    async def apply_event(self, provider: str, event_id: str, event_doc: dict, transition: StateTransition) -> bool:
+        store = self._store
+        doc_id = f"{provider}:{event_id}"
+        if doc_id in store.events:
+            return False
+        # Validate before writing anything, like the real repos
+        if transition.intentPatch and await store.base.intents.get_intent(transition.intentId) is None:
+            raise KeyError(f"Intent {transition.intentId} not found")
+
+        now = datetime.now(timezone.utc)
+        store.events[doc_id] = {**event_doc, "id": doc_id, "receivedAt": now}
+        if transition.intentPatch:
+            patch = store.intent_patches.setdefault(transition.intentId, {})
+            patch.update({**transition.intentPatch, "updatedAt": now})
+        if transition.subscription is not None:
+            sub = transition.subscription
+            store.subscriptions[sub.id] = {**store.subscriptions.get(sub.id, {}), **sub.model_dump()}
+        if transition.entitlement is not None:
+            ent_id = transition.entitlementId
+            store.entitlements[ent_id] = {**store.entitlements.get(ent_id, {}), **transition.entitlement}
+        return True
+
@@ -0,0 +1,63 @@
+"""
+Firestore repository for webhook state transitions.
+
+apply_event() records a webhook event and applies its StateTransition
+(intent status, subscription upsert, entitlement + user_access, and for
+bulk replays the original event's replayedAs marker) in a single
+transaction, so an event is either fully applied or not recorded at all and
+can be retried.
+"""
+
+from datetime import datetime, timezone
+
+from google.cloud import firestore
+
+from app.payments import repo_events, repo_intents, repo_subscriptions
+from app.payments.models import StateTransition
+from app.repos import entitlements
+from app.repos.firestore import get_async_db
+
+
+async def apply_event(provider: str, event_id: str, event_doc: dict, transition: StateTransition) -> bool:
+    """
+    Create the event document and apply `transition` atomically.
+    Returns True if applied, False if the event was already recorded (duplicate).
+    """
+    db = get_async_db()
+    doc_id = f"{provider}:{event_id}"
+    event_ref = db.collection(repo_events.COLLECTION).document(doc_id)
+    intent_ref = db.collection(repo_intents.COLLECTION).document(transition.intentId)
+
+    @firestore.async_transactional
+    async def txn_fn(txn: firestore.AsyncTransaction):
+        # All reads must happen before any writes
+        snapshot = await event_ref.get(transaction=txn)
+        if snapshot.exists:
+            return None
+        ent = None
+        if transition.entitlement is not None:
+            ent = await entitlements.read_for_update(txn, db, transition.entitlementId, transition.entitlement)
+
+        now = datetime.now(timezone.utc)
+        txn.create(event_ref, {**event_doc, "id": doc_id, "receivedAt": now})
+        if event_doc.get("replayOf"):
+            # A replay applied it: the original is never replayed again
+            original_ref = db.collection(repo_events.COLLECTION).document(event_doc["replayOf"])
+            txn.update(original_ref, {"replayedAs": doc_id})
+        if transition.intentPatch:
+            txn.update(intent_ref, {**transition.intentPatch, "updatedAt": now})
+        if transition.subscription is not None:
+            sub_ref = db.collection(repo_subscriptions.COLLECTION).document(transition.subscription.id)
+            txn.set(sub_ref, transition.subscription.model_dump(), merge=True)
+        if ent is not None:
+            payload, merged, access = ent
+            entitlements.stage_write(txn, db, transition.entitlementId, payload, access)
+            return merged["uid"]
+        return ""
+
+    uid = await txn_fn(db.transaction())
+    if uid is None:
+        return False
+    if uid:
+        entitlements.forget(transition.entitlementId, uid)
+    return True
@@ -5,45 +5,42 @@ Coordinates checkout creation and webhook processing.
 Uses the provider interface + repo factory — no direct Stripe calls.
 """
 
+import asyncio
+import dataclasses
 import logging
 import uuid
-from datetime import datetime, timezone
-from typing import Any, Mapping, Optional, Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import quote
+
+from fastapi.concurrency import run_in_threadpool
 
 from app.payments import events
 from app.config import settings
-from app.payments.models import PaymentIntent
+from app.payments.errors import WebhookProcessingError
+from app.payments.models import IntentRef, PaymentIntent, StateTransition, Subscription
+from app.payments.parsed_webhook import ParsedWebhook
 from app.payments.provider import VerifiedWebhook
 from app.payments.providers.registry import get_provider, get_provider_name
-from app.payments.repo import get_repos
-from app.payments.redact import redact_payload
+from app.payments.repo import RepoContainer, get_repos
+from app.repos import entitlements
 
 logger = logging.getLogger(__name__)
 
 
-def _pick_first(parsed: dict, paths: Sequence[Sequence[str]]) -> Optional[str]:
-    """
-    Helper to extract the first matching path from a dictionary.
-    Handles nested paths like ["transaction", "uid"].
-    """
-    for path in paths:
-        curr = parsed
-        for key in path:
-            if isinstance(curr, dict) and key in curr:
-                curr = curr[key]
-            else:
-                curr = None
-                break
-        if curr is not None and isinstance(curr, str) and curr.strip():
-            return curr.strip()
-    return None
-
-
 def _generate_intent_id() -> str:
     return f"pi_{uuid.uuid4().hex}"
 
 
-def create_checkout(
+# Checkouts currently being created in this process, by checkout key
+_checkouts_in_flight: Dict[str, "asyncio.Future[dict]"] = {}
+
+
+def _checkout_key(uid: str, kind: str, scope: str, courseId: Optional[str], tier: Optional[str], provider: str) -> str:
+    return ":".join(quote(part or "-", safe="") for part in (uid, kind, scope, courseId, tier, provider))
+
+
+async def create_checkout(
     uid: str,
     kind: str,
     scope: str,
@@ -53,7 +50,52 @@ def create_checkout(
     """
     Create a payment intent and provider checkout session.
     Returns {"url": redirect_url} matching frontend expectations.
+
+    Within CHECKOUT_REUSE_WINDOW_SECONDS a repeat checkout for the same
+    uid/kind/scope/courseId/tier returns the still-pending intent and its
+    payment link, and concurrent ones share a single provider call.
     """
+    if settings.CHECKOUT_REUSE_WINDOW_SECONDS <= 0:
+        return await _create_checkout(uid, kind, scope, courseId, tier)
+
+    key = _checkout_key(uid, kind, scope, courseId, tier, get_provider_name())
+    task = _checkouts_in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_reuse_or_create_checkout(key, uid, kind, scope, courseId, tier))
+        _checkouts_in_flight[key] = task
+        task.add_done_callback(lambda _: _checkouts_in_flight.pop(key, None))
+    # Shielded: a caller going away doesn't cancel the call others wait on
+    return dict(await asyncio.shield(task))
+
+
+async def _reuse_or_create_checkout(
+    key: str,
+    uid: str,
+    kind: str,
+    scope: str,
+    courseId: Optional[str],
+    tier: Optional[str],
+) -> dict:
+    repos = get_repos()
+    intent = await repos.intents.get_checkout_intent(key)
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.CHECKOUT_REUSE_WINDOW_SECONDS)
+    if intent and intent.status == "pending" and intent.checkoutUrl and intent.createdAt >= cutoff:
+        logger.info(
+            "Checkout reused",
+            extra={"intent_id": intent.id, "uid": uid, "kind": kind, "scope": scope, "provider": intent.provider},
+        )
+        return {"url": intent.checkoutUrl, "intentId": intent.id, "reused": True}
+    return await _create_checkout(uid, kind, scope, courseId, tier, checkout_key=key)
+
+
+async def _create_checkout(
+    uid: str,
+    kind: str,
+    scope: str,
+    courseId: Optional[str],
+    tier: Optional[str],
+    checkout_key: Optional[str] = None,
+) -> dict:
     repos = get_repos()
     provider_name = get_provider_name()
     provider = get_provider()
@@ -74,16 +116,24 @@ def create_checkout(
     )
 
     # Persist intent
-    repos.intents.create_intent(intent)
-
-    # Call provider
-    if kind == "one_time":
-        result = provider.create_one_time_checkout(intent)
+    await repos.intents.create_intent(intent)
+
+    # Call provider: natively async when it supports it, otherwise blocking
+    # HTTP kept off the event loop
+    method = "create_one_time_checkout" if kind == "one_time" else "create_subscription_checkout"
+    checkout_async = getattr(provider, f"{method}_async", None)
+    if checkout_async is not None:
+        result = await checkout_async(intent)
     else:
-        result = provider.create_subscription_checkout(intent)
+        result = await run_in_threadpool(getattr(provider, method), intent)
 
     # Update intent with provider ref (repo sets updatedAt internally)
-    repos.intents.update_intent(intent.id, {"providerRef": result.provider_ref})
+    await repos.intents.update_intent(
+        intent.id,
+        {"providerRef": result.provider_ref, "checkoutUrl": result.redirect_url},
+        intent=intent,
+        checkout_key=checkout_key,
+    )
 
     logger.info(
         "Checkout created",
@@ -100,9 +150,12 @@ def create_checkout(
     return {"url": result.redirect_url, "intentId": intent.id}
 
 
-def handle_webhook(
+async def handle_webhook(
     raw_body: bytes,
     headers: Mapping[str, str],
+    verify_mode: Optional[str] = None,
+    repos: Optional[RepoContainer] = None,
+    replay_id: Optional[str] = None,
 ) -> dict:
     """
     Process an incoming webhook from the active payment provider.
@@ -110,12 +163,25 @@ def handle_webhook(
     Typed exceptions (WebhookPayloadError, WebhookVerificationError) bubble
     up to the router for correct HTTP status mapping. Only normal outcomes
     return JSON dicts.
+
+    Admin replays pass `verify_mode` (instead of changing the global setting)
+    and, for dry runs, shadow `repos`. Bulk replays also pass `replay_id`:
+    the event is then recorded as "{event_id}:replay:{replay_id}" with
+    replayOf pointing at the original, so an event that was recorded
+    without being applied (outcome unmapped/unknown_intent) is processed
+    again instead of being a duplicate. Applying it marks the original
+    replayedAs in the same commit.
     """
-    repos = get_repos()
-    provider = get_provider()
+    repos = repos or get_repos()
+    provider = get_provider(verify_mode=verify_mode)
+    parsed = ParsedWebhook(raw_body)
 
     # 1. Verify — typed errors bubble to router
-    verified: VerifiedWebhook = provider.verify_webhook(raw_body, headers)
+    verified: VerifiedWebhook = provider.verify_webhook(raw_body, headers, parsed=parsed)
+    replay_of = None
+    if replay_id:
+        replay_of = f"{verified.provider}:{verified.event_id}"
+        verified = dataclasses.replace(verified, event_id=f"{verified.event_id}:replay:{replay_id}")
 
     log_ctx = {
         "provider": verified.provider,
@@ -132,63 +198,28 @@ def handle_webhook(
         "unmapped": is_unmapped,
         "unmappedHint": verified.payload.get("unmapped_hint") if is_unmapped else None,
     }
+    if replay_of:
+        event_doc["replayOf"] = replay_of
     
     if settings.PAYPLUS_CAPTURE_WEBHOOK_PAYLOADS:
         try:
-            import json
-            raw_dict = json.loads(raw_body.decode("utf-8"))
-            event_doc["payload_raw_redacted"] = redact_payload(
-                raw_dict, set(settings.PAYPLUS_PAYLOAD_REDACT_KEYS)
-            )
-            event_doc["payload_keys"] = list(raw_dict.keys())[:100]
-            if isinstance(raw_dict.get("transaction"), dict):
-                event_doc["transaction_keys"] = list(raw_dict["transaction"].keys())[:100]
+            event_doc["payload_raw_redacted"] = parsed.redacted
+            event_doc["payload_keys"] = parsed.payload_keys
+            if parsed.transaction_keys is not None:
+                event_doc["transaction_keys"] = parsed.transaction_keys
 
             if verified.provider == "payplus":
-                event_doc["providerRefCandidate"] = _pick_first(raw_dict, [
-                    ["payment_request_uid"],
-                    ["page_request_uid"],
-                    ["transaction", "payment_request_uid"],
-                    ["transaction", "page_request_uid"],
-                    ["data", "payment_request_uid"],
-                    ["data", "page_request_uid"],
-                ])
-                event_doc["transactionUidCandidate"] = _pick_first(raw_dict, [
-                    ["transaction", "uid"],
-                    ["transaction_uid"],
-                    ["transaction", "transaction_uid"],
-                    ["data", "transaction", "uid"],
-                    ["data", "transaction_uid"],
-                ])
-                event_doc["providerSubscriptionIdCandidate"] = _pick_first(raw_dict, [
-                    ["recurring_id"],
-                    ["token_uid"],
-                    ["token"],
-                    ["card_token"],
-                    ["transaction", "recurring_id"],
-                    ["transaction", "token_uid"],
-                    ["transaction", "token"],
-                    ["data", "recurring_id"],
-                    ["data", "token_uid"],
-                ])
-                event_doc["verifyMode"] = getattr(settings, "PAYPLUS_WEBHOOK_VERIFY_MODE", "log_only")
+                event_doc.update(parsed.candidates)
+                event_doc["verifyMode"] = verify_mode or settings.PAYPLUS_WEBHOOK_VERIFY_MODE
 
         except Exception as e:
             logger.warning(f"Failed to parse or redact raw webhook body: {e}")
             event_doc["payload_raw_redacted"] = {"_error": "invalid_json_or_redact_failure"}
 
-    # 2. Idempotency
-    created = repos.events.create_event_if_absent(
-        provider=verified.provider,
-        event_id=verified.event_id,
-        event_doc=event_doc,
-    )
-    if not created:
-        logger.info("Duplicate webhook event, skipping", extra=log_ctx)
-        return {"ok": True, "duplicate": True}
-
-    # 2.5 Unmapped events — store but never mutate state
+    # 2. Unmapped events — store but never mutate state
     if is_unmapped:
+        if not await _record_event(repos, verified, event_doc, log_ctx, "unmapped"):
+            return {"ok": True, "duplicate": True}
         logger.warning(
             "Unmapped PayPlus event stored",
             extra={**log_ctx, "unmapped_hint": verified.payload.get("unmapped_hint")},
@@ -197,12 +228,14 @@ def handle_webhook(
 
     # 3. Find intent by provider_ref
     provider_ref = verified.payload.get("provider_ref")
-    intent: Optional[PaymentIntent] = None
+    intent: Optional[IntentRef] = None
 
     if provider_ref:
-        intent = repos.intents.find_by_provider_ref(verified.provider, provider_ref)
+        intent = await repos.intents.find_by_provider_ref(verified.provider, provider_ref)
 
     if not intent:
+        if not await _record_event(repos, verified, event_doc, log_ctx, "unknown_intent"):
+            return {"ok": True, "duplicate": True}
         logger.warning("Webhook received but no matching intent found", extra={
             **log_ctx, "provider_ref": provider_ref,
         })
@@ -211,32 +244,83 @@ def handle_webhook(
     log_ctx["intent_id"] = intent.id
     log_ctx["uid"] = intent.uid
 
-    # 4. Route by canonical event type
-    if verified.event_type == events.PAYMENT_SUCCEEDED:
-        _handle_payment_succeeded(repos, intent, verified)
-        logger.info("Payment succeeded, entitlement granted", extra=log_ctx)
+    # 4. Plan the writes for the canonical event type
+    planner = _PLANNERS.get(verified.event_type)
+    if planner is None:
+        if not await _record_event(repos, verified, event_doc, log_ctx, "ignored"):
+            return {"ok": True, "duplicate": True}
+        logger.info("Unhandled event type, ignoring", extra=log_ctx)
+        return {"ok": True, "duplicate": False, "ignored": True}
+
+    # 5. Record the event and apply all its writes in one commit (idempotent)
+    applied = await repos.transitions.apply_event(
+        verified.provider, verified.event_id, {**event_doc, "outcome": "applied"}, planner(intent, verified),
+    )
+    if not applied:
+        logger.info("Duplicate webhook event, skipping", extra=log_ctx)
+        return {"ok": True, "duplicate": True}
+
+    logger.info(_APPLIED_MESSAGES[verified.event_type], extra=log_ctx)
+    return {"ok": True, "duplicate": False}
 
-    elif verified.event_type == events.PAYMENT_FAILED:
-        repos.intents.update_intent(intent.id, {"status": "failed"})
-        logger.info("Payment failed", extra=log_ctx)
 
-    elif verified.event_type == events.SUB_RENEWED:
-        _handle_sub_renewed(repos, intent, verified)
-        logger.info("Subscription renewed", extra=log_ctx)
+async def _record_event(repos, verified: VerifiedWebhook, event_doc: dict, log_ctx: dict, outcome: str) -> bool:
+    """Idempotency record for events that change no state. False on duplicates."""
+    created = await repos.events.create_event_if_absent(
+        provider=verified.provider,
+        event_id=verified.event_id,
+        event_doc={**event_doc, "outcome": outcome},
+    )
+    if not created:
+        logger.info("Duplicate webhook event, skipping", extra=log_ctx)
+    return created
 
-    elif verified.event_type == events.SUB_PAST_DUE:
-        _handle_sub_past_due(repos, intent, verified)
-        logger.info("Subscription past due", extra=log_ctx)
 
-    elif verified.event_type == events.SUB_CANCELED:
-        _handle_sub_canceled(repos, intent, verified)
-        logger.info("Subscription canceled", extra=log_ctx)
+# Request headers never stored with a queued webhook
+_UNSTORED_HEADERS = {"cookie", "authorization"}
 
-    else:
-        logger.info("Unhandled event type, ignoring", extra=log_ctx)
-        return {"ok": True, "duplicate": False, "ignored": True}
 
-    return {"ok": True, "duplicate": False}
+async def ingest_webhook(
+    raw_body: bytes,
+    headers: Mapping[str, str],
+) -> dict:
+    """
+    Fast-ack path (WEBHOOK_PROCESSING_MODE=async): verify the webhook, store
+    the raw event in the inbox and hand it to the background worker, which
+    runs handle_webhook() on it later.
+
+    Verification errors bubble up like in handle_webhook; a failed inbox
+    write raises WebhookProcessingError so the provider retries delivery.
+    """
+    repos = get_repos()
+    provider = get_provider()
+
+    verified: VerifiedWebhook = provider.verify_webhook(raw_body, headers, parsed=ParsedWebhook(raw_body))
+    inbox_id = f"{verified.provider}:{verified.event_id}"
+
+    try:
+        created = await repos.inbox.create_if_absent(inbox_id, {
+            "provider": verified.provider,
+            "eventId": verified.event_id,
+            "eventType": verified.event_type,
+            "rawBody": raw_body,
+            "headers": {k: v for k, v in headers.items() if k.lower() not in _UNSTORED_HEADERS},
+            "status": "queued",
+            "attempts": 0,
+            "lastError": None,
+            "nextAttemptAt": None,
+        })
+    except Exception as exc:
+        logger.error(f"Failed to store webhook {inbox_id}: {exc}", exc_info=True)
+        raise WebhookProcessingError("Failed to store webhook") from exc
+
+    if not created:
+        logger.info("Duplicate webhook delivery, already queued", extra={"inbox_id": inbox_id})
+        return {"ok": True, "duplicate": True, "queued": False}
+
+    from app.payments.worker import webhook_worker
+    webhook_worker.submit(inbox_id)
+    return {"ok": True, "duplicate": False, "queued": True}
 
 
 # ── Helpers ─────────────────────────────────────────────────────────
@@ -257,143 +341,103 @@ def _build_subscription_id(
     return f"sub_{uid}_{provider}_bootstrap_{intent_provider_ref or 'unknown'}"
 
 
-def _handle_payment_succeeded(repos, intent: PaymentIntent, verified: VerifiedWebhook) -> None:
-    """Mark intent as succeeded and grant the appropriate entitlement."""
-    repos.intents.update_intent(intent.id, {"status": "succeeded"})
-
-    from app.repos import entitlements
-
-    if intent.scope == "course" and intent.courseId:
-        entitlements.upsert_course_entitlement(
-            uid=intent.uid,
-            course_id=intent.courseId,
-            source="one_time",
-        )
-    elif intent.scope == "membership":
-        provider_sub_id = verified.payload.get("provider_subscription_id")
-
-        # Bootstrap subscription record
-        from app.payments.models import Subscription
-        sub_id = _build_subscription_id(
-            intent.uid, intent.provider, provider_sub_id, intent.providerRef
-        )
-        repos.subscriptions.upsert_subscription(Subscription(
-            id=sub_id,
-            uid=intent.uid,
-            provider=intent.provider,
-            providerSubscriptionId=provider_sub_id or intent.providerRef or "",
-            status="active",
-        ))
-
-        entitlements.upsert_membership_entitlement(
-            uid=intent.uid,
-            status="active",
-            expires_at=None,
-            source="subscription",
-            provider=intent.provider,
-            provider_subscription_id=provider_sub_id or intent.providerRef or None,
-        )
-
-
-def _handle_sub_renewed(repos, intent: PaymentIntent, verified: VerifiedWebhook) -> None:
-    """Subscription renewed — upsert subscription + keep entitlement active."""
+def _subscription_transition(
+    intent: IntentRef,
+    verified: VerifiedWebhook,
+    sub_status: str,
+    membership_status: str,
+    intent_patch: Optional[dict] = None,
+) -> StateTransition:
+    """Subscription upsert + membership entitlement, shared by the subscription events."""
     provider_sub_id = verified.payload.get("provider_subscription_id")
-    if not provider_sub_id:
-        logger.warning(
-            "Missing provider_subscription_id in %s event",
-            verified.event_type,
-            extra={"uid": intent.uid, "intent_id": intent.id},
-        )
-
-    from app.payments.models import Subscription
     sub_id = _build_subscription_id(
         intent.uid, intent.provider, provider_sub_id, intent.providerRef
     )
-    repos.subscriptions.upsert_subscription(Subscription(
-        id=sub_id,
+    entitlement = entitlements.build_membership_entitlement(
         uid=intent.uid,
-        provider=intent.provider,
-        providerSubscriptionId=provider_sub_id or intent.providerRef or "",
-        status="active",
-    ))
-
-    from app.repos import entitlements
-    entitlements.upsert_membership_entitlement(
-        uid=intent.uid,
-        status="active",
+        status=membership_status,
         expires_at=None,
         source="subscription",
         provider=intent.provider,
         provider_subscription_id=provider_sub_id or intent.providerRef or None,
     )
+    return StateTransition(
+        intentId=intent.id,
+        intentPatch=intent_patch or {},
+        subscription=Subscription(
+            id=sub_id,
+            uid=intent.uid,
+            provider=intent.provider,
+            providerSubscriptionId=provider_sub_id or intent.providerRef or "",
+            status=sub_status,
+        ),
+        entitlementId=entitlement["id"],
+        entitlement=entitlement,
+    )
 
 
-def _handle_sub_past_due(repos, intent: PaymentIntent, verified: VerifiedWebhook) -> None:
-    """Subscription past due — update subscription, keep entitlement active for MVP."""
-    provider_sub_id = verified.payload.get("provider_subscription_id")
-    if not provider_sub_id:
+def _warn_missing_sub_id(intent: IntentRef, verified: VerifiedWebhook) -> None:
+    if not verified.payload.get("provider_subscription_id"):
         logger.warning(
             "Missing provider_subscription_id in %s event",
             verified.event_type,
             extra={"uid": intent.uid, "intent_id": intent.id},
         )
 
-    from app.payments.models import Subscription
-    sub_id = _build_subscription_id(
-        intent.uid, intent.provider, provider_sub_id, intent.providerRef
-    )
-    repos.subscriptions.upsert_subscription(Subscription(
-        id=sub_id,
-        uid=intent.uid,
-        provider=intent.provider,
-        providerSubscriptionId=provider_sub_id or intent.providerRef or "",
-        status="past_due",
-    ))
 
-    # MVP: keep entitlement active during past_due (TODO: add grace period logic)
-    from app.repos import entitlements
-    entitlements.upsert_membership_entitlement(
-        uid=intent.uid,
-        status="active",
-        expires_at=None,
-        source="subscription",
-        provider=intent.provider,
-        provider_subscription_id=provider_sub_id or intent.providerRef or None,
-    )
-    logger.info("Subscription past_due — entitlement kept active (MVP grace)", extra={
-        "uid": intent.uid, "sub_id": sub_id,
-    })
+def _plan_payment_succeeded(intent: IntentRef, verified: VerifiedWebhook) -> StateTransition:
+    """Mark intent as succeeded and grant the appropriate entitlement."""
+    if intent.scope == "course" and intent.courseId:
+        entitlement = entitlements.build_course_entitlement(intent.uid, intent.courseId, source="one_time")
+        return StateTransition(
+            intentId=intent.id,
+            intentPatch={"status": "succeeded"},
+            entitlementId=entitlement["id"],
+            entitlement=entitlement,
+        )
+    if intent.scope == "membership":
+        # Bootstrap subscription record
+        return _subscription_transition(
+            intent, verified, "active", "active", intent_patch={"status": "succeeded"},
+        )
+    return StateTransition(intentId=intent.id, intentPatch={"status": "succeeded"})
 
 
-def _handle_sub_canceled(repos, intent: PaymentIntent, verified: VerifiedWebhook) -> None:
-    """Subscription canceled — update subscription, revoke entitlement."""
-    provider_sub_id = verified.payload.get("provider_subscription_id")
-    if not provider_sub_id:
-        logger.warning(
-            "Missing provider_subscription_id in %s event",
-            verified.event_type,
-            extra={"uid": intent.uid, "intent_id": intent.id},
-        )
+def _plan_payment_failed(intent: IntentRef, verified: VerifiedWebhook) -> StateTransition:
+    return StateTransition(intentId=intent.id, intentPatch={"status": "failed"})
 
-    from app.payments.models import Subscription
-    sub_id = _build_subscription_id(
-        intent.uid, intent.provider, provider_sub_id, intent.providerRef
-    )
-    repos.subscriptions.upsert_subscription(Subscription(
-        id=sub_id,
-        uid=intent.uid,
-        provider=intent.provider,
-        providerSubscriptionId=provider_sub_id or intent.providerRef or "",
-        status="canceled",
-    ))
 
-    from app.repos import entitlements
-    entitlements.upsert_membership_entitlement(
-        uid=intent.uid,
-        status="inactive",
-        expires_at=None,
-        source="subscription",
-        provider=intent.provider,
-        provider_subscription_id=provider_sub_id or intent.providerRef or None,
-    )
+def _plan_sub_renewed(intent: IntentRef, verified: VerifiedWebhook) -> StateTransition:
+    """Subscription renewed — upsert subscription + keep entitlement active."""
+    _warn_missing_sub_id(intent, verified)
+    return _subscription_transition(intent, verified, "active", "active")
+
 
+def _plan_sub_past_due(intent: IntentRef, verified: VerifiedWebhook) -> StateTransition:
+    """Subscription past due — mark subscription, keep entitlement active."""
+    _warn_missing_sub_id(intent, verified)
+    # MVP: keep entitlement active during past_due (TODO: add grace period logic)
+    return _subscription_transition(intent, verified, "past_due", "active")
+
+
+def _plan_sub_canceled(intent: IntentRef, verified: VerifiedWebhook) -> StateTransition:
+    """Subscription canceled — update subscription, revoke entitlement."""
+    _warn_missing_sub_id(intent, verified)
+    return _subscription_transition(intent, verified, "canceled", "inactive")
+
+
+_PLANNERS = {
+    events.PAYMENT_SUCCEEDED: _plan_payment_succeeded,
+    events.PAYMENT_FAILED: _plan_payment_failed,
+    events.SUB_RENEWED: _plan_sub_renewed,
+    events.SUB_PAST_DUE: _plan_sub_past_due,
+    events.SUB_CANCELED: _plan_sub_canceled,
+}
+
+_APPLIED_MESSAGES = {
+    events.PAYMENT_SUCCEEDED: "Payment succeeded, entitlement granted",
+    events.PAYMENT_FAILED: "Payment failed",
+    events.SUB_RENEWED: "Subscription renewed",
+    events.SUB_PAST_DUE: "Subscription past_due — entitlement kept active (MVP grace)",
+    events.SUB_CANCELED: "Subscription canceled",
+}
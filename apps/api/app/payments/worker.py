@@ -0,0 +1,196 @@
+"""
+Background processing for webhooks ingested with WEBHOOK_PROCESSING_MODE=async.
+
+The webhook endpoint only verifies the signature and stores the raw event in
+the inbox (repo_inbox); this worker then runs the regular handle_webhook() on
+it. Failed attempts are retried with exponential backoff
+(WEBHOOK_RETRY_BASE_SECONDS * 2^n); after WEBHOOK_MAX_ATTEMPTS, or at once
+for events that can never succeed (bad signature / payload), the entry is
+dead-lettered for an admin to inspect and retry.
+
+Entries are claimed transactionally with a lease, so several instances can
+run workers side by side. Entries left behind by a restart or a crashed
+instance are picked up by a periodic sweep.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from app.config import settings
+from app.payments import service as payments_service
+from app.payments.errors import WebhookPayloadError, WebhookVerificationError
+from app.payments.repo import get_repos
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed entry is reserved for one worker before others may take it over
+CLAIM_LEASE_SECONDS = 120
+SWEEP_LIMIT = 200
+
+# Failures that a retry cannot fix
+PERMANENT_ERRORS = (WebhookVerificationError, WebhookPayloadError)
+
+
+class WebhookWorker:
+    def __init__(self, concurrency: int, max_attempts: int, retry_base_seconds: float):
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_seconds = retry_base_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retries: Set[asyncio.TimerHandle] = set()
+        self.processed = 0
+        self.retried = 0
+        self.dead_lettered = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks) and not all(t.done() for t in self._tasks)
+
+    def submit(self, inbox_id: str) -> bool:
+        """Queue an inbox entry for processing. False if the worker is not running (the sweep will find it)."""
+        if not self.running:
+            return False
+        self._queue.put_nowait(inbox_id)
+        return True
+
+    def _schedule(self, inbox_id: str, delay: float) -> None:
+        if not self.running:
+            return
+        loop = asyncio.get_running_loop()
+        handle = None
+
+        def fire():
+            self._retries.discard(handle)
+            self.submit(inbox_id)
+
+        handle = loop.call_later(delay, fire)
+        self._retries.add(handle)
+
+    def backoff(self, attempts: int) -> float:
+        return self.retry_base_seconds * 2 ** (attempts - 1)
+
+    async def process(self, inbox_id: str) -> Optional[str]:
+        """
+        Claim and process one entry. Returns its new status, or None if it
+        was not claimable (done, not due, or held by another worker).
+        """
+        repos = get_repos()
+        entry = await repos.inbox.claim(inbox_id, CLAIM_LEASE_SECONDS)
+        if entry is None:
+            return None
+
+        attempts = entry["attempts"]
+        log_ctx = {"inbox_id": inbox_id, "event_type": entry.get("eventType"), "attempt": attempts}
+        try:
+            result = await payments_service.handle_webhook(entry["rawBody"], entry.get("headers") or {})
+        except Exception as exc:
+            now = datetime.now(timezone.utc)
+            if isinstance(exc, PERMANENT_ERRORS) or attempts >= self.max_attempts:
+                await repos.inbox.update(inbox_id, {
+                    "status": "dead_letter",
+                    "lastError": str(exc),
+                    "leaseExpiresAt": None,
+                    "deadLetteredAt": now,
+                })
+                self.dead_lettered += 1
+                logger.error("Webhook dead-lettered", extra={**log_ctx, "error": str(exc)})
+                return "dead_letter"
+
+            delay = self.backoff(attempts)
+            await repos.inbox.update(inbox_id, {
+                "status": "queued",
+                "lastError": str(exc),
+                "leaseExpiresAt": None,
+                "nextAttemptAt": now + timedelta(seconds=delay),
+            })
+            self.retried += 1
+            logger.warning("Webhook processing failed, will retry", extra={**log_ctx, "retry_in": delay, "error": str(exc)})
+            self._schedule(inbox_id, delay)
+            return "queued"
+
+        # Processed: the raw body is only needed for processing, don't keep PII around
+        await repos.inbox.update(inbox_id, {
+            "status": "processed",
+            "rawBody": None,
+            "headers": None,
+            "leaseExpiresAt": None,
+            "result": result,
+            "processedAt": datetime.now(timezone.utc),
+        })
+        self.processed += 1
+        return "processed"
+
+    async def sweep(self) -> int:
+        """Queue every stored entry that is waiting or whose worker lease ran out."""
+        repos = get_repos()
+        now = datetime.now(timezone.utc)
+        entries = await repos.inbox.list_by_status(["queued", "processing"], SWEEP_LIMIT)
+        for entry in entries:
+            due = entry.get("nextAttemptAt") if entry.get("status") == "queued" else entry.get("leaseExpiresAt")
+            delay = (due - now).total_seconds() if due else 0
+            if delay > 0:
+                self._schedule(entry["id"], delay)
+            else:
+                self.submit(entry["id"])
+        return len(entries)
+
+    async def _run(self) -> None:
+        while True:
+            inbox_id = await self._queue.get()
+            try:
+                await self.process(inbox_id)
+            except Exception as e:
+                # Store unavailable: leave the entry as it is and try again later
+                logger.error(f"Webhook worker failed on {inbox_id}: {e}", exc_info=True)
+                self._schedule(inbox_id, self.retry_base_seconds)
+            finally:
+                self._queue.task_done()
+
+    async def _run_sweeper(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning(f"Webhook inbox sweep failed: {e}")
+            await asyncio.sleep(CLAIM_LEASE_SECONDS)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._run_sweeper()))
+
+    async def stop(self) -> None:
+        """Stop the workers (called from the lifespan). Unfinished entries stay in the inbox."""
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "scheduledRetries": len(self._retries),
+            "processed": self.processed,
+            "retried": self.retried,
+            "deadLettered": self.dead_lettered,
+        }
+
+    def clear(self):
+        """For testing"""
+        self.processed = self.retried = self.dead_lettered = 0
+
+webhook_worker = WebhookWorker(
+    concurrency=settings.WEBHOOK_WORKER_CONCURRENCY,
+    max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+    retry_base_seconds=settings.WEBHOOK_RETRY_BASE_SECONDS,
+)
@@ -1,5 +1,6 @@
 """
 Activity events repo — best-effort write + list for observability.
+Writes go through the background event sink when it is running.
 
 No PII stored. Only uid (opaque ID), resource IDs, and timestamps.
 """
@@ -9,12 +10,14 @@ import uuid
 from datetime import datetime, timezone
 from typing import Optional
 
-from app.repos.firestore import get_db
+from app.repos.firestore import get_async_db
+from app.repos import activity_sketches
+from app.services.event_sink import event_sink
 
 logger = logging.getLogger(__name__)
 
 
-def write_event(
+async def write_event(
     event_type: str,
     uid: str,
     course_id: Optional[str] = None,
@@ -22,25 +25,30 @@ def write_event(
     plan_id: Optional[str] = None,
 ) -> None:
     """Best-effort write. Never raises."""
+    activity_sketches.record(uid)
+    doc_id = uuid.uuid4().hex
+    event = {
+        "id": doc_id,
+        "type": event_type,
+        "uid": uid,
+        "courseId": course_id,
+        "lessonId": lesson_id,
+        "planId": plan_id,
+        "createdAt": datetime.now(timezone.utc),
+    }
+    if event_sink.running:
+        event_sink.enqueue("activity_events", doc_id, event)
+        return
     try:
-        db = get_db()
-        doc_id = uuid.uuid4().hex
-        db.collection("activity_events").document(doc_id).set({
-            "id": doc_id,
-            "type": event_type,
-            "uid": uid,
-            "courseId": course_id,
-            "lessonId": lesson_id,
-            "planId": plan_id,
-            "createdAt": datetime.now(timezone.utc),
-        })
+        db = get_async_db()
+        await db.collection("activity_events").document(doc_id).set(event)
     except Exception as e:
         logger.warning(f"Failed to write activity event: {e}")
 
 
-def list_recent(limit: int = 50) -> list:
+async def list_recent(limit: int = 50) -> list:
     """Read recent events, newest first. order_by with Python-sort fallback."""
-    db = get_db()
+    db = get_async_db()
     try:
         from google.cloud.firestore_v1 import Query
         query = (
@@ -48,10 +56,10 @@ def list_recent(limit: int = 50) -> list:
             .order_by("createdAt", direction=Query.DESCENDING)
             .limit(limit)
         )
-        results = [{"id": d.id, **d.to_dict()} for d in query.stream()]
+        results = [{"id": d.id, **d.to_dict()} async for d in query.stream()]
     except Exception:
         # Fallback: fetch without ordering, sort in Python
         query = db.collection("activity_events").limit(limit)
-        results = [{"id": d.id, **d.to_dict()} for d in query.stream()]
+        results = [{"id": d.id, **d.to_dict()} async for d in query.stream()]
         results.sort(key=lambda x: str(x.get("createdAt", "")), reverse=True)
     return results
@@ -0,0 +1,153 @@
+"""
+Per-day HyperLogLog sketches of distinct active uids.
+Collection: activity_sketches
+
+Doc ID is the UTC date (YYYY-MM-DD); `registers` holds the sketch bytes
+(4 KiB at the default precision). write_event feeds an in-process sketch
+per day, and a background task merges dirty days into Firestore inside a
+transaction. Merges are register-wise max, so retries and concurrent
+instances never double count. DAU/WAU/MAU read at most 30 docs and never
+scan activity_events.
+"""
+
+import asyncio
+import logging
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from google.cloud import firestore
+
+from app.repos.firestore import get_async_db
+from app.services.hll import DEFAULT_PRECISION, HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "activity_sketches"
+
+# day -> local sketch; once flushed, only today and yesterday are kept
+_local: Dict[str, HyperLogLog] = {}
+_dirty: set = set()
+_lock = threading.Lock()
+
+
+def _day(value: datetime) -> str:
+    return value.astimezone(timezone.utc).date().isoformat()
+
+
+def record(uid: str, at: Optional[datetime] = None) -> None:
+    """Note an active uid in the local sketch for its day (no I/O)."""
+    if not uid:
+        return
+    day = _day(at or datetime.now(timezone.utc))
+    with _lock:
+        sketch = _local.get(day)
+        if sketch is None:
+            sketch = _local[day] = HyperLogLog()
+        if sketch.add(uid):
+            _dirty.add(day)
+
+
+def _sketch_from_doc(data: Optional[dict]) -> Optional[HyperLogLog]:
+    if not data or not data.get("registers"):
+        return None
+    return HyperLogLog.from_bytes(bytes(data["registers"]), data.get("precision", DEFAULT_PRECISION))
+
+
+async def merge_into_store(day: str, sketch: HyperLogLog) -> None:
+    """Register-wise max of `sketch` into activity_sketches/{day}."""
+    db = get_async_db()
+    ref = db.collection(COLLECTION).document(day)
+
+    @firestore.async_transactional
+    async def txn_fn(txn: firestore.AsyncTransaction) -> None:
+        snap = await ref.get(transaction=txn)
+        stored = _sketch_from_doc(snap.to_dict() if snap.exists else None) or HyperLogLog(sketch.precision)
+        if not stored.merge(sketch) and snap.exists:
+            return
+        txn.set(ref, {
+            "date": day,
+            "precision": stored.precision,
+            "registers": stored.to_bytes(),
+            "updatedAt": datetime.now(timezone.utc),
+        })
+
+    await txn_fn(db.transaction())
+
+
+async def flush() -> None:
+    """Merge every dirty local sketch into the store and drop stale days."""
+    with _lock:
+        pending = {day: HyperLogLog(s.precision, s.to_bytes()) for day, s in _local.items() if day in _dirty}
+        _dirty.clear()
+    for day, sketch in pending.items():
+        try:
+            await merge_into_store(day, sketch)
+        except Exception as e:
+            logger.warning(f"Activity sketch flush failed for {day}: {e}")
+            with _lock:
+                _dirty.add(day)
+
+    keep = {_day(datetime.now(timezone.utc) - timedelta(days=n)) for n in (0, 1)}
+    with _lock:
+        for day in [d for d in _local if d not in keep and d not in _dirty]:
+            del _local[day]
+
+
+async def run_flusher(interval_seconds: int) -> None:
+    """Background loop started from the app lifespan."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        await flush()
+
+
+async def load_sketches(days: List[str]) -> Dict[str, HyperLogLog]:
+    db = get_async_db()
+    refs = [db.collection(COLLECTION).document(day) for day in days]
+    out = {}
+    async for snap in db.get_all(refs):
+        sketch = _sketch_from_doc(snap.to_dict() if snap.exists else None)
+        if sketch is not None:
+            out[snap.id] = sketch
+    return out
+
+
+async def get_active_users(as_of: date) -> dict:
+    """Distinct active users for the day, trailing 7 days and trailing 30 days ending at as_of."""
+    days = [(as_of - timedelta(days=n)).isoformat() for n in range(30)]
+    sketches = await load_sketches(days)
+
+    def uniques(n: int) -> int:
+        return HyperLogLog.union(sketches[d] for d in days[:n] if d in sketches).count()
+
+    return {"date": as_of.isoformat(), "dau": uniques(1), "wau": uniques(7), "mau": uniques(30)}
+
+
+async def rebuild_from_events(days: int = 30) -> int:
+    """
+    Recompute the last N days' sketches from activity_events (one-off backfill
+    for events written before sketches existed). Returns days written.
+    """
+    db = get_async_db()
+    end = datetime.now(timezone.utc).date()
+    start = datetime.combine(end - timedelta(days=days - 1), datetime.min.time(), tzinfo=timezone.utc)
+
+    rebuilt: Dict[str, HyperLogLog] = {}
+    query = db.collection("activity_events").where("createdAt", ">=", start)
+    async for doc in query.stream():
+        data = doc.to_dict()
+        created_at, uid = data.get("createdAt"), data.get("uid")
+        if not uid or not isinstance(created_at, datetime):
+            continue
+        rebuilt.setdefault(_day(created_at), HyperLogLog()).add(uid)
+
+    for day, sketch in rebuilt.items():
+        await merge_into_store(day, sketch)
+    return len(rebuilt)
+
+
+def clear():
+    """For testing"""
+    with _lock:
+        _local.clear()
+        _dirty.clear()
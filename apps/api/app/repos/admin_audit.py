@@ -1,11 +1,12 @@
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional
-from app.repos.firestore import get_db
+from app.repos.firestore import get_async_db
+from app.services.event_sink import event_sink
 import logging
 
 logger = logging.getLogger(__name__)
 
-def write_audit(
+async def write_audit(
     action: str,
     entity_type: str,
     entity_id: str,
@@ -15,9 +16,9 @@ def write_audit(
     """
     Write an audit log entry for an admin action.
     Payload is summarized/sanitized to avoid storing huge blobs or secrets.
+    Written through the background event sink when it is running.
     """
-    db = get_db()
-    
+
     # Sanitize payload
     safe_payload = {}
     if payload:
@@ -40,8 +41,14 @@ def write_audit(
         "payloadSummary": safe_payload
     }
     
+    if event_sink.running:
+        if not event_sink.enqueue("admin_audit", None, audit_entry):
+            logger.error(f"Audit log dropped (event sink full): {action} {entity_type}/{entity_id}")
+        return
+
     try:
-        db.collection("admin_audit").add(audit_entry)
+        db = get_async_db()
+        await db.collection("admin_audit").add(audit_entry)
     except Exception as e:
         # Audit logging should not break the main flow, but we MUST log the failure
         logger.error(f"Failed to write audit log: {e}", exc_info=True)
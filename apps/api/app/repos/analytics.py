@@ -1,77 +1,131 @@
+"""
+Daily growth rollups.
+Collection: stats_daily
+
+Doc ID is the UTC date (YYYY-MM-DD). Holds:
+- signups: users created that day
+- active: distinct users who signed in that day
+
+Maintained incrementally at sign-in (routers/auth.verify_magic_link);
+backfill_daily_stats rebuilds a window from the users collection for days
+that predate the rollups.
+"""
+
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Any
-from app.repos.firestore import get_db
+from typing import List, Dict, Any, Optional
+from google.cloud import firestore
+from app.repos.firestore import get_async_db
+
+COLLECTION = "stats_daily"
+
+# Firestore caps a write batch at 500 operations
+_BATCH_SIZE = 500
+
+
+def day_key(value: Any) -> Optional[str]:
+    """UTC date string for a Firestore datetime (or ISO string), else None."""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).date().isoformat()
+
+
+def _window(days: int) -> List[str]:
+    end_date = datetime.now(timezone.utc).date()
+    start_date = end_date - timedelta(days=days - 1)
+    return [(start_date + timedelta(days=i)).isoformat() for i in range(days)]
+
+
+async def _increment(now: datetime, **fields: int) -> None:
+    db = get_async_db()
+    key = day_key(now)
+    updates = {name: firestore.Increment(n) for name, n in fields.items()}
+    await db.collection(COLLECTION).document(key).set(
+        {"date": key, **updates, "updatedAt": now}, merge=True
+    )
+
 
-def get_growth_data(days: int = 30) -> List[Dict[str, Any]]:
+async def record_signup(now: datetime) -> None:
+    """A new user signed in for the first time (counts as active too)."""
+    await _increment(now, signups=1, active=1)
+
+
+async def record_active(now: datetime, previous_seen_at: Any) -> None:
+    """A returning user signed in; counted once per day."""
+    if day_key(previous_seen_at) == day_key(now):
+        return
+    await _increment(now, active=1)
+
+
+async def get_growth_data(days: int = 30) -> List[Dict[str, Any]]:
     """
-    Aggregates daily signups and active users for the last N days.
+    Daily signups and active users for the last N days, from N rollup docs.
     Returns a list of dicts: { "date": "YYYY-MM-DD", "signups": int, "active": int }
     """
-    db = get_db()
-    users_ref = db.collection("users")
-    
-    # We'll fetch all users (for MVP scale) and aggregate in-memory.
-    # For scale, this should be a scheduled job writing to a stats collection.
-    
-    # Fetch fields needed: createdAt, lastSeenAt
-    # stream() gets full docs, but we can't select fields easily in python client without projecting,
-    # and projections are sometimes tricky in emulators/older libs. Full doc is fine for MVP size.
-    
-    docs = users_ref.stream()
-    
-    # Initialize buckets
-    end_date = datetime.now(timezone.utc).date()
-    start_date = end_date - timedelta(days=days-1)
-    
-    data_map = {}
-    current = start_date
-    while current <= end_date:
-        fmt = current.isoformat()
-        data_map[fmt] = {"date": fmt, "signups": 0, "active": 0}
-        current += timedelta(days=1)
-        
-    for doc in docs:
-        d = doc.to_dict()
-        
-        # 1. Signups (based on createdAt)
-        created_at = d.get("createdAt")
-        if created_at:
-             # Handle Firestore datetime vs string
-            if hasattr(created_at, 'date'):
-                c_date = created_at.astimezone(timezone.utc).date().isoformat()
-            else:
-                # Fallback if stored as string? or just skip
-                try:
-                    c_date = datetime.fromisoformat(str(created_at)).date().isoformat()
-                except:
-                    c_date = None
-            
-            if c_date and c_date in data_map:
-                data_map[c_date]["signups"] += 1
-                
-        # 2. Daily Active Users (DAU)? 
-        # Actually "Active Users" usually means unique users active ON that day.
-        # But we only store `lastSeenAt`. We don't have a daily activity log.
-        # So `lastSeenAt` only gives us the LAST day they were active.
-        # We can't reconstruct historical DAU from just `lastSeenAt`.
-        # Alternative interpretation: "Active users" = Cumulative count of users who have been active within last X days?
-        # OR: Just chart "New Signups" vs "Users Last Seen This Day".
-        # Let's do "lastSeenAt" distribution for now, as that's what we have.
-        # It shows "Recency" distribution.
-        
-        last_seen = d.get("lastSeenAt")
-        if last_seen:
-            if hasattr(last_seen, 'date'):
-                l_date = last_seen.astimezone(timezone.utc).date().isoformat()
-            else:
-                try:
-                    l_date = datetime.fromisoformat(str(last_seen)).date().isoformat()
-                except:
-                    l_date = None
-            
-            if l_date and l_date in data_map:
-                data_map[l_date]["active"] += 1
-
-    # Convert to sorted list
-    result = sorted(data_map.values(), key=lambda x: x["date"])
-    return result
+    db = get_async_db()
+    dates = _window(days)
+    refs = [db.collection(COLLECTION).document(d) for d in dates]
+
+    data_map = {d: {"date": d, "signups": 0, "active": 0} for d in dates}
+    async for snap in db.get_all(refs):
+        if snap.exists:
+            doc = snap.to_dict()
+            data_map[snap.id]["signups"] = int(doc.get("signups") or 0)
+            data_map[snap.id]["active"] = int(doc.get("active") or 0)
+
+    return [data_map[d] for d in dates]
+
+
+async def backfill_daily_stats(days: int = 90) -> int:
+    """
+    Recompute the rollups for the last N days from the users collection.
+    Only lastSeenAt is stored per user, so historical "active" counts are
+    users whose latest sign-in fell on that day; that is why only days with
+    no rollup doc (or an earlier backfilled one) are written. Rollups kept
+    by record_signup/record_active, and today, are left alone.
+    Returns the number of rollup docs written.
+    """
+    db = get_async_db()
+    window = _window(days)[:-1]
+    if not window:
+        return 0
+    refs = [db.collection(COLLECTION).document(d) for d in window]
+    live = set()
+    async for snap in db.get_all(refs):
+        if snap.exists and not snap.to_dict().get("backfilledAt"):
+            live.add(snap.id)
+    dates = [d for d in window if d not in live]
+    if not dates:
+        return 0
+    start = datetime.fromisoformat(window[0]).replace(tzinfo=timezone.utc)
+    buckets = {d: {"date": d, "signups": 0, "active": 0} for d in dates}
+
+    users = db.collection("users")
+    async for doc in users.where("createdAt", ">=", start).stream():
+        key = day_key(doc.to_dict().get("createdAt"))
+        if key in buckets:
+            buckets[key]["signups"] += 1
+    async for doc in users.where("lastSeenAt", ">=", start).stream():
+        key = day_key(doc.to_dict().get("lastSeenAt"))
+        if key in buckets:
+            buckets[key]["active"] += 1
+
+    now = datetime.now(timezone.utc)
+    batch = db.batch()
+    pending = 0
+    for d in dates:
+        batch.set(db.collection(COLLECTION).document(d), {**buckets[d], "updatedAt": now, "backfilledAt": now})
+        pending += 1
+        if pending == _BATCH_SIZE:
+            await batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        await batch.commit()
+    return len(dates)
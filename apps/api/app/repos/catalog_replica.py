@@ -0,0 +1,103 @@
+"""
+In-process replica of the public catalog (courses, lessons, plans).
+
+Each collection is loaded once and kept current by a Firestore on_snapshot
+listener. Public catalog and search reads are served from memory while the
+listener is healthy; otherwise repos fall back to direct Firestore queries.
+
+Enabled with CATALOG_REPLICA_ENABLED. Listener callbacks run on background
+threads (sync client), so each update swaps in a fresh dict rather than
+mutating the one readers may be iterating.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.repos.firestore import get_db
+from app.repos import search_index
+
+logger = logging.getLogger(__name__)
+
+CATALOG_COLLECTIONS = ("courses", "lessons", "plans")
+
+# collection -> {doc_id: data}; replaced wholesale on every snapshot
+_docs: Dict[str, Dict[str, dict]] = {}
+_watches: Dict[str, object] = {}
+_lock = threading.Lock()
+
+
+def _on_snapshot(collection: str):
+    def callback(doc_snapshots, changes, read_time) -> None:
+        fresh = {snap.id: snap.to_dict() for snap in doc_snapshots if snap.exists}
+        previous = _docs.get(collection, {})
+        _docs[collection] = fresh
+        search_index.sync_collection(collection, previous, fresh)
+        logger.info(
+            "Catalog replica updated",
+            extra={"collection": collection, "docs": len(fresh), "changes": len(changes)},
+        )
+    return callback
+
+
+def start(db=None) -> None:
+    """Attach snapshot listeners for every catalog collection. Idempotent."""
+    db = db or get_db()
+    with _lock:
+        for collection in CATALOG_COLLECTIONS:
+            if collection in _watches:
+                continue
+            _watches[collection] = db.collection(collection).on_snapshot(_on_snapshot(collection))
+    logger.info("Catalog replica listeners started")
+
+
+def stop() -> None:
+    """Detach all listeners and drop replicated data."""
+    with _lock:
+        for watch in _watches.values():
+            try:
+                watch.unsubscribe()
+            except Exception as e:
+                logger.warning(f"Catalog replica unsubscribe failed: {e}")
+        _watches.clear()
+        _docs.clear()
+    search_index.search_index.reset()
+
+
+def is_healthy(collection: str) -> bool:
+    """True once the initial snapshot has arrived and the listener is still streaming."""
+    watch = _watches.get(collection)
+    if watch is None or collection not in _docs:
+        return False
+    return bool(getattr(watch, "is_active", False))
+
+
+def is_serving() -> bool:
+    """True while every catalog collection is served from the replica."""
+    return all(is_healthy(collection) for collection in CATALOG_COLLECTIONS)
+
+
+def snapshot(collection: str) -> Optional[Dict[str, dict]]:
+    """
+    Current replicated documents for a collection, or None if the replica
+    cannot serve it (disabled, still loading, or listener down).
+    Callers must treat the returned dicts as read-only.
+    """
+    if not is_healthy(collection):
+        return None
+    return _docs.get(collection)
+
+
+def select(docs: Dict[str, dict], limit: int, **equals: Any) -> List[Tuple[str, dict]]:
+    """
+    Filter replicated docs by field equality, ordered by document id
+    (matching Firestore's default query order).
+    """
+    out = []
+    for doc_id in sorted(docs):
+        data = docs[doc_id]
+        if all(data.get(field) == value for field, value in equals.items()):
+            out.append((doc_id, data))
+            if len(out) >= limit:
+                break
+    return out
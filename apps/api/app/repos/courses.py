@@ -1,11 +1,19 @@
 from typing import List, Optional
 from datetime import datetime, timezone
 from google.cloud import firestore
-from app.repos.firestore import get_db
+from app.repos.firestore import get_async_db
+from app.repos.loader import get_doc, forget_doc
+from app.repos import catalog_replica
+from app.repos.search_index import search_index
 from app.models import CoursePublic
 
-def list_published_courses(limit: int = 100) -> List[CoursePublic]:
-    db = get_db()
+async def list_published_courses(limit: int = 100) -> List[CoursePublic]:
+    replicated = catalog_replica.snapshot("courses")
+    if replicated is not None:
+        rows = catalog_replica.select(replicated, limit, published=True)
+        return [CoursePublic(id=doc_id, **data) for doc_id, data in rows]
+
+    db = get_async_db()
     
     # Standard syntax for pinned google-cloud-firestore
     query = (
@@ -14,29 +22,32 @@ def list_published_courses(limit: int = 100) -> List[CoursePublic]:
         .limit(limit)
     )
     
-    docs = query.stream()
-    return [CoursePublic(id=doc.id, **doc.to_dict()) for doc in docs]
+    return [CoursePublic(id=doc.id, **doc.to_dict()) async for doc in query.stream()]
 
-def get_published_course(course_id: str) -> Optional[CoursePublic]:
-    db = get_db()
-    doc = db.collection("courses").document(course_id).get()
-    
-    if not doc.exists:
+async def get_published_course(course_id: str) -> Optional[CoursePublic]:
+    replicated = catalog_replica.snapshot("courses")
+    if replicated is not None:
+        data = replicated.get(course_id)
+    else:
+        data = await get_doc("courses", course_id)
+    if data is None:
         return None
     
-    data = doc.to_dict()
     if not data.get("published"):
         return None
         
-    return CoursePublic(id=doc.id, **data)
+    return CoursePublic(id=course_id, **data)
 
-def search_published_courses(query_text: str) -> List[CoursePublic]:
-    # Basic client-side search for v1
-    # Fetch all published courses (dataset is small)
-    all_courses = list_published_courses(limit=200)
-    
+async def search_published_courses(query_text: str, limit: int = 200) -> List[CoursePublic]:
     if not query_text:
         return []
+
+    indexed = search_index.search("courses", query_text, limit)
+    if indexed is not None:
+        return [CoursePublic(id=doc_id, **data) for doc_id, data in indexed]
+
+    # Index not loaded yet: client-side scan of published courses (capped)
+    all_courses = await list_published_courses(limit=200)
         
     q = query_text.lower()
     results = []
@@ -47,25 +58,24 @@ def search_published_courses(query_text: str) -> List[CoursePublic]:
 
 # --- Admin CRUD ---
 
-def get_course_admin(course_id: str) -> Optional[dict]:
-    db = get_db()
-    snap = db.collection("courses").document(course_id).get()
-    if not snap.exists:
+async def get_course_admin(course_id: str) -> Optional[dict]:
+    data = await get_doc("courses", course_id)
+    if data is None:
         return None
-    return {"id": snap.id, **snap.to_dict()}
+    return {"id": course_id, **data}
 
-def list_courses_admin(limit: int = 200) -> List[dict]:
-    db = get_db()
+async def list_courses_admin(limit: int = 200) -> List[dict]:
+    db = get_async_db()
     # Order by createdAt DESC
     docs = db.collection("courses").order_by("createdAt", direction=firestore.Query.DESCENDING).limit(limit).stream()
     out = []
-    for d in docs:
+    async for d in docs:
         data = d.to_dict()
         out.append({"id": d.id, **data})
     return out
 
-def create_course(data: dict) -> str:
-    db = get_db()
+async def create_course(data: dict) -> str:
+    db = get_async_db()
     now = datetime.now(timezone.utc)
     payload = {
         "titleHe": data["titleHe"],
@@ -78,17 +88,18 @@ def create_course(data: dict) -> str:
         "updatedAt": now,
     }
     ref = db.collection("courses").document()
-    ref.set(payload)
+    await ref.set(payload)
+    search_index.upsert("courses", ref.id, payload)
     return ref.id
 
-def update_course(course_id: str, data: dict) -> None:
-    db = get_db()
+async def update_course(course_id: str, data: dict) -> None:
+    db = get_async_db()
     ref = db.collection("courses").document(course_id)
     # Check existence to ensure we don't create phantom doc on merge if id is wrong?
     # But for firestore update() it fails if not exists.
     # set(..., merge=True) creates if not exists.
     # User requested: raise KeyError if not found.
-    snap = ref.get()
+    snap = await ref.get()
     if not snap.exists:
         raise KeyError("Course not found")
 
@@ -104,18 +115,26 @@ def update_course(course_id: str, data: dict) -> None:
     if data.get("published") is not None:
         updates["published"] = bool(data["published"])
 
-    ref.update(updates)
+    await ref.update(updates)
+    forget_doc("courses", course_id)
+    search_index.upsert("courses", course_id, {**snap.to_dict(), **updates})
 
-def delete_course(course_id: str) -> None:
-    db = get_db()
+async def delete_course(course_id: str) -> None:
+    db = get_async_db()
     ref = db.collection("courses").document(course_id)
-    if not ref.get().exists:
+    if not (await ref.get()).exists:
         raise KeyError("Course not found")
-    ref.delete()
+    await ref.delete()
+    forget_doc("courses", course_id)
+    search_index.remove("courses", course_id)
 
-def set_course_published(course_id: str, published: bool) -> None:
-    db = get_db()
+async def set_course_published(course_id: str, published: bool) -> None:
+    db = get_async_db()
     ref = db.collection("courses").document(course_id)
-    if not ref.get().exists:
+    snap = await ref.get()
+    if not snap.exists:
         raise KeyError("Course not found")
-    ref.update({"published": published, "updatedAt": datetime.now(timezone.utc)})
+    updates = {"published": published, "updatedAt": datetime.now(timezone.utc)}
+    await ref.update(updates)
+    forget_doc("courses", course_id)
+    search_index.upsert("courses", course_id, {**snap.to_dict(), **updates})
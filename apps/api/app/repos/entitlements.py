@@ -1,6 +1,9 @@
 from datetime import datetime, timezone
-from typing import Optional, Literal
-from app.repos.firestore import get_db
+from typing import Optional, Literal, Tuple
+from google.cloud import firestore
+from app.repos.firestore import get_async_db
+from app.repos.loader import get_doc, forget_doc
+from app.repos import user_access
 
 def _get_course_entitlement_id(uid: str, course_id: str) -> str:
     return f"ent_course_{uid}_{course_id}"
@@ -8,34 +11,113 @@ def _get_course_entitlement_id(uid: str, course_id: str) -> str:
 def _get_membership_entitlement_id(uid: str) -> str:
     return f"ent_membership_{uid}"
 
-def upsert_course_entitlement(
-    uid: str,
-    course_id: str,
-    source: str = "one_time"
+async def read_for_update(
+    txn: firestore.AsyncTransaction,
+    db: firestore.AsyncClient,
+    ent_id: str,
+    data: dict,
+    require_existing: bool = False,
+    created_at: Optional[datetime] = None,
+) -> Tuple[dict, dict, dict]:
+    """
+    Read phase of an entitlement write inside a caller's transaction.
+    Returns (payload to merge, entitlement as it will be stored, access doc
+    with it folded in); pass the first and last to stage_write().
+    Raises KeyError if require_existing and the entitlement does not exist.
+    """
+    snap = await db.collection("entitlements").document(ent_id).get(transaction=txn)
+    if require_existing and not snap.exists:
+        raise KeyError(f"Entitlement {ent_id} not found")
+
+    payload = dict(data)
+    if created_at is not None and not snap.exists:
+        payload["createdAt"] = created_at
+    merged = {**(snap.to_dict() if snap.exists else {}), **payload}
+
+    access = await user_access.load_for_update(txn, db, merged["uid"])
+    user_access.apply_entitlement(access, merged)
+    return payload, merged, access
+
+def stage_write(
+    txn: firestore.AsyncTransaction,
+    db: firestore.AsyncClient,
+    ent_id: str,
+    payload: dict,
+    access: dict,
 ) -> None:
+    txn.set(db.collection("entitlements").document(ent_id), payload, merge=True)
+    user_access.stage_write(txn, db, access)
+
+def forget(ent_id: str, uid: str) -> None:
+    """Drop cached copies after a committed write."""
+    forget_doc("entitlements", ent_id)
+    forget_doc(user_access.COLLECTION, uid)
+
+async def _write_entitlement(
+    ent_id: str,
+    data: dict,
+    require_existing: bool = False,
+    created_at: Optional[datetime] = None,
+) -> dict:
     """
-    Grant access to a specific course.
+    Merge `data` into an entitlement and fold the result into user_access/{uid},
+    atomically. Returns the entitlement as stored.
+    Raises KeyError if require_existing and the entitlement does not exist.
+    """
+    db = get_async_db()
+
+    @firestore.async_transactional
+    async def txn_fn(txn: firestore.AsyncTransaction) -> dict:
+        # All reads must happen before any writes
+        payload, merged, access = await read_for_update(txn, db, ent_id, data, require_existing, created_at)
+        stage_write(txn, db, ent_id, payload, access)
+        return merged
+
+    result = await txn_fn(db.transaction())
+    forget(ent_id, result["uid"])
+    return result
+
+async def merge_entitlement(ent_id: str, data: dict) -> dict:
+    """
+    Merge prepared fields (build_*_entitlement) into an entitlement and
+    user_access/{uid}. For payment transitions applied outside a Firestore
+    transaction, i.e. the in-memory payments repo.
+    """
+    return await _write_entitlement(ent_id, data)
+
+def build_course_entitlement(uid: str, course_id: str, source: str = "one_time") -> dict:
+    """
+    Build an active course entitlement document.
+    Shared with the payment webhook transitions.
     """
-    db = get_db()
     ent_id = _get_course_entitlement_id(uid, course_id)
-    doc_ref = db.collection("entitlements").document(ent_id)
-    
-    data = {
+    now = datetime.now(timezone.utc)
+    return {
         "id": ent_id,
         "uid": uid,
         "kind": "course",
         "courseId": course_id,
         "status": "active",
         "source": source,
-        "createdAt": datetime.now(timezone.utc),
-        "updatedAt": datetime.now(timezone.utc)
+        "createdAt": now,
+        "updatedAt": now
     }
+
+async def upsert_course_entitlement(
+    uid: str,
+    course_id: str,
+    source: str = "one_time"
+) -> None:
+    """
+    Grant access to a specific course.
+    """
+    data = build_course_entitlement(uid, course_id, source)
     
-    # Merge=True to avoid overwriting unrelated fields if schema evolves, 
+    # Merge to avoid overwriting unrelated fields if schema evolves, 
     # though for course entitlement, simple set is usually fine.
-    doc_ref.set(data, merge=True)
+    await _write_entitlement(data["id"], data)
 
-def upsert_membership_entitlement(
+def build_membership_entitlement(
     uid: str,
     status: Literal["active", "inactive"],
     expires_at: Optional[datetime],
@@ -43,15 +125,13 @@ def upsert_membership_entitlement(
     provider: Optional[str] = None,
     provider_subscription_id: Optional[str] = None,
     stripe_subscription_id: Optional[str] = None,   # legacy optional
-) -> None:
+) -> dict:
     """
-    Update membership entitlement status.
+    Build the membership entitlement fields to merge.
     Writes provider-neutral fields (billingProvider, billingSubscriptionId)
     when provided. Keeps stripeSubscriptionId for legacy callers.
     """
-    db = get_db()
     ent_id = _get_membership_entitlement_id(uid)
-    doc_ref = db.collection("entitlements").document(ent_id)
     
     data = {
         "id": ent_id,
@@ -74,37 +154,41 @@ def upsert_membership_entitlement(
     
     if expires_at is not None:
         data["expiresAt"] = expires_at
-        
-    doc_ref.set(data, merge=True)
+    return data
 
-def get_membership_entitlement(uid: str) -> Optional[dict]:
-    db = get_db()
-    ent_id = _get_membership_entitlement_id(uid)
-    doc = db.collection("entitlements").document(ent_id).get()
-    return doc.to_dict() if doc.exists else None
+async def upsert_membership_entitlement(
+    uid: str,
+    status: Literal["active", "inactive"],
+    expires_at: Optional[datetime],
+    source: str = "subscription",
+    provider: Optional[str] = None,
+    provider_subscription_id: Optional[str] = None,
+    stripe_subscription_id: Optional[str] = None,   # legacy optional
+) -> None:
+    """
+    Update membership entitlement status.
+    """
+    data = build_membership_entitlement(
+        uid, status, expires_at, source, provider, provider_subscription_id, stripe_subscription_id
+    )
+    await _write_entitlement(data["id"], data)
 
-def get_course_entitlement(uid: str, course_id: str) -> Optional[dict]:
-    db = get_db()
-    ent_id = _get_course_entitlement_id(uid, course_id)
-    doc = db.collection("entitlements").document(ent_id).get()
-    return doc.to_dict() if doc.exists else None
+async def get_membership_entitlement(uid: str) -> Optional[dict]:
+    return await get_doc("entitlements", _get_membership_entitlement_id(uid))
+
+async def get_course_entitlement(uid: str, course_id: str) -> Optional[dict]:
+    return await get_doc("entitlements", _get_course_entitlement_id(uid, course_id))
 
-def grant_course(uid: str, course_id: str, source: str = "manual") -> dict:
+async def grant_course(uid: str, course_id: str, source: str = "manual") -> dict:
     """
     Grant access to a course. 
     If active, idempotent. 
     If inactive, reactivates.
     Returns the entitlement dict.
     """
-    db = get_db()
     ent_id = _get_course_entitlement_id(uid, course_id)
-    doc_ref = db.collection("entitlements").document(ent_id)
-    
     now = datetime.now(timezone.utc)
     
-    # Transactional update might be safer but for MVP admin override, set w/ merge is fine.
-    # We want to ensure we return the final state.
-    
     data = {
         "id": ent_id,
         "uid": uid,
@@ -115,44 +199,28 @@ def grant_course(uid: str, course_id: str, source: str = "manual") -> dict:
         "updatedAt": now
     }
     
-    # If new, add createdAt
-    doc = doc_ref.get()
-    if not doc.exists:
-        data["createdAt"] = now
-    
-    doc_ref.set(data, merge=True)
-    
-    # Return fresh state
-    return doc_ref.get().to_dict()
+    # createdAt is only added if the entitlement is new; returns the final state
+    return await _write_entitlement(ent_id, data, created_at=now)
 
-def set_status(ent_id: str, status: Literal["active", "inactive"]) -> dict:
+async def set_status(ent_id: str, status: Literal["active", "inactive"]) -> dict:
     """
     Set entitlement status (e.g. revoke).
     Returns the updated dictionary.
     Raises KeyError if not found.
     """
-    db = get_db()
-    doc_ref = db.collection("entitlements").document(ent_id)
-    
-    doc = doc_ref.get()
-    if not doc.exists:
-        raise KeyError(f"Entitlement {ent_id} not found")
-        
     update_data = {
         "status": status,
         "updatedAt": datetime.now(timezone.utc)
     }
     
-    doc_ref.update(update_data)
-    
     # Return updated
-    return doc_ref.get().to_dict()
+    return await _write_entitlement(ent_id, update_data, require_existing=True)
 
-def list_entitlements(uid: str) -> list[dict]:
+async def list_entitlements(uid: str) -> list[dict]:
     """
     Read all entitlements for a user.
     """
-    db = get_db()
+    db = get_async_db()
     # Simple query
     query = db.collection("entitlements").where("uid", "==", uid)
-    return [doc.to_dict() for doc in query.stream()]
+    return [doc.to_dict() async for doc in query.stream()]
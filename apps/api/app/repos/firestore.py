@@ -1,14 +1,40 @@
+import asyncio
+
 from google.cloud import firestore
 from app.config import settings
 
 _db = None
+_async_db = None
+_async_db_loop = None
+
+def _project_id() -> str:
+    return settings.FIREBASE_PROJECT_ID or settings.PROJECT_ID
 
 def get_db() -> firestore.Client:
     """
     Get a singleton Firestore client.
+    Synchronous — reserved for scripts and background threads (seeding, listeners).
+    Request handlers should use get_async_db().
     """
     global _db
     if _db is None:
-        project_id = settings.FIREBASE_PROJECT_ID or settings.PROJECT_ID
-        _db = firestore.Client(project=project_id)
+        _db = firestore.Client(project=_project_id())
     return _db
+
+def get_async_db() -> firestore.AsyncClient:
+    """
+    Get the Firestore AsyncClient for the running event loop.
+
+    gRPC aio channels are bound to the loop they were created on, so the
+    client is rebuilt if the loop changes (e.g. TestClient portals).
+    Under uvicorn there is a single loop per worker, so this is a singleton.
+    """
+    global _async_db, _async_db_loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if _async_db is None or (loop is not None and loop is not _async_db_loop):
+        _async_db = firestore.AsyncClient(project=_project_id())
+        _async_db_loop = loop
+    return _async_db
@@ -1,31 +1,43 @@
 from typing import List, Optional
 from datetime import datetime, timezone
-from app.repos.firestore import get_db
+from app.repos.firestore import get_async_db
+from app.repos.loader import get_doc, forget_doc
+from app.repos import catalog_replica
+from app.repos.search_index import search_index
 from app.models import LessonPublic
 
-def search_published_lessons(query_text: str, limit: int = 50) -> List[LessonPublic]:
-    # Using client-side filter for broad search in v1
-    # If dataset grows, we need specific indexes or external search.
-    
+def _lesson_public(doc_id: str, data: dict) -> LessonPublic:
+    has_video = bool(data.get("vimeoVideoId"))
+    safe_data = {k: v for k, v in data.items() if k != "vimeoVideoId"}
+    return LessonPublic(
+        id=doc_id,
+        vimeoVideoId=None,  # NEVER expose raw video ID
+        hasVideo=has_video,
+        playbackEndpoint=f"/content/lessons/{doc_id}/playback" if has_video else None,
+        **safe_data,
+    )
+
+async def search_published_lessons(query_text: str, limit: int = 50) -> List[LessonPublic]:
     if not query_text:
         return []
-        
-    db = get_db()
-    
-    # Optimization: If searching by tag, we could use array-contains
-    # But for generic text search, we'll fetch published lessons.
-    # WARNING: This might scale poorly. Limit to strict subset or use a dedicated collection for search if needed.
-    # For now, let's fetch a reasonable batch or rely on specific field queries if possible.
-    
-    # Strategy: Fetch published lessons (capped)
-    query = db.collection("lessons").where("published", "==", True).limit(200)
-    
-    docs = query.stream()
+
+    indexed = search_index.search("lessons", query_text, limit)
+    if indexed is not None:
+        return [_lesson_public(doc_id, data) for doc_id, data in indexed]
+
+    # Index not loaded yet: fetch published lessons (capped) and filter client-side
+    replicated = catalog_replica.snapshot("lessons")
+    if replicated is not None:
+        rows = catalog_replica.select(replicated, 200, published=True)
+    else:
+        db = get_async_db()
+        query = db.collection("lessons").where("published", "==", True).limit(200)
+        rows = [(doc.id, doc.to_dict()) async for doc in query.stream()]
+
     q = query_text.lower()
     results = []
     
-    for doc in docs:
-        data = doc.to_dict()
+    for doc_id, data in rows:
         # Safe match
         title = data.get("titleHe", "").lower()
         desc = data.get("descriptionHe", "").lower()
@@ -36,79 +48,56 @@ def search_published_lessons(query_text: str, limit: int = 50) -> List[LessonPub
             q in desc or 
             q in category or 
             any(q in t for t in tags)):
-            has_video = bool(data.get("vimeoVideoId"))
-            safe_data = {k: v for k, v in data.items() if k != "vimeoVideoId"}
-            results.append(LessonPublic(
-                id=doc.id,
-                vimeoVideoId=None,  # NEVER expose raw video ID
-                hasVideo=has_video,
-                playbackEndpoint=f"/content/lessons/{doc.id}/playback" if has_video else None,
-                **safe_data,
-            ))
+            results.append(_lesson_public(doc_id, data))
             
     return results[:limit]
 
-def list_published_lessons_by_course(course_id: str, limit: int = 200) -> List[LessonPublic]:
-    db = get_db()
-    query = db.collection("lessons").where("published", "==", True).where("courseId", "==", course_id).limit(limit)
-    docs = query.stream()
+async def list_published_lessons_by_course(course_id: str, limit: int = 200) -> List[LessonPublic]:
+    replicated = catalog_replica.snapshot("lessons")
+    if replicated is not None:
+        rows = catalog_replica.select(replicated, limit, published=True, courseId=course_id)
+    else:
+        db = get_async_db()
+        query = db.collection("lessons").where("published", "==", True).where("courseId", "==", course_id).limit(limit)
+        rows = [(doc.id, doc.to_dict()) async for doc in query.stream()]
     
-    results = []
-    for doc in docs:
-        data = doc.to_dict()
-        has_video = bool(data.get("vimeoVideoId"))
-        safe_data = {k: v for k, v in data.items() if k != "vimeoVideoId"}
-        results.append(LessonPublic(
-            id=doc.id,
-            vimeoVideoId=None,
-            hasVideo=has_video,
-            playbackEndpoint=f"/content/lessons/{doc.id}/playback" if has_video else None,
-            **safe_data,
-        ))
-        
+    results = [_lesson_public(doc_id, data) for doc_id, data in rows]
     results.sort(key=lambda x: getattr(x, "orderIndex", 0))
     return results
 
-def get_published_lesson(lesson_id: str) -> Optional[LessonPublic]:
-    db = get_db()
-    snap = db.collection("lessons").document(lesson_id).get()
-    if not snap.exists:
+async def get_published_lesson(lesson_id: str) -> Optional[LessonPublic]:
+    replicated = catalog_replica.snapshot("lessons")
+    if replicated is not None:
+        data = replicated.get(lesson_id)
+    else:
+        data = await get_doc("lessons", lesson_id)
+    if data is None:
         return None
         
-    data = snap.to_dict()
     if not data.get("published"):
         return None
         
-    has_video = bool(data.get("vimeoVideoId"))
-    safe_data = {k: v for k, v in data.items() if k != "vimeoVideoId"}
-    return LessonPublic(
-        id=snap.id,
-        vimeoVideoId=None,
-        hasVideo=has_video,
-        playbackEndpoint=f"/content/lessons/{snap.id}/playback" if has_video else None,
-        **safe_data,
-    )
+    return _lesson_public(lesson_id, data)
 
 # --- Admin CRUD ---
 
-def get_lesson_admin(lesson_id: str) -> Optional[dict]:
-    db = get_db()
-    snap = db.collection("lessons").document(lesson_id).get()
-    if not snap.exists:
+async def get_lesson_admin(lesson_id: str) -> Optional[dict]:
+    data = await get_doc("lessons", lesson_id)
+    if data is None:
         return None
-    return {"id": snap.id, **snap.to_dict()}
+    return {"id": lesson_id, **data}
 
-def list_lessons_by_course_admin(course_id: str) -> List[dict]:
-    db = get_db()
+async def list_lessons_by_course_admin(course_id: str) -> List[dict]:
+    db = get_async_db()
     # v1: Sort in Python to avoid complex index requirement (courseId + orderIndex)
     query = db.collection("lessons").where("courseId", "==", course_id)
     docs = query.stream()
-    items = [{"id": d.id, **d.to_dict()} for d in docs]
+    items = [{"id": d.id, **d.to_dict()} async for d in docs]
     items.sort(key=lambda x: x.get("orderIndex", 0))
     return items
 
-def create_lesson(data: dict) -> str:
-    db = get_db()
+async def create_lesson(data: dict) -> str:
+    db = get_async_db()
     now = datetime.now(timezone.utc)
     payload = {
         "courseId": data["courseId"],
@@ -123,13 +112,15 @@ def create_lesson(data: dict) -> str:
         "updatedAt": now,
     }
     ref = db.collection("lessons").document()
-    ref.set(payload)
+    await ref.set(payload)
+    search_index.upsert("lessons", ref.id, payload)
     return ref.id
 
-def update_lesson(lesson_id: str, data: dict) -> None:
-    db = get_db()
+async def update_lesson(lesson_id: str, data: dict) -> None:
+    db = get_async_db()
     ref = db.collection("lessons").document(lesson_id)
-    if not ref.get().exists:
+    snap = await ref.get()
+    if not snap.exists:
         raise KeyError("Lesson not found")
 
     updates = {
@@ -145,26 +136,35 @@ def update_lesson(lesson_id: str, data: dict) -> None:
     if data.get("published") is not None:
         updates["published"] = bool(data["published"])
         
-    ref.update(updates)
+    await ref.update(updates)
+    forget_doc("lessons", lesson_id)
+    search_index.upsert("lessons", lesson_id, {**snap.to_dict(), **updates})
 
-def delete_lesson(lesson_id: str) -> None:
-    db = get_db()
+async def delete_lesson(lesson_id: str) -> None:
+    db = get_async_db()
     ref = db.collection("lessons").document(lesson_id)
-    if not ref.get().exists:
+    if not (await ref.get()).exists:
         raise KeyError("Lesson not found")
-    ref.delete()
+    await ref.delete()
+    forget_doc("lessons", lesson_id)
+    search_index.remove("lessons", lesson_id)
 
-def update_lesson_verification(lesson_id: str, verify_data: dict) -> None:
-    db = get_db()
+async def update_lesson_verification(lesson_id: str, verify_data: dict) -> None:
+    db = get_async_db()
     ref = db.collection("lessons").document(lesson_id)
-    if not ref.get().exists:
+    if not (await ref.get()).exists:
         raise KeyError("Lesson not found")
-    ref.update(verify_data)
+    await ref.update(verify_data)
+    forget_doc("lessons", lesson_id)
 
-def set_lesson_published(lesson_id: str, published: bool) -> None:
-    db = get_db()
+async def set_lesson_published(lesson_id: str, published: bool) -> None:
+    db = get_async_db()
     ref = db.collection("lessons").document(lesson_id)
-    if not ref.get().exists:
+    snap = await ref.get()
+    if not snap.exists:
         raise KeyError("Lesson not found")
-    ref.update({"published": published, "updatedAt": datetime.now(timezone.utc)})
+    updates = {"published": published, "updatedAt": datetime.now(timezone.utc)}
+    await ref.update(updates)
+    forget_doc("lessons", lesson_id)
+    search_index.upsert("lessons", lesson_id, {**snap.to_dict(), **updates})
 
@@ -0,0 +1,120 @@
+"""
+Request-scoped document loader.
+
+Document reads issued in the same event-loop tick are collected and
+resolved with a single Firestore get_all() round trip. Repeated reads
+of the same document within a request are served from the loader's memo.
+
+The loader is installed per request by DocumentLoaderMiddleware. Outside
+a request (scripts, background tasks) get_doc() falls back to a plain get().
+"""
+
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.context import document_loader_ctx
+from app.repos.firestore import get_async_db
+
+DocKey = Tuple[str, str]
+
+
+class DocumentLoader:
+    """
+    Batches and memoizes document reads keyed by (collection, doc_id).
+    Resolves to the document data dict, or None if the document does not exist.
+    """
+
+    def __init__(self, db=None):
+        self._db = db
+        self._memo: Dict[DocKey, asyncio.Future] = {}
+        # A key can have several queued futures if it was forgotten meanwhile
+        self._pending: Dict[DocKey, List[asyncio.Future]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._scheduled = False
+        self.round_trips = 0
+
+    async def load(self, collection: str, doc_id: str) -> Optional[dict]:
+        key = (collection, doc_id)
+        fut = self._memo.get(key)
+        if fut is None:
+            loop = asyncio.get_running_loop()
+            fut = loop.create_future()
+            self._memo[key] = fut
+            self._pending.setdefault(key, []).append(fut)
+            if not self._scheduled:
+                # Dispatch after every task that is already runnable has had
+                # a chance to queue its own reads.
+                self._scheduled = True
+                loop.call_soon(self._dispatch)
+
+        # Shield so a cancelled caller does not cancel the shared future
+        data = await asyncio.shield(fut)
+        return dict(data) if data is not None else None
+
+    def forget(self, collection: str, doc_id: str) -> None:
+        """
+        Drop a memoized document (call after writing it). A read still queued
+        or in flight settles its current waiters, but no later load reuses it.
+        """
+        self._memo.pop((collection, doc_id), None)
+
+    def _dispatch(self) -> None:
+        self._scheduled = False
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._fetch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, batch: Dict[DocKey, List[asyncio.Future]]) -> None:
+        self.round_trips += 1
+        try:
+            db = self._db or get_async_db()
+            refs = [db.collection(c).document(i) for c, i in batch]
+            if len(refs) == 1:
+                snaps = [await refs[0].get()]
+            else:
+                snaps = [snap async for snap in db.get_all(refs)]
+        except Exception as e:
+            for key, futs in batch.items():
+                for fut in futs:
+                    if self._memo.get(key) is fut:
+                        del self._memo[key]
+                    if not fut.done():
+                        fut.set_exception(e)
+            return
+
+        # get_all() does not preserve request order
+        by_path = {snap.reference.path: snap for snap in snaps}
+        for (collection, doc_id), futs in batch.items():
+            snap = by_path.get(f"{collection}/{doc_id}")
+            data = snap.to_dict() if snap is not None and snap.exists else None
+            for fut in futs:
+                if not fut.done():
+                    fut.set_result(data)
+
+
+def get_loader() -> Optional[DocumentLoader]:
+    return document_loader_ctx.get()
+
+
+async def get_doc(collection: str, doc_id: str) -> Optional[dict]:
+    """
+    Read a single document's data, batched through the request loader if one is active.
+    """
+    loader = document_loader_ctx.get()
+    if loader is not None:
+        return await loader.load(collection, doc_id)
+    snap = await get_async_db().collection(collection).document(doc_id).get()
+    return snap.to_dict() if snap.exists else None
+
+
+def forget_doc(collection: str, doc_id: str) -> None:
+    """
+    Invalidate a memoized read in the active request loader, if any.
+    Repos call this after writing a document that may have been read earlier in the request.
+    """
+    loader = document_loader_ctx.get()
+    if loader is not None:
+        loader.forget(collection, doc_id)
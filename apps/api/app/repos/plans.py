@@ -1,23 +1,43 @@
 from typing import List, Optional
 from datetime import datetime, timezone
-from app.repos.firestore import get_db
+from app.repos.firestore import get_async_db
+from app.repos.loader import get_doc, forget_doc
+from app.repos import catalog_replica
+from app.repos.search_index import search_index
 from app.models import PlanPublic
 
-def search_published_plans(query_text: str, limit: int = 50) -> List[PlanPublic]:
+def _plan_public(doc_id: str, data: dict) -> PlanPublic:
+    has_pdf = bool(data.get("pdfPath"))
+    safe_data = {k: v for k, v in data.items() if k != "pdfPath"}
+    return PlanPublic(
+        id=doc_id,
+        pdfPath=None,  # NEVER expose raw GCS path
+        hasPdf=has_pdf,
+        pdfDownloadEndpoint=f"/content/plans/{doc_id}/download" if has_pdf else None,
+        **safe_data,
+    )
+
+async def search_published_plans(query_text: str, limit: int = 50) -> List[PlanPublic]:
     if not query_text:
         return []
-        
-    db = get_db()
-    
-    # Similar strategy to lessons: Fetch published and filter client-side
-    query = db.collection("plans").where("published", "==", True).limit(100)
-    
-    docs = query.stream()
+
+    indexed = search_index.search("plans", query_text, limit)
+    if indexed is not None:
+        return [_plan_public(doc_id, data) for doc_id, data in indexed]
+
+    # Index not loaded yet: fetch published plans (capped) and filter client-side
+    replicated = catalog_replica.snapshot("plans")
+    if replicated is not None:
+        rows = catalog_replica.select(replicated, 100, published=True)
+    else:
+        db = get_async_db()
+        query = db.collection("plans").where("published", "==", True).limit(100)
+        rows = [(doc.id, doc.to_dict()) async for doc in query.stream()]
+
     q = query_text.lower()
     results = []
     
-    for doc in docs:
-        data = doc.to_dict()
+    for doc_id, data in rows:
         title = data.get("titleHe", "").lower()
         desc = data.get("descriptionHe", "").lower()
         tags = [t.lower() for t in data.get("tags", [])]
@@ -25,84 +45,56 @@ def search_published_plans(query_text: str, limit: int = 50) -> List[PlanPublic]
         if (q in title or 
             q in desc or 
             any(q in t for t in tags)):
-            has_pdf = bool(data.get("pdfPath"))
-            safe_data = {k: v for k, v in data.items() if k != "pdfPath"}
-            results.append(PlanPublic(
-                id=doc.id,
-                pdfPath=None,  # NEVER expose raw GCS path
-                hasPdf=has_pdf,
-                pdfDownloadEndpoint=f"/content/plans/{doc.id}/download" if has_pdf else None,
-                **safe_data,
-            ))
+            results.append(_plan_public(doc_id, data))
             
     return results[:limit]
 
-def list_published_plans_by_course(course_id: str, limit: int = 200) -> List[PlanPublic]:
-    db = get_db()
-    query = db.collection("plans").where("published", "==", True).where("courseId", "==", course_id).limit(limit)
-    docs = query.stream()
+async def list_published_plans_by_course(course_id: str, limit: int = 200) -> List[PlanPublic]:
+    replicated = catalog_replica.snapshot("plans")
+    if replicated is not None:
+        rows = catalog_replica.select(replicated, limit, published=True, courseId=course_id)
+    else:
+        db = get_async_db()
+        query = db.collection("plans").where("published", "==", True).where("courseId", "==", course_id).limit(limit)
+        rows = [(doc.id, doc.to_dict()) async for doc in query.stream()]
     
-    raw_results = []
-    for doc in docs:
-        raw_results.append({"id": doc.id, **doc.to_dict()})
-        
-    raw_results.sort(key=lambda x: str(x.get("createdAt", "")), reverse=True)
-    
-    results = []
-    for data in raw_results:
-        has_pdf = bool(data.get("pdfPath"))
-        safe_data = {k: v for k, v in data.items() if k not in ["pdfPath", "id"]}
-        results.append(PlanPublic(
-            id=data["id"],
-            pdfPath=None,
-            hasPdf=has_pdf,
-            pdfDownloadEndpoint=f"/content/plans/{data['id']}/download" if has_pdf else None,
-            **safe_data,
-        ))
-        
-    return results
+    rows = sorted(rows, key=lambda row: str(row[1].get("createdAt", "")), reverse=True)
+    return [_plan_public(doc_id, {k: v for k, v in data.items() if k != "id"}) for doc_id, data in rows]
 
-def get_published_plan(plan_id: str) -> Optional[PlanPublic]:
-    db = get_db()
-    snap = db.collection("plans").document(plan_id).get()
-    if not snap.exists:
+async def get_published_plan(plan_id: str) -> Optional[PlanPublic]:
+    replicated = catalog_replica.snapshot("plans")
+    if replicated is not None:
+        data = replicated.get(plan_id)
+    else:
+        data = await get_doc("plans", plan_id)
+    if data is None:
         return None
         
-    data = snap.to_dict()
     if not data.get("published"):
         return None
         
-    has_pdf = bool(data.get("pdfPath"))
-    safe_data = {k: v for k, v in data.items() if k != "pdfPath"}
-    return PlanPublic(
-        id=snap.id,
-        pdfPath=None,
-        hasPdf=has_pdf,
-        pdfDownloadEndpoint=f"/content/plans/{snap.id}/download" if has_pdf else None,
-        **safe_data,
-    )
+    return _plan_public(plan_id, data)
 
 # --- Admin CRUD ---
 
-def get_plan_admin(plan_id: str) -> Optional[dict]:
-    db = get_db()
-    snap = db.collection("plans").document(plan_id).get()
-    if not snap.exists:
+async def get_plan_admin(plan_id: str) -> Optional[dict]:
+    data = await get_doc("plans", plan_id)
+    if data is None:
         return None
-    return {"id": snap.id, **snap.to_dict()}
+    return {"id": plan_id, **data}
 
-def list_plans_by_course_admin(course_id: str) -> List[dict]:
-    db = get_db()
+async def list_plans_by_course_admin(course_id: str) -> List[dict]:
+    db = get_async_db()
     query = db.collection("plans").where("courseId", "==", course_id)
     docs = query.stream()
-    items = [{"id": d.id, **d.to_dict()} for d in docs]
+    items = [{"id": d.id, **d.to_dict()} async for d in docs]
     # v1: Sort in Python to avoid complex index requirement (courseId + createdAt)
     # Sort descending (newest first)
     items.sort(key=lambda x: str(x.get("createdAt", "")), reverse=True)
     return items
 
-def create_plan(data: dict) -> str:
-    db = get_db()
+async def create_plan(data: dict) -> str:
+    db = get_async_db()
     now = datetime.now(timezone.utc)
     payload = {
         "courseId": data.get("courseId"),
@@ -115,13 +107,15 @@ def create_plan(data: dict) -> str:
         "updatedAt": now,
     }
     ref = db.collection("plans").document()
-    ref.set(payload)
+    await ref.set(payload)
+    search_index.upsert("plans", ref.id, payload)
     return ref.id
 
-def update_plan(plan_id: str, data: dict) -> None:
-    db = get_db()
+async def update_plan(plan_id: str, data: dict) -> None:
+    db = get_async_db()
     ref = db.collection("plans").document(plan_id)
-    if not ref.get().exists:
+    snap = await ref.get()
+    if not snap.exists:
         raise KeyError("Plan not found")
 
     updates = {
@@ -135,19 +129,27 @@ def update_plan(plan_id: str, data: dict) -> None:
     if data.get("published") is not None:
         updates["published"] = bool(data["published"])
         
-    ref.update(updates)
+    await ref.update(updates)
+    forget_doc("plans", plan_id)
+    search_index.upsert("plans", plan_id, {**snap.to_dict(), **updates})
 
-def delete_plan(plan_id: str) -> None:
-    db = get_db()
+async def delete_plan(plan_id: str) -> None:
+    db = get_async_db()
     ref = db.collection("plans").document(plan_id)
-    if not ref.get().exists:
+    if not (await ref.get()).exists:
         raise KeyError("Plan not found")
-    ref.delete()
+    await ref.delete()
+    forget_doc("plans", plan_id)
+    search_index.remove("plans", plan_id)
 
-def set_plan_published(plan_id: str, published: bool) -> None:
-    db = get_db()
+async def set_plan_published(plan_id: str, published: bool) -> None:
+    db = get_async_db()
     ref = db.collection("plans").document(plan_id)
-    if not ref.get().exists:
+    snap = await ref.get()
+    if not snap.exists:
         raise KeyError("Plan not found")
-    ref.update({"published": published, "updatedAt": datetime.now(timezone.utc)})
+    updates = {"published": published, "updatedAt": datetime.now(timezone.utc)}
+    await ref.update(updates)
+    forget_doc("plans", plan_id)
+    search_index.upsert("plans", plan_id, {**snap.to_dict(), **updates})
 
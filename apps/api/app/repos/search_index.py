@@ -0,0 +1,227 @@
+"""
+In-memory inverted index over the published catalog (courses, lessons, plans).
+
+Indexes titleHe, descriptionHe, tags and movementCategory with Hebrew-aware
+normalization: niqqud/cantillation stripped, final letters folded to their
+regular forms (ם -> מ), and words carrying prefix particles (ו, ה, ב, ל, כ,
+מ, ש) also indexed without them. A query matches a document when every
+query token is a prefix of one of its terms, or one of the token's
+particle-stripped forms is exactly one of its terms.
+
+Fed by the catalog replica's snapshot listeners while it is serving, or by a
+periodic full load otherwise; admin writes on this instance are applied
+immediately. Until a collection has been loaded, search() returns None and
+repos fall back to scanning Firestore.
+"""
+
+import asyncio
+import bisect
+import logging
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.repos.firestore import get_async_db
+
+logger = logging.getLogger(__name__)
+
+INDEXED_COLLECTIONS = ("courses", "lessons", "plans")
+INDEXED_FIELDS = ("titleHe", "descriptionHe", "movementCategory")
+
+# Points and cantillation marks; maqaf (U+05BE), paseq, sof pasuq and nun
+# hafukha are punctuation and left to split words.
+_NIQQUD = re.compile("[\u0591-\u05bd\u05bf\u05c1\u05c2\u05c4\u05c5\u05c7]")
+# Geresh/gershayim (and their ASCII stand-ins) inside abbreviations: צה"ל -> צהל
+_ABBREVIATION_MARKS = re.compile("(?<=\\w)[\"'\u05f3\u05f4](?=\\w)")
+_WORD = re.compile(r"[^\W_]+")
+_FINAL_LETTERS = str.maketrans("ךםןףץ", "כמנפצ")
+
+PREFIX_PARTICLES = frozenset("והבלכמש")
+MAX_STACKED_PARTICLES = 3
+MIN_STEM_LENGTH = 2
+
+
+def normalize(text: str) -> str:
+    text = _NIQQUD.sub("", text)
+    text = _ABBREVIATION_MARKS.sub("", text)
+    return text.casefold().translate(_FINAL_LETTERS)
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(normalize(text))
+
+
+def variants(token: str) -> List[str]:
+    """The token itself plus its forms with leading prefix particles removed."""
+    out = [token]
+    stem = token
+    for _ in range(MAX_STACKED_PARTICLES):
+        if len(stem) - 1 < MIN_STEM_LENGTH or stem[0] not in PREFIX_PARTICLES:
+            break
+        stem = stem[1:]
+        out.append(stem)
+    return out
+
+
+def document_terms(data: dict) -> Set[str]:
+    texts = [data.get(field) or "" for field in INDEXED_FIELDS]
+    texts.extend(data.get("tags") or [])
+    terms = set()
+    for text in texts:
+        if isinstance(text, str):
+            for token in tokenize(text):
+                terms.update(variants(token))
+    return terms
+
+
+DocKey = Tuple[str, str]
+
+
+class SearchIndex:
+    """
+    term -> set of (collection, doc_id) postings, with a sorted term list for
+    prefix lookups. Only published documents are indexed. Thread-safe: the
+    replica's listener callbacks run on background threads.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Set[DocKey]] = {}
+        self._terms: List[str] = []
+        self._doc_terms: Dict[DocKey, Set[str]] = {}
+        self._docs: Dict[DocKey, dict] = {}
+        self._ready: Set[str] = set()
+
+    def _add(self, key: DocKey, data: dict) -> None:
+        terms = document_terms(data)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = set()
+                bisect.insort(self._terms, term)
+            postings.add(key)
+        self._doc_terms[key] = terms
+        self._docs[key] = data
+
+    def _remove(self, key: DocKey) -> None:
+        for term in self._doc_terms.pop(key, ()):
+            postings = self._postings[term]
+            postings.discard(key)
+            if not postings:
+                del self._postings[term]
+                i = bisect.bisect_left(self._terms, term)
+                del self._terms[i]
+        self._docs.pop(key, None)
+
+    def upsert(self, collection: str, doc_id: str, data: Optional[dict]) -> None:
+        """Index the current state of a document (None or unpublished removes it)."""
+        key = (collection, doc_id)
+        with self._lock:
+            self._remove(key)
+            if data is not None and data.get("published"):
+                self._add(key, data)
+
+    def remove(self, collection: str, doc_id: str) -> None:
+        with self._lock:
+            self._remove((collection, doc_id))
+
+    def replace_collection(self, collection: str, docs: Dict[str, dict]) -> None:
+        """Swap in the full set of documents for a collection and mark it ready."""
+        with self._lock:
+            for key in [k for k in self._docs if k[0] == collection]:
+                self._remove(key)
+            for doc_id, data in docs.items():
+                if data.get("published"):
+                    self._add((collection, doc_id), data)
+            self._ready.add(collection)
+
+    def is_ready(self, collection: str) -> bool:
+        return collection in self._ready
+
+    def _prefix_matches(self, prefix: str) -> Set[DocKey]:
+        out: Set[DocKey] = set()
+        i = bisect.bisect_left(self._terms, prefix)
+        while i < len(self._terms) and self._terms[i].startswith(prefix):
+            out |= self._postings[self._terms[i]]
+            i += 1
+        return out
+
+    def search(self, collection: str, query_text: str, limit: int) -> Optional[List[Tuple[str, dict]]]:
+        """
+        (doc_id, data) pairs for published docs matching every query token,
+        ordered by doc id. None if the collection has not been loaded yet.
+        """
+        if collection not in self._ready:
+            return None
+        tokens = tokenize(query_text)
+        if not tokens:
+            return []
+
+        with self._lock:
+            matches: Optional[Set[DocKey]] = None
+            for token in tokens:
+                # Only the token as typed is a prefix; particle-stripped forms are
+                # short enough (down to MIN_STEM_LENGTH) to prefix-match unrelated
+                # words, so they must match a term exactly
+                found = self._prefix_matches(token)
+                for variant in variants(token)[1:]:
+                    found |= self._postings.get(variant, set())
+                found = {key for key in found if key[0] == collection}
+                matches = found if matches is None else matches & found
+                if not matches:
+                    return []
+            return [(doc_id, self._docs[(coll, doc_id)]) for coll, doc_id in sorted(matches)[:limit]]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"terms": len(self._terms), "docs": len(self._docs)}
+
+    def reset(self) -> None:
+        """Drop everything; searches fall back until the next load."""
+        with self._lock:
+            self._postings.clear()
+            self._terms.clear()
+            self._doc_terms.clear()
+            self._docs.clear()
+            self._ready.clear()
+
+search_index = SearchIndex()
+
+
+def sync_collection(collection: str, before: Dict[str, dict], after: Dict[str, dict]) -> None:
+    """Apply the difference between two replica snapshots of a collection."""
+    if not settings.SEARCH_INDEX_ENABLED:
+        return
+    if not search_index.is_ready(collection):
+        search_index.replace_collection(collection, after)
+        return
+    for doc_id in set(before) | set(after):
+        data = after.get(doc_id)
+        if before.get(doc_id) != data:
+            search_index.upsert(collection, doc_id, data)
+
+
+async def load_all(collections: Iterable[str] = INDEXED_COLLECTIONS) -> None:
+    """Full load of published docs from Firestore (used when the replica isn't serving)."""
+    db = get_async_db()
+    for collection in collections:
+        query = db.collection(collection).where("published", "==", True)
+        docs = {doc.id: doc.to_dict() async for doc in query.stream()}
+        search_index.replace_collection(collection, docs)
+        logger.info("Search index loaded", extra={"collection": collection, "docs": len(docs)})
+
+
+async def run_loader(interval_seconds: int, skip: Optional[Callable[[], bool]] = None) -> None:
+    """
+    Background loop started from the app lifespan; picks up other instances'
+    writes. Rounds where `skip()` is true (the catalog replica's listeners
+    keep the index current) do nothing.
+    """
+    while True:
+        try:
+            if skip is None or not skip():
+                await load_all()
+        except Exception as e:
+            # Keep serving the last loaded index (or the fallback scan)
+            logger.warning(f"Search index load failed: {e}")
+        await asyncio.sleep(interval_seconds)
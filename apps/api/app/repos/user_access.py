@@ -0,0 +1,127 @@
+"""
+Materialized per-user access document.
+Collection: user_access
+
+Doc ID is the uid. Holds the membership status/expiry and the active course
+entitlements (courseId -> expiresAt or None), so every access decision is a
+single document read. Maintained transactionally by the writers in
+repos/entitlements.py; rebuilt from the entitlements collection when missing.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from google.cloud import firestore
+
+from app.repos.firestore import get_async_db
+from app.repos.loader import get_doc, forget_doc
+
+COLLECTION = "user_access"
+
+# Firestore caps "in" filters at 30 values
+IN_QUERY_CHUNK = 30
+
+
+def empty_access(uid: str) -> dict:
+    return {
+        "uid": uid,
+        "membershipStatus": "inactive",
+        "membershipExpiresAt": None,
+        "courses": {},
+    }
+
+
+def apply_entitlement(access: dict, ent: dict) -> dict:
+    """Fold the current state of one entitlement doc into an access doc."""
+    kind = ent.get("kind")
+    if kind == "membership":
+        access["membershipStatus"] = ent.get("status", "inactive")
+        access["membershipExpiresAt"] = ent.get("expiresAt")
+    elif kind == "course" and ent.get("courseId"):
+        courses = dict(access.get("courses") or {})
+        if ent.get("status") == "active":
+            courses[ent["courseId"]] = ent.get("expiresAt")
+        else:
+            courses.pop(ent["courseId"], None)
+        access["courses"] = courses
+    access["updatedAt"] = datetime.now(timezone.utc)
+    return access
+
+
+async def load_for_update(txn: firestore.AsyncTransaction, db: firestore.AsyncClient, uid: str) -> dict:
+    """
+    Read the access doc inside a transaction, rebuilding it from the user's
+    entitlements if it has never been materialized.
+    """
+    snap = await db.collection(COLLECTION).document(uid).get(transaction=txn)
+    if snap.exists:
+        return snap.to_dict()
+
+    access = empty_access(uid)
+    query = db.collection("entitlements").where("uid", "==", uid)
+    async for ent in query.stream(transaction=txn):
+        apply_entitlement(access, ent.to_dict())
+    return access
+
+
+def stage_write(txn: firestore.AsyncTransaction, db: firestore.AsyncClient, access: dict) -> None:
+    txn.set(db.collection(COLLECTION).document(access["uid"]), access)
+
+
+async def get_user_access(uid: str) -> Optional[dict]:
+    return await get_doc(COLLECTION, uid)
+
+
+async def get_many_user_access(uids: List[str]) -> Dict[str, dict]:
+    """
+    Access docs for a page of users: one get_all for the materialized docs,
+    then chunked `uid in [...]` entitlement queries (run concurrently) for
+    users that have none yet. The fallback is computed in memory only;
+    single-user reads still persist it via rebuild_user_access.
+    """
+    if not uids:
+        return {}
+    db = get_async_db()
+    refs = [db.collection(COLLECTION).document(uid) for uid in uids]
+    out: Dict[str, dict] = {}
+    async for snap in db.get_all(refs):
+        if snap.exists:
+            out[snap.id] = snap.to_dict()
+
+    missing = [uid for uid in uids if uid not in out]
+    if not missing:
+        return out
+
+    async def load_chunk(chunk: List[str]) -> List[dict]:
+        query = db.collection("entitlements").where("uid", "in", chunk)
+        return [doc.to_dict() async for doc in query.stream()]
+
+    chunks = [missing[i:i + IN_QUERY_CHUNK] for i in range(0, len(missing), IN_QUERY_CHUNK)]
+    built = {uid: empty_access(uid) for uid in missing}
+    for ents in await asyncio.gather(*(load_chunk(chunk) for chunk in chunks)):
+        for ent in ents:
+            if ent.get("uid") in built:
+                apply_entitlement(built[ent["uid"]], ent)
+    out.update(built)
+    return out
+
+async def rebuild_user_access(uid: str) -> dict:
+    """
+    Recompute the access doc from the entitlements collection and store it.
+    Used for users whose access doc predates materialization.
+    """
+    db = get_async_db()
+
+    @firestore.async_transactional
+    async def txn_fn(txn: firestore.AsyncTransaction) -> dict:
+        access = empty_access(uid)
+        query = db.collection("entitlements").where("uid", "==", uid)
+        async for ent in query.stream(transaction=txn):
+            apply_entitlement(access, ent.to_dict())
+        stage_write(txn, db, access)
+        return access
+
+    access = await txn_fn(db.transaction())
+    forget_doc(COLLECTION, uid)
+    return access
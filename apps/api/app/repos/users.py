@@ -1,5 +1,5 @@
 from typing import List, Optional, Tuple, Any
-from app.repos.firestore import get_db
+from app.repos.firestore import get_async_db
 from app.models import User
 from google.cloud.firestore_v1.base_query import FieldFilter
 import base64
@@ -26,12 +26,12 @@ def _decode_cursor(cursor: str) -> dict:
     except:
         return None
 
-def list_users(limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+async def list_users(limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
     """
     List users efficiently directly from the 'users' collection.
     Orders by lastSeenAt desc.
     """
-    db = get_db()
+    db = get_async_db()
     query = db.collection("users").order_by("lastSeenAt", direction="DESCENDING")
     
     if cursor:
@@ -47,7 +47,7 @@ def list_users(limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[dict
             # Removed uid from vals
             query = query.start_after(vals)
 
-    docs = list(query.limit(limit).stream())
+    docs = [doc async for doc in query.limit(limit).stream()]
     
     users = []
     for doc in docs:
@@ -61,9 +61,9 @@ def list_users(limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[dict
         
     return users, next_cursor
 
-def get_user(uid: str) -> Optional[dict]:
-    db = get_db()
-    doc = db.collection("users").document(uid).get()
+async def get_user(uid: str) -> Optional[dict]:
+    db = get_async_db()
+    doc = await db.collection("users").document(uid).get()
     if not doc.exists:
         return None
     data = doc.to_dict()
@@ -1,6 +1,7 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
 from app.deps import get_current_user
-from app.models import UserContext, AccessMeResponse, AccessCheckResponse
+from app.models import UserContext, AccessMeResponse, AccessCheckResponse, AccessBatchRequest, AccessBatchResponse
 from app.services import access_service
 from app.repos import activity_events
 from app.repos import courses
@@ -12,7 +13,7 @@ async def get_access_me(user: UserContext = Depends(get_current_user)):
     """
     Get current user's access status and entitlements.
     """
-    summary = access_service.get_access_summary(user.uid)
+    summary = await access_service.get_access_summary(user.uid)
     return {
         "uid": user.uid,
         "email": user.email,
@@ -30,13 +31,36 @@ async def check_course_access(course_id: str, user: UserContext = Depends(get_cu
     """
     # Verify course existence (even if unpublished, we check existence first)
     # Using get_course_admin to check existence without exposing data
-    course = courses.get_course_admin(course_id)
+    course = await courses.get_course_admin(course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
         
-    allowed = access_service.can_access_course(user.uid, course_id)
+    allowed = await access_service.can_access_course(user.uid, course_id)
     if not allowed:
         # Return 403 as requested
         raise HTTPException(status_code=403, detail="Access denied")
         
     return {"allowed": True}
+
+@router.post("/courses:batch", response_model=AccessBatchResponse)
+async def check_course_access_batch(req: AccessBatchRequest, user: UserContext = Depends(get_current_user)):
+    """
+    Check access to many courses at once (e.g. library pages).
+    The access doc and all course docs are fetched in one batched read, regardless of count.
+    Unknown courses are reported in notFound and are never allowed.
+    """
+    course_ids = list(dict.fromkeys(req.courseIds))  # de-dup, keep order
+    if not course_ids:
+        return {"allowed": {}, "notFound": []}
+
+    # Issued in the same tick, so the request loader folds them into one get_all
+    found, allowed = await asyncio.gather(
+        asyncio.gather(*(courses.get_course_admin(cid) for cid in course_ids)),
+        access_service.check_courses(user.uid, course_ids),
+    )
+
+    not_found = [cid for cid, course in zip(course_ids, found) if not course]
+    for cid in not_found:
+        allowed[cid] = False
+
+    return {"allowed": allowed, "notFound": not_found}
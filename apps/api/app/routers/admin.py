@@ -12,7 +12,9 @@ from app.models import (
 )
 from app.deps import require_admin
 from app.repos import courses, lessons, plans, admin_audit
-from app.repos.firestore import get_db
+from app.security.session_cache import session_cache
+from app.services.metrics_overview import overview_snapshot
+from app.services.event_sink import event_sink
 
 router = APIRouter()
 
@@ -22,7 +24,7 @@ router = APIRouter()
 async def list_courses(admin: UserContext = Depends(require_admin)):
     """List all courses (including unpublished)."""
     # Repo returns dicts, Pydantic validates
-    return courses.list_courses_admin()
+    return await courses.list_courses_admin()
 
 
 @router.post("/courses", response_model=CourseAdmin, status_code=201)
@@ -30,9 +32,9 @@ async def create_course(
     request: CourseUpsertRequest, 
     admin: UserContext = Depends(require_admin)
 ):
-    course_id = courses.create_course(request.dict())
+    course_id = await courses.create_course(request.dict())
     
-    admin_audit.write_audit(
+    await admin_audit.write_audit(
         action="create_course",
         entity_type="course",
         entity_id=course_id,
@@ -40,7 +42,7 @@ async def create_course(
         payload=request.dict()
     )
     
-    course = courses.get_course_admin(course_id)
+    course = await courses.get_course_admin(course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Course created but not found")
     return course
@@ -52,11 +54,11 @@ async def update_course(
     admin: UserContext = Depends(require_admin)
 ):
     try:
-        courses.update_course(course_id, request.dict())
+        await courses.update_course(course_id, request.dict())
     except KeyError:
         raise HTTPException(status_code=404, detail="Course not found")
     
-    admin_audit.write_audit(
+    await admin_audit.write_audit(
         action="update_course",
         entity_type="course",
         entity_id=course_id,
@@ -64,7 +66,7 @@ async def update_course(
         payload=request.dict()
     )
     
-    course = courses.get_course_admin(course_id)
+    course = await courses.get_course_admin(course_id)
     if not course:
          raise HTTPException(status_code=404, detail="Course not found")
     return course
@@ -72,21 +74,21 @@ async def update_course(
 @router.delete("/courses/{course_id}", status_code=204)
 async def delete_course(course_id: str, admin: UserContext = Depends(require_admin)):
     try:
-        courses.delete_course(course_id)
+        await courses.delete_course(course_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Course not found")
-    admin_audit.write_audit("delete_course", "course", course_id, admin.uid)
+    await admin_audit.write_audit("delete_course", "course", course_id, admin.uid)
 
 @router.post("/courses/{course_id}/publish", response_model=CourseAdmin)
 async def publish_course(course_id: str, admin: UserContext = Depends(require_admin)):
     try:
-        courses.set_course_published(course_id, True)
+        await courses.set_course_published(course_id, True)
     except KeyError:
         raise HTTPException(status_code=404, detail="Course not found")
     
-    admin_audit.write_audit("publish_course", "course", course_id, admin.uid)
+    await admin_audit.write_audit("publish_course", "course", course_id, admin.uid)
     
-    course = courses.get_course_admin(course_id)
+    course = await courses.get_course_admin(course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     return course
@@ -94,13 +96,13 @@ async def publish_course(course_id: str, admin: UserContext = Depends(require_ad
 @router.post("/courses/{course_id}/unpublish", response_model=CourseAdmin)
 async def unpublish_course(course_id: str, admin: UserContext = Depends(require_admin)):
     try:
-        courses.set_course_published(course_id, False)
+        await courses.set_course_published(course_id, False)
     except KeyError:
         raise HTTPException(status_code=404, detail="Course not found")
     
-    admin_audit.write_audit("unpublish_course", "course", course_id, admin.uid)
+    await admin_audit.write_audit("unpublish_course", "course", course_id, admin.uid)
     
-    course = courses.get_course_admin(course_id)
+    course = await courses.get_course_admin(course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     return course
@@ -109,14 +111,14 @@ async def unpublish_course(course_id: str, admin: UserContext = Depends(require_
 
 @router.get("/courses/{course_id}/lessons", response_model=List[LessonAdmin])
 async def list_lessons(course_id: str, admin: UserContext = Depends(require_admin)):
-    return lessons.list_lessons_by_course_admin(course_id)
+    return await lessons.list_lessons_by_course_admin(course_id)
 
 @router.post("/lessons", response_model=LessonAdmin, status_code=201)
 async def create_lesson(request: LessonUpsertRequest, admin: UserContext = Depends(require_admin)):
-    lesson_id = lessons.create_lesson(request.dict())
-    admin_audit.write_audit("create_lesson", "lesson", lesson_id, admin.uid, request.dict())
+    lesson_id = await lessons.create_lesson(request.dict())
+    await admin_audit.write_audit("create_lesson", "lesson", lesson_id, admin.uid, request.dict())
     
-    lesson = lessons.get_lesson_admin(lesson_id)
+    lesson = await lessons.get_lesson_admin(lesson_id)
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson created but not found")
     return lesson
@@ -124,13 +126,13 @@ async def create_lesson(request: LessonUpsertRequest, admin: UserContext = Depen
 @router.put("/lessons/{lesson_id}", response_model=LessonAdmin)
 async def update_lesson(lesson_id: str, request: LessonUpsertRequest, admin: UserContext = Depends(require_admin)):
     try:
-        lessons.update_lesson(lesson_id, request.dict())
+        await lessons.update_lesson(lesson_id, request.dict())
     except KeyError:
         raise HTTPException(status_code=404, detail="Lesson not found")
         
-    admin_audit.write_audit("update_lesson", "lesson", lesson_id, admin.uid, request.dict())
+    await admin_audit.write_audit("update_lesson", "lesson", lesson_id, admin.uid, request.dict())
     
-    lesson = lessons.get_lesson_admin(lesson_id)
+    lesson = await lessons.get_lesson_admin(lesson_id)
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     return lesson
@@ -138,19 +140,19 @@ async def update_lesson(lesson_id: str, request: LessonUpsertRequest, admin: Use
 @router.delete("/lessons/{lesson_id}", status_code=204)
 async def delete_lesson(lesson_id: str, admin: UserContext = Depends(require_admin)):
     try:
-        lessons.delete_lesson(lesson_id)
+        await lessons.delete_lesson(lesson_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Lesson not found")
-    admin_audit.write_audit("delete_lesson", "lesson", lesson_id, admin.uid)
+    await admin_audit.write_audit("delete_lesson", "lesson", lesson_id, admin.uid)
 
 @router.post("/lessons/{lesson_id}/publish", response_model=LessonAdmin)
 async def publish_lesson(lesson_id: str, admin: UserContext = Depends(require_admin)):
     try:
-        lessons.set_lesson_published(lesson_id, True)
+        await lessons.set_lesson_published(lesson_id, True)
     except KeyError:
         raise HTTPException(status_code=404, detail="Lesson not found")
-    admin_audit.write_audit("publish_lesson", "lesson", lesson_id, admin.uid)
-    lesson = lessons.get_lesson_admin(lesson_id)
+    await admin_audit.write_audit("publish_lesson", "lesson", lesson_id, admin.uid)
+    lesson = await lessons.get_lesson_admin(lesson_id)
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     return lesson
@@ -158,11 +160,11 @@ async def publish_lesson(lesson_id: str, admin: UserContext = Depends(require_ad
 @router.post("/lessons/{lesson_id}/unpublish", response_model=LessonAdmin)
 async def unpublish_lesson(lesson_id: str, admin: UserContext = Depends(require_admin)):
     try:
-        lessons.set_lesson_published(lesson_id, False)
+        await lessons.set_lesson_published(lesson_id, False)
     except KeyError:
         raise HTTPException(status_code=404, detail="Lesson not found")
-    admin_audit.write_audit("unpublish_lesson", "lesson", lesson_id, admin.uid)
-    lesson = lessons.get_lesson_admin(lesson_id)
+    await admin_audit.write_audit("unpublish_lesson", "lesson", lesson_id, admin.uid)
+    lesson = await lessons.get_lesson_admin(lesson_id)
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     return lesson
@@ -171,14 +173,14 @@ async def unpublish_lesson(lesson_id: str, admin: UserContext = Depends(require_
 
 @router.get("/courses/{course_id}/plans", response_model=List[PlanAdmin])
 async def list_plans(course_id: str, admin: UserContext = Depends(require_admin)):
-    return plans.list_plans_by_course_admin(course_id)
+    return await plans.list_plans_by_course_admin(course_id)
 
 @router.post("/plans", response_model=PlanAdmin, status_code=201)
 async def create_plan(request: PlanUpsertRequest, admin: UserContext = Depends(require_admin)):
-    plan_id = plans.create_plan(request.dict())
-    admin_audit.write_audit("create_plan", "plan", plan_id, admin.uid, request.dict())
+    plan_id = await plans.create_plan(request.dict())
+    await admin_audit.write_audit("create_plan", "plan", plan_id, admin.uid, request.dict())
     
-    plan = plans.get_plan_admin(plan_id)
+    plan = await plans.get_plan_admin(plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan created but not found")
     return plan
@@ -186,13 +188,13 @@ async def create_plan(request: PlanUpsertRequest, admin: UserContext = Depends(r
 @router.put("/plans/{plan_id}", response_model=PlanAdmin)
 async def update_plan(plan_id: str, request: PlanUpsertRequest, admin: UserContext = Depends(require_admin)):
     try:
-        plans.update_plan(plan_id, request.dict())
+        await plans.update_plan(plan_id, request.dict())
     except KeyError:
         raise HTTPException(status_code=404, detail="Plan not found")
         
-    admin_audit.write_audit("update_plan", "plan", plan_id, admin.uid, request.dict())
+    await admin_audit.write_audit("update_plan", "plan", plan_id, admin.uid, request.dict())
     
-    plan = plans.get_plan_admin(plan_id)
+    plan = await plans.get_plan_admin(plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
     return plan
@@ -200,19 +202,19 @@ async def update_plan(plan_id: str, request: PlanUpsertRequest, admin: UserConte
 @router.delete("/plans/{plan_id}", status_code=204)
 async def delete_plan(plan_id: str, admin: UserContext = Depends(require_admin)):
     try:
-        plans.delete_plan(plan_id)
+        await plans.delete_plan(plan_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Plan not found")
-    admin_audit.write_audit("delete_plan", "plan", plan_id, admin.uid)
+    await admin_audit.write_audit("delete_plan", "plan", plan_id, admin.uid)
 
 @router.post("/plans/{plan_id}/publish", response_model=PlanAdmin)
 async def publish_plan(plan_id: str, admin: UserContext = Depends(require_admin)):
     try:
-        plans.set_plan_published(plan_id, True)
+        await plans.set_plan_published(plan_id, True)
     except KeyError:
         raise HTTPException(status_code=404, detail="Plan not found")
-    admin_audit.write_audit("publish_plan", "plan", plan_id, admin.uid)
-    plan = plans.get_plan_admin(plan_id)
+    await admin_audit.write_audit("publish_plan", "plan", plan_id, admin.uid)
+    plan = await plans.get_plan_admin(plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
     return plan
@@ -220,11 +222,11 @@ async def publish_plan(plan_id: str, admin: UserContext = Depends(require_admin)
 @router.post("/plans/{plan_id}/unpublish", response_model=PlanAdmin)
 async def unpublish_plan(plan_id: str, admin: UserContext = Depends(require_admin)):
     try:
-        plans.set_plan_published(plan_id, False)
+        await plans.set_plan_published(plan_id, False)
     except KeyError:
         raise HTTPException(status_code=404, detail="Plan not found")
-    admin_audit.write_audit("unpublish_plan", "plan", plan_id, admin.uid)
-    plan = plans.get_plan_admin(plan_id)
+    await admin_audit.write_audit("unpublish_plan", "plan", plan_id, admin.uid)
+    plan = await plans.get_plan_admin(plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
     return plan
@@ -242,20 +244,15 @@ async def list_users(limit: int = 50, cursor: Optional[str] = None, admin: UserC
     if limit > 200:
         raise HTTPException(status_code=422, detail="Limit cannot exceed 200")
         
-    user_dicts, next_cursor = users.list_users(limit, cursor)
+    user_dicts, next_cursor = await users.list_users(limit, cursor)
     
-    # Enrich with access status
-    # Note: efficient enough for 50 users? 
-    # For each user, we need to check membership and entitlements.
-    # access_service.get_access_summary does 2 reads (membership, list_entitlements).
-    # 50 * 2 = 100 reads. Firestore allows this, but it's heavier than just listing users.
-    # User asked for "rich user objects". 
-    # For MVP, N+1 is acceptable for admin panel with low traffic.
+    # Enrich with access status: one batched lookup for the whole page
+    summaries = await access_service.get_access_summaries([u['uid'] for u in user_dicts])
     
     rows = []
     for u in user_dicts:
         uid = u['uid']
-        summary = access_service.get_access_summary(uid)
+        summary = summaries[uid]
         rows.append(AdminUserRow(
             uid=uid,
             email=u.get('email'),
@@ -273,11 +270,11 @@ async def get_user_detail(uid: str, admin: UserContext = Depends(require_admin))
     from app.repos import users, entitlements
     from app.services import access_service
     
-    user_data = users.get_user(uid)
+    user_data = await users.get_user(uid)
     if not user_data:
          raise HTTPException(status_code=404, detail="User not found")
          
-    summary = access_service.get_access_summary(uid)
+    summary = await access_service.get_access_summary(uid)
     
     profile = AdminUserRow(
         uid=uid,
@@ -289,7 +286,7 @@ async def get_user_detail(uid: str, admin: UserContext = Depends(require_admin))
         entitledCourseIds=summary['entitledCourseIds']
     )
     
-    ents = entitlements.list_entitlements(uid)
+    ents = await entitlements.list_entitlements(uid)
     # Filter? No, show all history
     
     # Purchases repo? Not implemented yet, return empty
@@ -309,13 +306,13 @@ async def grant_course_access(uid: str, request: GrantCourseRequest, admin: User
     from app.repos import entitlements, courses
     
     # Verify course exists
-    if not courses.get_course_admin(request.courseId):
+    if not await courses.get_course_admin(request.courseId):
         raise HTTPException(status_code=404, detail="Course not found")
         
     # Grant
-    ent = entitlements.grant_course(uid, request.courseId, source="manual")
+    ent = await entitlements.grant_course(uid, request.courseId, source="manual")
     
-    admin_audit.write_audit("grant_course", "user", uid, admin.uid, {"courseId": request.courseId})
+    await admin_audit.write_audit("grant_course", "user", uid, admin.uid, {"courseId": request.courseId})
     
     return ent
 
@@ -324,11 +321,11 @@ async def revoke_entitlement(ent_id: str, admin: UserContext = Depends(require_a
     from app.repos import entitlements
     
     try:
-        entitlements.set_status(ent_id, "inactive")
+        await entitlements.set_status(ent_id, "inactive")
     except KeyError:
         raise HTTPException(status_code=404, detail="Entitlement not found")
         
-    admin_audit.write_audit("revoke_entitlement", "entitlement", ent_id, admin.uid)
+    await admin_audit.write_audit("revoke_entitlement", "entitlement", ent_id, admin.uid)
     
 # --- Membership ---
 
@@ -343,14 +340,14 @@ async def activate_membership(
     
     # Optional logic: could reject past dates, but relying on frontend / ops to know what they're doing
     
-    entitlements.upsert_membership_entitlement(
+    await entitlements.upsert_membership_entitlement(
         uid=uid,
         status="active",
         expires_at=request.expiresAt,
         source="manual"
     )
     
-    admin_audit.write_audit("activate_membership", "user", uid, admin.uid, {"expiresAt": str(request.expiresAt) if request.expiresAt else None})
+    await admin_audit.write_audit("activate_membership", "user", uid, admin.uid, {"expiresAt": str(request.expiresAt) if request.expiresAt else None})
     return MembershipAdminResponse(uid=uid, status="active", expiresAt=request.expiresAt)
 
 @router.post("/users/{uid}/membership/deactivate", response_model=MembershipAdminResponse)
@@ -361,14 +358,14 @@ async def deactivate_membership(
     from app.repos import entitlements
     
     # Intentionally clearing expiry on deactivate as requested
-    entitlements.upsert_membership_entitlement(
+    await entitlements.upsert_membership_entitlement(
         uid=uid,
         status="inactive",
         expires_at=None,
         source="manual"
     )
     
-    admin_audit.write_audit("deactivate_membership", "user", uid, admin.uid)
+    await admin_audit.write_audit("deactivate_membership", "user", uid, admin.uid)
     return MembershipAdminResponse(uid=uid, status="inactive", expiresAt=None)
 
 @router.post("/users/{uid}/membership/set-expiry", response_model=MembershipAdminResponse)
@@ -380,17 +377,17 @@ async def set_membership_expiry(
     from app.repos import entitlements
     
     # Read current status
-    existing = entitlements.get_membership_entitlement(uid)
+    existing = await entitlements.get_membership_entitlement(uid)
     current_status = existing["status"] if existing else "inactive"
     
-    entitlements.upsert_membership_entitlement(
+    await entitlements.upsert_membership_entitlement(
         uid=uid,
         status=current_status,
         expires_at=request.expiresAt,
         source="manual"
     )
     
-    admin_audit.write_audit("set_membership_expiry", "user", uid, admin.uid, {"expiresAt": str(request.expiresAt) if request.expiresAt else None})
+    await admin_audit.write_audit("set_membership_expiry", "user", uid, admin.uid, {"expiresAt": str(request.expiresAt) if request.expiresAt else None})
     return MembershipAdminResponse(uid=uid, status=current_status, expiresAt=request.expiresAt)
 
 # --- Metrics ---
@@ -405,39 +402,40 @@ class AnalyticsPoint(BaseModel):
 
 @router.get("/metrics/overview", response_model=MetricsOverview)
 async def get_metrics(admin: UserContext = Depends(require_admin)):
-    db = get_db()
-    
-    # Helper to count using limit stream (safer for v1/compatibility)
-    def count_docs(query, limit=1000):
-        # Stream IDs only to be lighter? 
-        # Actually .stream() fetches docs. .select(['id']) might help if possible but 
-        # python-firestore often fetches full.
-        # For V1 MVP, simple stream limit is fine.
-        # TODO: Replace with aggregation count in prod (query.count()) when available/required
-        return len(list(query.limit(limit).stream()))
-
-    courses_ref = db.collection("courses")
-    lessons_ref = db.collection("lessons")
-    plans_ref = db.collection("plans")
-    purchases_ref = db.collection("purchases")
-    subs_ref = db.collection("subscriptions")
-    ents_ref = db.collection("entitlements")
-    users_ref = db.collection("users")
-
-    return MetricsOverview(
-        users_total=count_docs(users_ref),
-        courses_total=count_docs(courses_ref),
-        courses_published=count_docs(courses_ref.where("published", "==", True)),
-        lessons_total=count_docs(lessons_ref),
-        lessons_published=count_docs(lessons_ref.where("published", "==", True)),
-        plans_total=count_docs(plans_ref),
-        plans_published=count_docs(plans_ref.where("published", "==", True)),
-        purchases_total=count_docs(purchases_ref),
-        subscriptions_total=count_docs(subs_ref),
-        entitlements_total=count_docs(ents_ref)
-    )
+    # Exact count() aggregations, cached briefly and refreshed in the background
+    counts, generated_at = await overview_snapshot.get()
+    return MetricsOverview(**counts, generatedAt=generated_at)
+
+@router.get("/metrics/session-cache")
+async def get_session_cache_stats(admin: UserContext = Depends(require_admin)):
+    """Hit/miss counters for this instance's session validation cache."""
+    return session_cache.stats()
+
+@router.get("/metrics/event-sink")
+async def get_event_sink_stats(admin: UserContext = Depends(require_admin)):
+    """Buffer depth and write/drop counters for this instance's event sink."""
+    return event_sink.stats()
 
 @router.get("/analytics/growth", response_model=List[AnalyticsPoint])
 async def get_growth_data(days: int = 30, admin: UserContext = Depends(require_admin)):
     from app.repos import analytics
-    return analytics.get_growth_data(days)
+    if days < 1 or days > 366:
+        raise HTTPException(status_code=422, detail="days must be between 1 and 366")
+    return await analytics.get_growth_data(days)
+
+@router.post("/analytics/backfill")
+async def backfill_growth_data(days: int = 90, admin: UserContext = Depends(require_admin)):
+    """Fill in stats_daily rollups missing from the last N days (before today) from the users collection."""
+    from app.repos import analytics
+    if days < 1 or days > 366:
+        raise HTTPException(status_code=422, detail="days must be between 1 and 366")
+    written = await analytics.backfill_daily_stats(days)
+
+    await admin_audit.write_audit(
+        action="backfill_stats_daily",
+        entity_type="stats_daily",
+        entity_id=f"last_{days}_days",
+        admin_uid=admin.uid,
+        payload={"days": days, "written": written}
+    )
+    return {"days": days, "written": written}
@@ -1,11 +1,14 @@
 """
-Admin activity endpoint — returns recent activity events.
+Admin activity endpoints — recent activity events and distinct active users.
 """
 
+from datetime import date, datetime, timezone
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
 from app.deps import require_admin
-from app.models import UserContext
-from app.repos import activity_events
+from app.models import UserContext, ActiveUsersResponse
+from app.repos import activity_events, activity_sketches, admin_audit
 
 router = APIRouter()
 
@@ -15,5 +18,29 @@ async def list_activity(limit: int = 50, admin: UserContext = Depends(require_ad
     """Return recent activity events. Max limit: 200."""
     if limit > 200:
         raise HTTPException(status_code=422, detail="Limit too high (max 200)")
-    events = activity_events.list_recent(limit)
+    events = await activity_events.list_recent(limit)
     return events
+
+
+@router.get("/analytics/active-users", response_model=ActiveUsersResponse)
+async def get_active_users(date: Optional[date] = None, admin: UserContext = Depends(require_admin)):
+    """Approximate distinct DAU/WAU/MAU ending on `date` (default: today, UTC)."""
+    as_of = date or datetime.now(timezone.utc).date()
+    return await activity_sketches.get_active_users(as_of)
+
+
+@router.post("/analytics/active-users/rebuild")
+async def rebuild_active_users(days: int = 30, admin: UserContext = Depends(require_admin)):
+    """Backfill the last N days of sketches from activity_events."""
+    if days < 1 or days > 90:
+        raise HTTPException(status_code=422, detail="days must be between 1 and 90")
+    written = await activity_sketches.rebuild_from_events(days)
+
+    await admin_audit.write_audit(
+        action="rebuild_activity_sketches",
+        entity_type="activity_sketches",
+        entity_id=f"last_{days}_days",
+        admin_uid=admin.uid,
+        payload={"days": days, "written": written}
+    )
+    return {"days": days, "written": written}
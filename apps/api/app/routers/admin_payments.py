@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from typing import List, Dict, Any
 
 from app.deps import get_current_user, UserContext, require_admin
 from app.payments.repo import get_repos
+from app.payments.worker import webhook_worker
+from app.repos import admin_audit
+
+INBOX_STATUSES = ("queued", "processing", "processed", "dead_letter")
 
 router = APIRouter()
 
@@ -46,3 +50,47 @@ async def list_payment_events(
             results.append(d)
             
         return sorted(results, key=lambda x: x.get("receivedAt", ""), reverse=True)
+
+
+@router.get("/webhook-inbox", response_model=List[Dict[str, Any]])
+async def list_webhook_inbox(
+    status: str = "dead_letter",
+    limit: int = 50,
+    user: UserContext = Depends(require_admin)
+):
+    """
+    Admin-only view of async-ingested webhooks by processing status
+    (dead-lettered by default). Raw bodies and headers are not returned.
+    """
+    if status not in INBOX_STATUSES:
+        raise HTTPException(status_code=422, detail=f"status must be one of {', '.join(INBOX_STATUSES)}")
+    entries = await get_repos().inbox.list_by_status([status], limit)
+    for entry in entries:
+        entry.pop("rawBody", None)
+        entry.pop("headers", None)
+    return entries
+
+
+@router.post("/webhook-inbox/{inbox_id}/retry")
+async def retry_webhook(inbox_id: str, admin: UserContext = Depends(require_admin)):
+    """Re-queue a dead-lettered webhook with a fresh attempt budget."""
+    repos = get_repos()
+    entry = await repos.inbox.get(inbox_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Inbox entry not found")
+    if entry.get("status") != "dead_letter":
+        raise HTTPException(status_code=409, detail="Only dead-lettered entries can be retried")
+
+    await repos.inbox.update(inbox_id, {
+        "status": "queued",
+        "attempts": 0,
+        "nextAttemptAt": None,
+    })
+    await admin_audit.write_audit("retry_webhook", "webhook_inbox", inbox_id, admin.uid)
+    return {"ok": True, "submitted": webhook_worker.submit(inbox_id)}
+
+
+@router.get("/webhook-worker")
+async def get_webhook_worker_stats(user: UserContext = Depends(require_admin)):
+    """Queue depth and outcome counters for this instance's webhook worker."""
+    return webhook_worker.stats()
@@ -36,7 +36,7 @@ async def verify_lesson_video(
         )
 
     # 1. Load lesson
-    lesson = lessons_repo.get_lesson_admin(lesson_id)
+    lesson = await lessons_repo.get_lesson_admin(lesson_id)
     if not lesson:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found")
 
@@ -70,7 +70,7 @@ async def verify_lesson_video(
     }
     
     try:
-        lessons_repo.update_lesson_verification(lesson_id, verify_data)
+        await lessons_repo.update_lesson_verification(lesson_id, verify_data)
     except KeyError:
         # Lesson was deleted between read and update
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found during update")
@@ -1,13 +1,22 @@
+import asyncio
 import json
 import logging
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
 from app.config import settings
-from app.models import WebhookReplayRequest, WebhookReplayResponse
+from app.models import UserContext, WebhookBulkReplayRequest, WebhookReplayRequest, WebhookReplayResponse
 from app.deps import require_admin
 from app.payments import service
 from app.payments.errors import WebhookPayloadError, WebhookVerificationError, WebhookProcessingError
-from app.payments.repo import get_repos
+from app.payments.repo import RepoContainer, get_repos
+from app.payments.repo_shadow import ShadowStore
+from app.repos import admin_audit
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -93,8 +102,11 @@ async def replay_webhook(
 
     notes = [f"payload_size_bytes={len(raw_body)}"]
 
-    # 4) Optionally override verify mode
-    original_verify_mode = getattr(settings, "PAYPLUS_WEBHOOK_VERIFY_MODE", "log_only")
+    # 4) Optionally override verify mode, for this call only
+    verify_mode = None
+    if req.force_log_only and req.provider == "payplus":
+        verify_mode = "log_only"
+        notes.append("verify_mode_forced_log_only")
 
     # pre-extract provider_ref for intent lookup (best-effort)
     provider_ref = _extract_provider_ref(req.payload) if req.provider == "payplus" else None
@@ -102,12 +114,8 @@ async def replay_webhook(
         notes.append("provider_ref_extracted")
 
     try:
-        if req.force_log_only and req.provider == "payplus":
-            settings.PAYPLUS_WEBHOOK_VERIFY_MODE = "log_only"
-            notes.append("verify_mode_forced_log_only")
-
         # 5) Run through service handler
-        result = service.handle_webhook(raw_body, headers)
+        result = await service.handle_webhook(raw_body, headers, verify_mode=verify_mode)
 
         # intent lookup (admin-only extra data; does not affect service)
         intent_found = False
@@ -117,11 +125,13 @@ async def replay_webhook(
         if req.provider in ("payplus", "stub") and provider_ref:
             try:
                 repos = get_repos()
-                intent = repos.intents.find_by_provider_ref(req.provider, provider_ref)
-                if intent:
+                ref = await repos.intents.find_by_provider_ref(req.provider, provider_ref)
+                if ref:
                     intent_found = True
-                    intent_id = getattr(intent, "id", None) or (intent.get("id") if isinstance(intent, dict) else None)
-                    intent_status = getattr(intent, "status", None) or (intent.get("status") if isinstance(intent, dict) else None)
+                    intent_id = ref.id
+                    # IntentRef has no status: read the intent for it
+                    intent = await repos.intents.get_intent(intent_id)
+                    intent_status = intent.status if intent else None
                     notes.append("intent_found")
                 else:
                     notes.append("intent_not_found")
@@ -155,7 +165,200 @@ async def replay_webhook(
     except Exception as exc:
         logger.error(f"Replay processing failed unexpectedly: {exc}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal processing error") from exc
+
+def _replay_body(provider: str, event: dict) -> bytes | None:
+    """
+    Best-effort webhook body rebuilt from a stored payment_events doc.
+    PayPlus events keep the transaction under payload.raw (the other
+    top-level fields come from the normalized payload); stub events keep
+    their whole payload. None when the event has nothing to rebuild from.
+    """
+    payload = event.get("payload") if isinstance(event.get("payload"), dict) else {}
+
+    if provider == "payplus":
+        raw = payload.get("raw") if isinstance(payload.get("raw"), dict) else {}
+        if not raw.get("payment_request_uid"):
+            return None
+        transaction = raw.get("transaction") if isinstance(raw.get("transaction"), dict) else {}
+        body = {"payment_request_uid": raw["payment_request_uid"], "transaction": transaction}
+        if payload.get("transaction_uid"):
+            body["transaction_uid"] = payload["transaction_uid"]
+        if payload.get("provider_subscription_id"):
+            body["recurring_id"] = payload["provider_subscription_id"]
+        if "status_code" not in transaction and payload.get("raw_status_code"):
+            body["status_code"] = payload["raw_status_code"]
+            body["status"] = payload.get("raw_status", "")
+    else:
+        event_id = str(event.get("id", "")).split(":", 1)[-1]
+        if not event_id or not event.get("type"):
+            return None
+        body = {
+            "event_id": event_id,
+            "event_type": event["type"],
+            "provider_ref": payload.get("provider_ref"),
+            "payload": payload,
+        }
+
+    return json.dumps(body, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+def _replay_outcome(result: dict) -> str:
+    for flag in ("duplicate", "unmapped", "unknown_intent", "ignored"):
+        if result.get(flag) is True:
+            return flag
+    return "applied"
+
+async def _replay_stored_event(
+    event: dict, provider: str, verify_mode: Optional[str], repos: Optional[RepoContainer], replay_id: str
+) -> dict:
+    item = {"id": event.get("id"), "type": event.get("type")}
+    raw_body = _replay_body(provider, event)
+    if raw_body is None:
+        return {**item, "status": "skipped", "reason": "payload_not_replayable"}
+
+    headers = {"content-type": "application/json"}
+    if provider == "payplus":
+        headers["hash"] = "replay"
+
+    try:
+        result = await service.handle_webhook(
+            raw_body, headers, verify_mode=verify_mode, repos=repos, replay_id=replay_id,
+        )
+    except (WebhookVerificationError, WebhookPayloadError) as exc:
+        return {**item, "status": "error", "error": str(exc)}
+    except Exception as exc:
+        logger.error(f"Bulk replay of {item['id']} failed unexpectedly: {exc}", exc_info=True)
+        return {**item, "status": "error", "error": "Internal processing error"}
+
+    return {
+        **item,
+        "status": "replayed",
+        "outcome": _replay_outcome(result),
+        "mutation_risk": _classify_mutation_risk(result, not result.get("unknown_intent")),
+        "result": result,
+    }
+
+# Recorded without changing any state, so replaying them cannot undo a later event
+REPLAYABLE_OUTCOMES = {"unmapped", "unknown_intent"}
+
+def _skip_reason(event: dict) -> str | None:
+    """Why a stored event is not replayed, or None if it is."""
+    if event.get("replayedAs"):
+        return "already_replayed"
+    outcome = event.get("outcome") or ("unmapped" if event.get("unmapped") else None)
+    if outcome is None:
+        return "outcome_unknown"
+    if outcome not in REPLAYABLE_OUTCOMES:
+        return f"original_{outcome}"
+    return None
+
+def _replay_subject(event: dict) -> str:
+    """Events for the same intent/subscription are replayed in order, one at a time."""
+    payload = event.get("payload") if isinstance(event.get("payload"), dict) else {}
+    return str(payload.get("provider_ref") or event.get("id"))
+
+async def _stream_bulk_replay(
+    events: List[dict],
+    provider: str,
+    verify_mode: Optional[str],
+    dry_run: bool,
+    concurrency: int,
+    replay_id: str,
+) -> AsyncIterator[str]:
+    """
+    NDJSON progress: one line per event as it finishes, then a summary line.
+    `events` are oldest first; each subject's events run in that order and
+    only different subjects run concurrently. Dry runs write to a shadow
+    store, never to the real repos.
+    """
+    shadow = ShadowStore(get_repos()) if dry_run else None
+    repos = shadow.repos if shadow else None
+    semaphore = asyncio.Semaphore(concurrency)
+    finished: asyncio.Queue = asyncio.Queue()
+
+    subjects: dict[str, List[dict]] = {}
+    for event in events:
+        reason = _skip_reason(event)
+        if reason:
+            finished.put_nowait({"id": event.get("id"), "type": event.get("type"), "status": "skipped", "reason": reason})
+        else:
+            subjects.setdefault(_replay_subject(event), []).append(event)
+
+    async def run(subject_events: List[dict]) -> None:
+        async with semaphore:
+            for event in subject_events:
+                finished.put_nowait(await _replay_stored_event(event, provider, verify_mode, repos, replay_id))
+
+    tasks = [asyncio.ensure_future(run(subject_events)) for subject_events in subjects.values()]
+    counts: Counter = Counter()
+    try:
+        for _ in range(len(events)):
+            item = await finished.get()
+            counts[item["status"]] += 1
+            if "outcome" in item:
+                counts[item["outcome"]] += 1
+            yield json.dumps(item, default=str) + "\n"
     finally:
-        # 6) ALWAYS Restore mode
-        if req.force_log_only and req.provider == "payplus":
-            settings.PAYPLUS_WEBHOOK_VERIFY_MODE = original_verify_mode
+        # Client went away: stop replaying
+        for task in tasks:
+            task.cancel()
+
+    summary = {"total": len(events), "dry_run": dry_run, "replay_id": replay_id, **counts}
+    if shadow:
+        summary["shadow_writes"] = shadow.summary()
+    yield json.dumps({"summary": summary}) + "\n"
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+@router.post("/replay/bulk")
+async def replay_webhooks_bulk(
+    req: WebhookBulkReplayRequest,
+    admin: UserContext = Depends(require_admin)
+):
+    """
+    Admin-only bulk replay of stored payment_events through the webhook
+    handler, with bounded concurrency and an NDJSON progress stream.
+
+    Only events recorded without changing state (outcome unmapped or
+    unknown_intent) are replayed; applied and ignored events, and events
+    an earlier run already applied (replayedAs), are reported as skipped,
+    so a replay never re-applies an old transition over newer state. Every
+    run gets a replay id and each replayed event is recorded again as
+    "{event_id}:replay:{replay_id}" (replayOf -> the original), so it
+    applies once its mapping or intent exists. Events for one provider ref
+    run in receivedAt order. Replay records themselves are never selected.
+    Dry runs (the default) do the same against a shadow in-memory repo, so
+    they report what a live run with the same filters would do.
+    """
+    if req.provider not in {"payplus", "stub"}:
+        raise HTTPException(status_code=422, detail="Unsupported provider for replay")
+    since, until = _as_utc(req.since), _as_utc(req.until)
+    if since and until and since >= until:
+        raise HTTPException(status_code=422, detail="since must be before until")
+
+    events = await get_repos().events.list_events(
+        req.provider,
+        event_type=req.event_type,
+        unmapped=req.unmapped,
+        since=since,
+        until=until,
+        limit=req.limit,
+    )
+    events = [event for event in events if not event.get("replayOf")]
+    replay_id = uuid.uuid4().hex[:12]
+    if not req.dry_run:
+        await admin_audit.write_audit(
+            "bulk_replay_webhooks", "payment_events", req.provider, admin.uid,
+            {**req.model_dump(mode="json"), "matched": len(events), "replayId": replay_id},
+        )
+
+    verify_mode = "log_only" if req.force_log_only and req.provider == "payplus" else None
+    return StreamingResponse(
+        _stream_bulk_replay(
+            events, req.provider, verify_mode, req.dry_run,
+            req.concurrency or settings.WEBHOOK_REPLAY_CONCURRENCY, replay_id,
+        ),
+        media_type="application/x-ndjson",
+    )
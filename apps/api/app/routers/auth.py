@@ -14,6 +14,9 @@ from app.models import UserContext
 from app.config import settings
 from app.services.email_service import send_magic_link_email
 from app.security.rate_limit import create_rate_limiter_ip
+from app.security.session_cache import session_cache
+from app.security import session_tokens
+from app.repos import analytics
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +43,7 @@ COOKIE_NAME = "ironmind_session"
 @router.post("/auth/request", status_code=204, dependencies=[Depends(create_rate_limiter_ip("auth_req", 5, 60))])
 async def request_magic_link(
     req: AuthRequest,
-    db: firestore.Client = Depends(get_db)
+    db: firestore.AsyncClient = Depends(get_db)
 ):
     """
     Generate a magic link and simulate sending it (log to console for dev).
@@ -67,7 +70,7 @@ async def request_magic_link(
     # Use token_hash as ID or random ID? 
     # Let's use random ID and query by hash or just use hash as ID for simplicity?
     # Using hash as ID is safe if high entropy.
-    db.collection("auth_magic_links").document(token_hash).set(link_data)
+    await db.collection("auth_magic_links").document(token_hash).set(link_data)
     
     # Construct Link
     # In Prod: Use settings.FRONTEND_ORIGIN
@@ -93,7 +96,7 @@ async def request_magic_link(
 async def verify_magic_link(
     token: str,
     response: Response,
-    db: firestore.Client = Depends(get_db)
+    db: firestore.AsyncClient = Depends(get_db)
 ):
     """
     Validate token, create session, set cookie, redirect to app.
@@ -101,7 +104,7 @@ async def verify_magic_link(
     token_hash = hashlib.sha256(token.encode()).hexdigest()
     
     doc_ref = db.collection("auth_magic_links").document(token_hash)
-    doc = doc_ref.get()
+    doc = await doc_ref.get()
     
     if not doc.exists:
         raise HTTPException(status_code=400, detail="Invalid or expired link")
@@ -128,7 +131,7 @@ async def verify_magic_link(
     email = data.get("email")
     
     # Mark used
-    doc_ref.update({"used": True, "usedAt": now})
+    await doc_ref.update({"used": True, "usedAt": now})
     
     # Find or Create User
     users_ref = db.collection("users")
@@ -140,12 +143,19 @@ async def verify_magic_link(
     # Note: User requirements say "uid can be deterministic... or random".
     # Let's search for existing user with this email.
     user_query = users_ref.where("email", "==", email).limit(1).stream()
-    existing_user = next(user_query, None)
+    user_docs = [snap async for snap in user_query]
+    existing_user = user_docs[0] if user_docs else None
     
     if existing_user:
         uid = existing_user.id
         # Update lastSeen
-        users_ref.document(uid).update({"lastSeenAt": now})
+        previous_seen_at = existing_user.to_dict().get("lastSeenAt")
+        await users_ref.document(uid).update({"lastSeenAt": now})
+        try:
+            await analytics.record_active(now, previous_seen_at)
+        except Exception as e:
+            # Rollups are best-effort; never block sign-in
+            logger.warning(f"Failed to record daily active user: {e}")
     else:
         # Create new user
         uid = str(uuid.uuid4())
@@ -156,23 +166,32 @@ async def verify_magic_link(
             "lastSeenAt": now,
             "name": email.split("@")[0] # Default name
         }
-        users_ref.document(uid).set(initial_user)
+        await users_ref.document(uid).set(initial_user)
         logger.info(f"Created new user {uid} for {email}")
+        try:
+            await analytics.record_signup(now)
+        except Exception as e:
+            logger.warning(f"Failed to record daily signup: {e}")
 
     # Create Session
     session_id = secrets.token_urlsafe(32)
     session_expires = now + timedelta(seconds=SESSION_TTL)
     
-    session_data = {
-        "sessionId": session_id,
-        "uid": uid,
-        "email": email,
-        "createdAt": now,
-        "expiresAt": session_expires,
-        "ip": "unknown" # Could populate from request
-    }
-    
-    db.collection("sessions").document(session_id).set(session_data)
+    if settings.SESSION_MODE == "signed":
+        # Stateless: everything needed to validate is in the signed cookie
+        cookie_value = session_tokens.issue_token(session_id, uid, email, session_expires)
+    else:
+        session_data = {
+            "sessionId": session_id,
+            "uid": uid,
+            "email": email,
+            "createdAt": now,
+            "expiresAt": session_expires,
+            "ip": "unknown" # Could populate from request
+        }
+        
+        await db.collection("sessions").document(session_id).set(session_data)
+        cookie_value = session_id
     
     # Set Cookie
     # Secure=True in Prod (implied by settings or generic boolean), HttpOnly=True, SameSite=Lax
@@ -180,7 +199,7 @@ async def verify_magic_link(
     
     response.set_cookie(
         key=COOKIE_NAME,
-        value=session_id,
+        value=cookie_value,
         max_age=SESSION_TTL,
         httponly=True,
         samesite="lax",
@@ -213,14 +232,19 @@ async def get_session(
 async def logout(
     request: Request,
     response: Response,
-    db: firestore.Client = Depends(get_db)
+    db: firestore.AsyncClient = Depends(get_db)
 ):
     """
-    Clear cookie and delete session doc.
+    Clear cookie and delete session doc (or revoke the signed session).
     """
     session_id = request.cookies.get(COOKIE_NAME)
-    if session_id:
-        db.collection("sessions").document(session_id).delete()
+    if session_id and session_tokens.is_signed_token(session_id):
+        payload = session_tokens.verify_token(session_id)
+        if payload:
+            await session_tokens.revoke(payload)
+    elif session_id:
+        await db.collection("sessions").document(session_id).delete()
+        session_cache.invalidate(session_id)
         
     response.delete_cookie(key=COOKIE_NAME)
     return Response(status_code=204)
@@ -37,7 +37,7 @@ async def create_checkout_session(
     scope = "course" if request.type == "one_time" else "membership"
 
     try:
-        result = payments_service.create_checkout(
+        result = await payments_service.create_checkout(
             uid=user.uid,
             kind=request.type,
             scope=scope,
@@ -54,7 +54,7 @@ async def create_checkout_session(
             }
         )
 
-        activity_events.write_event("checkout_started", user.uid, course_id=request.courseId)
+        await activity_events.write_event("checkout_started", user.uid, course_id=request.courseId)
 
         return CheckoutResponse(url=result["url"], intentId=result.get("intentId"))
 
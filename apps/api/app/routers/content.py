@@ -57,7 +57,7 @@ async def download_plan_pdf(
     log_ctx = {"uid": uid, "plan_id": plan_id}
 
     # 1. Load plan
-    plan = plans_repo.get_plan_admin(plan_id)
+    plan = await plans_repo.get_plan_admin(plan_id)
     if not plan:
         logger.info("Plan not found", extra=log_ctx)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan not found")
@@ -70,7 +70,7 @@ async def download_plan_pdf(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan has no associated course")
 
     # 2. Access check
-    allowed = access_service.can_access_course(uid, course_id)
+    allowed = await access_service.can_access_course(uid, course_id)
     if not allowed:
         logger.info("Access denied for plan download", extra=log_ctx)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
@@ -91,7 +91,7 @@ async def download_plan_pdf(
     url = generate_signed_download_url(pdf_path, ttl_seconds=ttl)
 
     logger.info("Plan PDF download URL generated", extra=log_ctx)
-    activity_events.write_event("content_download", uid, course_id=course_id, plan_id=plan_id)
+    await activity_events.write_event("content_download", uid, course_id=course_id, plan_id=plan_id)
 
     return {"url": url, "expiresIn": ttl}
 
@@ -124,7 +124,7 @@ async def get_lesson_playback(
                                extra={**log_ctx, "origin": origin, "raw_origin": raw_origin})
 
     # 1. Load lesson
-    lesson = lessons_repo.get_lesson_admin(lesson_id)
+    lesson = await lessons_repo.get_lesson_admin(lesson_id)
     if not lesson:
         logger.info("Lesson not found", extra=log_ctx)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found")
@@ -137,7 +137,7 @@ async def get_lesson_playback(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson has no associated course")
 
     # 2. Access check
-    allowed = access_service.can_access_course(uid, course_id)
+    allowed = await access_service.can_access_course(uid, course_id)
     if not allowed:
         logger.info("Access denied for lesson playback", extra=log_ctx)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
@@ -152,6 +152,6 @@ async def get_lesson_playback(
     embed_url = f"{settings.VIMEO_EMBED_BASE_URL}/{video_id}"
 
     logger.info("Lesson playback URL generated", extra=log_ctx)
-    activity_events.write_event("content_playback", uid, course_id=course_id, lesson_id=lesson_id)
+    await activity_events.write_event("content_playback", uid, course_id=course_id, lesson_id=lesson_id)
 
     return {"provider": settings.VIDEO_PROVIDER, "embedUrl": embed_url, "expiresIn": None}
@@ -5,10 +5,11 @@ Only mounted when ENV != "prod".
 """
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from app.config import settings
 from app.deps import require_admin
 from app.models import UserContext
-from app.dev.seed import seed_demo_data
+from app.dev.seed import seed_debug_entitlement, seed_demo_data
 
 router = APIRouter()
 
@@ -25,5 +26,9 @@ async def run_seed(force: int = 0, admin: UserContext = Depends(require_admin)):
     if settings.ENV == "prod":
         raise HTTPException(status_code=404, detail="Not found")
 
-    result = seed_demo_data(force=bool(force))
+    # Seeding uses the sync Firestore client — run it off the event loop
+    result = await run_in_threadpool(seed_demo_data, force=bool(force))
+    ent_id = await seed_debug_entitlement()
+    if ent_id:
+        result["created"].append(ent_id)
     return result
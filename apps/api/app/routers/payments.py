@@ -8,7 +8,7 @@ router = APIRouter()
 @router.get("/intents/{intent_id}", response_model=PaymentIntentPublic)
 async def get_payment_intent(intent_id: str, current_user: UserContext = Depends(get_current_user)):
     repos = get_repos()
-    intent_record = repos.intents.get_intent(intent_id)
+    intent_record = await repos.intents.get_intent(intent_id)
     
     if intent_record is None:
         raise HTTPException(status_code=404, detail="Not Found")
@@ -1,33 +1,38 @@
+import asyncio
 import logging
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query
-from app.models import CoursePublic, SearchResult, LessonPublic, PlanPublic
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from app.models import CoursePublic, SearchResult, LessonPublic, PlanPublic, CourseBundle, UserContext
+from app.deps import get_optional_user
 from app.repos import courses, lessons, plans
+from app.services.http_cache import conditional
+from app.services import access_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.get("/courses", response_model=List[CoursePublic])
-async def get_courses():
+async def get_courses(request: Request, response: Response):
     """
     List all published courses.
     """
     try:
-        return courses.list_published_courses()
+        items = await courses.list_published_courses()
+        return conditional(request, response, "courses", items) or items
     except Exception as e:
         logger.error(f"Failed to list courses: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/courses/{course_id}", response_model=CoursePublic)
-async def get_course(course_id: str):
+async def get_course(course_id: str, request: Request, response: Response):
     """
     Get a specific published course by ID.
     """
     try:
-        course = courses.get_published_course(course_id)
+        course = await courses.get_published_course(course_id)
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
-        return course
+        return conditional(request, response, "course", [course], collection=False) or course
     except HTTPException:
         raise
     except Exception as e:
@@ -35,15 +40,16 @@ async def get_course(course_id: str):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/courses/{course_id}/lessons", response_model=List[LessonPublic])
-async def get_course_lessons(course_id: str):
+async def get_course_lessons(course_id: str, request: Request, response: Response):
     """
     List all published lessons for a specific course.
     """
     try:
-        course = courses.get_published_course(course_id)
+        course = await courses.get_published_course(course_id)
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
-        return lessons.list_published_lessons_by_course(course_id)
+        items = await lessons.list_published_lessons_by_course(course_id)
+        return conditional(request, response, f"lessons:{course_id}", items) or items
     except HTTPException:
         raise
     except Exception as e:
@@ -51,31 +57,75 @@ async def get_course_lessons(course_id: str):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/courses/{course_id}/plans", response_model=List[PlanPublic])
-async def get_course_plans(course_id: str):
+async def get_course_plans(course_id: str, request: Request, response: Response):
     """
     List all published plans for a specific course.
     """
     try:
-        course = courses.get_published_course(course_id)
+        course = await courses.get_published_course(course_id)
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
-        return plans.list_published_plans_by_course(course_id)
+        items = await plans.list_published_plans_by_course(course_id)
+        return conditional(request, response, f"plans:{course_id}", items) or items
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Failed to get plans for course {course_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.get("/courses/{course_id}/bundle", response_model=CourseBundle)
+async def get_course_bundle(
+    course_id: str,
+    request: Request,
+    response: Response,
+    user: Optional[UserContext] = Depends(get_optional_user),
+):
+    """
+    Course page in one request: course, ordered lessons, plans and,
+    for signed-in callers, whether they can access the course.
+    """
+    try:
+        async def no_access_check():
+            return None
+
+        course, course_lessons, course_plans, has_access = await asyncio.gather(
+            courses.get_published_course(course_id),
+            lessons.list_published_lessons_by_course(course_id),
+            plans.list_published_plans_by_course(course_id),
+            access_service.can_access_course(user.uid, course_id) if user else no_access_check(),
+        )
+        if not course:
+            raise HTTPException(status_code=404, detail="Course not found")
+
+        response.headers["Vary"] = "Cookie"
+        if user is None:
+            not_modified = conditional(
+                request, response, f"bundle:{course_id}", [course, *course_lessons, *course_plans]
+            )
+            if not_modified:
+                not_modified.headers["Vary"] = "Cookie"
+                return not_modified
+        else:
+            # Personalized: never share through the CDN
+            response.headers["Cache-Control"] = "private, no-cache"
+
+        return CourseBundle(course=course, lessons=course_lessons, plans=course_plans, hasAccess=has_access)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get bundle for course {course_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.get("/lessons/{lesson_id}", response_model=LessonPublic)
-async def get_lesson(lesson_id: str):
+async def get_lesson(lesson_id: str, request: Request, response: Response):
     """
     Get a specific published lesson by ID.
     """
     try:
-        lesson = lessons.get_published_lesson(lesson_id)
+        lesson = await lessons.get_published_lesson(lesson_id)
         if not lesson:
             raise HTTPException(status_code=404, detail="Lesson not found")
-        return lesson
+        return conditional(request, response, "lesson", [lesson], collection=False) or lesson
     except HTTPException:
         raise
     except Exception as e:
@@ -83,15 +133,15 @@ async def get_lesson(lesson_id: str):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/plans/{plan_id}", response_model=PlanPublic)
-async def get_plan(plan_id: str):
+async def get_plan(plan_id: str, request: Request, response: Response):
     """
     Get a specific published plan by ID.
     """
     try:
-        plan = plans.get_published_plan(plan_id)
+        plan = await plans.get_published_plan(plan_id)
         if not plan:
             raise HTTPException(status_code=404, detail="Plan not found")
-        return plan
+        return conditional(request, response, "plan", [plan], collection=False) or plan
     except HTTPException:
         raise
     except Exception as e:
@@ -99,7 +149,7 @@ async def get_plan(plan_id: str):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/search", response_model=SearchResult)
-async def search(q: str = Query("", min_length=0)):
+async def search(request: Request, response: Response, q: str = Query("", min_length=0)):
     """
     Search across published courses, lessons, and plans.
     """
@@ -107,12 +157,16 @@ async def search(q: str = Query("", min_length=0)):
         return SearchResult(courses=[], lessons=[], plans=[])
 
     try:
-        # Parallelize if performance needed, sequential is fine for v1
-        found_courses = courses.search_published_courses(q)
-        found_lessons = lessons.search_published_lessons(q)
-        found_plans = plans.search_published_plans(q)
+        found_courses, found_lessons, found_plans = await asyncio.gather(
+            courses.search_published_courses(q),
+            lessons.search_published_lessons(q),
+            plans.search_published_plans(q),
+        )
         
-        return SearchResult(
+        not_modified = conditional(
+            request, response, f"search:{q}", [*found_courses, *found_lessons, *found_plans]
+        )
+        return not_modified or SearchResult(
             courses=found_courses,
             lessons=found_lessons,
             plans=found_plans
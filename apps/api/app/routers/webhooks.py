@@ -8,6 +8,7 @@ POST /webhooks/stripe    — compatibility shim (calls the new handler)
 import logging
 from fastapi import APIRouter, Request, HTTPException, Depends
 
+from app.config import settings
 from app.security.rate_limit import create_rate_limiter_webhook
 
 from app.payments import service as payments_service
@@ -26,14 +27,18 @@ router = APIRouter()
 async def payments_webhook(request: Request):
     """
     Process webhooks from the active payment provider.
-    Reads raw body + headers and delegates to payments.service.handle_webhook().
+    Reads raw body + headers and delegates to payments.service.handle_webhook(),
+    or with WEBHOOK_PROCESSING_MODE=async to ingest_webhook() (verify, store,
+    ack; processed by the background worker).
     Typed exceptions map to HTTP statuses: 401, 400, 500.
     """
     raw_body = await request.body()
     headers = dict(request.headers)
 
     try:
-        result = payments_service.handle_webhook(raw_body, headers)
+        if settings.WEBHOOK_PROCESSING_MODE == "async":
+            return await payments_service.ingest_webhook(raw_body, headers)
+        result = await payments_service.handle_webhook(raw_body, headers)
         return result
     except WebhookVerificationError as exc:
         raise HTTPException(status_code=401, detail=str(exc))
@@ -1,113 +1,158 @@
+import math
 import time
 import threading
+import zlib
 from typing import Dict, List, Tuple
 from fastapi import Request, HTTPException, status, Depends
 
 from app.config import settings
 from app.models import UserContext
 
-class RateLimiter:
+class _Shard:
+    __slots__ = ("lock", "tats", "last_sweep")
+
     def __init__(self):
-        self._lock = threading.Lock()
-        self._windows: Dict[str, List[float]] = {}
+        self.lock = threading.Lock()
+        self.tats: Dict[str, float] = {}
+        self.last_sweep = 0.0
+
+class RateLimiter:
+    """
+    GCRA (generic cell rate algorithm) limiter: allows bursts of up to
+    max_requests, refilling one request every window_seconds / max_requests.
+
+    Each key stores a single float (its theoretical arrival time), so checks
+    are O(1) and memory is constant per key. Keys are spread over
+    independently locked shards. A key whose TAT has passed is at full
+    capacity and indistinguishable from a new key, so shards periodically
+    drop such idle keys.
+    """
+    def __init__(self, shards: int = 16, sweep_interval_seconds: float = 60.0):
+        self._shards: List[_Shard] = [_Shard() for _ in range(shards)]
+        self.sweep_interval_seconds = sweep_interval_seconds
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+
+    def _maybe_sweep(self, shard: _Shard, now: float) -> None:
+        # Caller holds shard.lock
+        if now - shard.last_sweep < self.sweep_interval_seconds:
+            return
+        shard.last_sweep = now
+        idle = [k for k, tat in shard.tats.items() if tat <= now]
+        for k in idle:
+            del shard.tats[k]
 
     def is_allowed(self, key: str, max_requests: int, window_seconds: int, now: float = None) -> Tuple[bool, int, int]:
+        """
+        Returns (allowed, remaining, reset_in): when denied, reset_in is the
+        seconds until the next request would be allowed; when allowed, the
+        seconds until the full burst is available again.
+        """
         if now is None:
             now = time.monotonic()
-            
-        cutoff = now - window_seconds
-        
-        with self._lock:
-            records = self._windows.get(key, [])
-            valid_records = [t for t in records if t > cutoff]
-            
-            allowed = len(valid_records) < max_requests
-            if allowed:
-                valid_records.append(now)
-                
-            self._windows[key] = valid_records
-            
-            remaining = max(0, max_requests - len(valid_records))
-            if valid_records:
-                reset_in = int((valid_records[0] + window_seconds) - now)
-            else:
-                reset_in = window_seconds
-                
-            return allowed, remaining, max(0, reset_in)
-            
+
+        interval = window_seconds / max_requests
+        shard = self._shard(key)
+
+        with shard.lock:
+            self._maybe_sweep(shard, now)
+            tat = max(shard.tats.get(key, now), now)
+            new_tat = tat + interval
+
+            if new_tat - now > window_seconds:
+                retry_in = (new_tat - window_seconds) - now
+                remaining = 0
+                return False, remaining, max(1, math.ceil(retry_in))
+
+            shard.tats[key] = new_tat
+            remaining = int((window_seconds - (new_tat - now)) / interval + 1e-9)
+            return True, remaining, max(0, math.ceil(new_tat - now))
+
+    async def check(self, key: str, max_requests: int, window_seconds: int) -> Tuple[bool, int, int]:
+        """Backend interface shared with the distributed limiter."""
+        return self.is_allowed(key, max_requests, window_seconds)
+
+    def __len__(self) -> int:
+        total = 0
+        for shard in self._shards:
+            with shard.lock:
+                total += len(shard.tats)
+        return total
+
     def clear(self):
         """For testing"""
-        with self._lock:
-            self._windows.clear()
+        for shard in self._shards:
+            with shard.lock:
+                shard.tats.clear()
+                shard.last_sweep = 0.0
 
 limiter = RateLimiter()
 
+_distributed = None
+
+def get_backend():
+    """
+    The limiter the dependencies enforce with: this process's in-memory
+    limiter, or (RATE_LIMIT_BACKEND=firestore) counters shared by every
+    instance through leased token batches.
+    """
+    global _distributed
+    if settings.RATE_LIMIT_BACKEND != "firestore":
+        return limiter
+    if _distributed is None:
+        from app.security.rate_limit_distributed import FirestoreRateLimitStore, LeasedRateLimiter
+        _distributed = LeasedRateLimiter(
+            FirestoreRateLimitStore(),
+            lease_seconds=settings.RATE_LIMIT_LEASE_SECONDS,
+            fallback=limiter,
+        )
+    return _distributed
+
 def get_client_ip(request: Request) -> str:
     x_forwarded_for = request.headers.get("X-Forwarded-For")
     if x_forwarded_for:
         return x_forwarded_for.split(",")[0].strip()
     return request.client.host if request.client else "unknown"
 
+async def _enforce(key: str, max_requests: int, window_seconds: int) -> None:
+    allowed, remaining, reset_in = await get_backend().check(key, max_requests, window_seconds)
+    if not allowed:
+        reset_epoch = int(time.time() + reset_in)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="rate_limited",
+            headers={
+                "Retry-After": str(reset_in),
+                "X-RateLimit-Limit": str(max_requests),
+                "X-RateLimit-Remaining": str(remaining),
+                "X-RateLimit-Reset": str(reset_epoch)
+            }
+        )
+
 def create_rate_limiter_ip(route_name: str, max_requests: int, window_seconds: int):
-    def dependency(request: Request):
+    async def dependency(request: Request):
         ip = get_client_ip(request)
         key = f"rl:ip:{route_name}:{ip}"
-        
-        allowed, remaining, reset_in = limiter.is_allowed(key, max_requests, window_seconds)
-        if not allowed:
-            reset_epoch = int(time.time() + reset_in)
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="rate_limited",
-                headers={
-                    "Retry-After": str(reset_in),
-                    "X-RateLimit-Limit": str(max_requests),
-                    "X-RateLimit-Remaining": str(remaining),
-                    "X-RateLimit-Reset": str(reset_epoch)
-                }
-            )
+        await _enforce(key, max_requests, window_seconds)
     return dependency
 
 def create_rate_limiter_uid(route_name: str, max_requests: int, window_seconds: int):
     # Lazy import to avoid circular dependencies
     from app.deps import get_current_user
     
-    def dependency(user: UserContext = Depends(get_current_user)) -> UserContext:
+    async def dependency(user: UserContext = Depends(get_current_user)) -> UserContext:
         key = f"rl:uid:{route_name}:{user.uid}"
-        allowed, remaining, reset_in = limiter.is_allowed(key, max_requests, window_seconds)
-        if not allowed:
-            reset_epoch = int(time.time() + reset_in)
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="rate_limited",
-                headers={
-                    "Retry-After": str(reset_in),
-                    "X-RateLimit-Limit": str(max_requests),
-                    "X-RateLimit-Remaining": str(remaining),
-                    "X-RateLimit-Reset": str(reset_epoch)
-                }
-            )
+        await _enforce(key, max_requests, window_seconds)
         return user
     return dependency
 
 def create_rate_limiter_webhook(route_name: str, max_requests: int, window_seconds: int):
-    def dependency(request: Request):
+    async def dependency(request: Request):
         if not settings.WEBHOOK_RATE_LIMIT_ENABLED:
             return
             
         ip = get_client_ip(request)
         key = f"rl:webhook:{route_name}:{ip}"
-        allowed, remaining, reset_in = limiter.is_allowed(key, max_requests, window_seconds)
-        if not allowed:
-            reset_epoch = int(time.time() + reset_in)
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="rate_limited",
-                headers={
-                    "Retry-After": str(reset_in),
-                    "X-RateLimit-Limit": str(max_requests),
-                    "X-RateLimit-Remaining": str(remaining),
-                    "X-RateLimit-Reset": str(reset_epoch)
-                }
-            )
+        await _enforce(key, max_requests, window_seconds)
     return dependency
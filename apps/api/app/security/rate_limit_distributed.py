@@ -0,0 +1,167 @@
+"""
+Shared rate limiting across instances (RATE_LIMIT_BACKEND=firestore).
+
+The authoritative GCRA state for each key lives in a central store. Instead
+of a store round trip per request, each instance leases a small batch of
+tokens (what the key's rate accrues over RATE_LIMIT_LEASE_SECONDS, at least
+one) and spends them locally until they run out or the lease expires.
+Unused leased tokens are simply forfeited, so the limit is never exceeded
+across instances; a key can at worst be under-served by one lease per
+instance.
+
+MemoryRateLimitStore is the in-process stand-in used in tests and local dev;
+FirestoreRateLimitStore keeps one small doc per key in `rate_limits`.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from google.cloud import firestore
+
+from app.repos.firestore import get_async_db
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "rate_limits"
+
+
+class Grant(NamedTuple):
+    granted: int
+    remaining: int       # tokens still available in the central bucket
+    retry_in: float      # seconds until a token is available (when granted == 0)
+
+
+def gcra_acquire(tat: Optional[float], now: float, tokens: int, max_requests: int,
+                 window_seconds: float) -> Tuple[Grant, float]:
+    """
+    Take up to `tokens` from a GCRA bucket whose theoretical arrival time is
+    `tat`. Returns the grant and the new TAT.
+    """
+    interval = window_seconds / max_requests
+    tat = max(tat or now, now)
+    available = int((window_seconds - (tat - now)) / interval + 1e-9)
+    granted = max(0, min(tokens, available))
+    new_tat = tat + granted * interval
+    if granted == 0:
+        return Grant(0, 0, (tat + interval - window_seconds) - now), tat
+    return Grant(granted, available - granted, 0.0), new_tat
+
+
+class MemoryRateLimitStore:
+    """In-process central store (tests / single instance)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tats: Dict[str, float] = {}
+        self.calls = 0
+
+    async def acquire(self, key: str, tokens: int, max_requests: int, window_seconds: float) -> Grant:
+        now = time.time()
+        with self._lock:
+            self.calls += 1
+            grant, self._tats[key] = gcra_acquire(self._tats.get(key), now, tokens, max_requests, window_seconds)
+            return grant
+
+    def clear(self):
+        """For testing"""
+        with self._lock:
+            self._tats.clear()
+            self.calls = 0
+
+
+class FirestoreRateLimitStore:
+    """
+    rate_limits/{sha256(key)} = {tat, expiresAt}. Keys are hashed so client
+    IPs are not stored; expiresAt (= tat) can back a Firestore TTL policy.
+    """
+    async def acquire(self, key: str, tokens: int, max_requests: int, window_seconds: float) -> Grant:
+        db = get_async_db()
+        ref = db.collection(COLLECTION).document(hashlib.sha256(key.encode()).hexdigest()[:40])
+
+        @firestore.async_transactional
+        async def txn_fn(txn: firestore.AsyncTransaction) -> Grant:
+            snap = await ref.get(transaction=txn)
+            tat = snap.to_dict().get("tat") if snap.exists else None
+            grant, new_tat = gcra_acquire(tat, time.time(), tokens, max_requests, window_seconds)
+            if grant.granted:
+                txn.set(ref, {"tat": new_tat, "expiresAt": datetime.fromtimestamp(new_tat, tz=timezone.utc)})
+            return grant
+
+        return await txn_fn(db.transaction())
+
+
+class _Lease:
+    """Locally held tokens for a key, or (denied) a cached refusal until expires_at."""
+    __slots__ = ("tokens", "expires_at", "store_remaining", "denied")
+
+    def __init__(self, tokens: int, expires_at: float, store_remaining: int, denied: bool = False):
+        self.tokens = tokens
+        self.expires_at = expires_at
+        self.store_remaining = store_remaining
+        self.denied = denied
+
+
+class LeasedRateLimiter:
+    def __init__(self, store, lease_seconds: float, fallback=None):
+        self.store = store
+        self.lease_seconds = lease_seconds
+        # In-process limiter used when the store cannot be reached (fail open, but still bounded)
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self._leases: Dict[str, _Lease] = {}
+        self._last_sweep = 0.0
+
+    def lease_size(self, max_requests: int, window_seconds: float) -> int:
+        return max(1, min(max_requests, math.floor(max_requests * self.lease_seconds / window_seconds)))
+
+    def _take_local(self, key: str, now: float) -> Optional[Tuple[bool, int, int]]:
+        """Answer from the local lease, or None if the store must be consulted."""
+        with self._lock:
+            if now - self._last_sweep > self.lease_seconds:
+                self._last_sweep = now
+                for k in [k for k, lease in self._leases.items() if lease.expires_at <= now]:
+                    del self._leases[k]
+            lease = self._leases.get(key)
+            if lease is None or lease.expires_at <= now:
+                return None
+            if lease.denied:
+                # Recently refused by the store: no token can exist before expires_at
+                return False, 0, max(1, math.ceil(lease.expires_at - now))
+            if lease.tokens <= 0:
+                return None
+            lease.tokens -= 1
+            return True, lease.tokens + lease.store_remaining, 0
+
+    async def check(self, key: str, max_requests: int, window_seconds: int) -> Tuple[bool, int, int]:
+        now = time.monotonic()
+        local = self._take_local(key, now)
+        if local is not None:
+            allowed, remaining, retry_in = local
+            return allowed, remaining, retry_in if not allowed else window_seconds
+
+        try:
+            grant = await self.store.acquire(key, self.lease_size(max_requests, window_seconds), max_requests, window_seconds)
+        except Exception as e:
+            logger.warning(f"Rate limit store unavailable, using local limiter: {e}")
+            if self.fallback is None:
+                return True, 0, window_seconds
+            return await self.fallback.check(key, max_requests, window_seconds)
+
+        if grant.granted == 0:
+            with self._lock:
+                self._leases[key] = _Lease(0, now + grant.retry_in, 0, denied=True)
+            return False, 0, max(1, math.ceil(grant.retry_in))
+
+        with self._lock:
+            # One token is spent by this request
+            self._leases[key] = _Lease(grant.granted - 1, now + self.lease_seconds, grant.remaining)
+        return True, grant.granted - 1 + grant.remaining, window_seconds
+
+    def clear(self):
+        """For testing"""
+        with self._lock:
+            self._leases.clear()
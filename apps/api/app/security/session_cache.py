@@ -0,0 +1,85 @@
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+
+class SessionCache:
+    """
+    Bounded LRU cache of validated sessions, keyed by session id.
+
+    Entries live for at most ttl_seconds and never past the session's own
+    expiresAt. The TTL bounds how long a session deleted by another instance
+    (e.g. logout handled elsewhere) can still be accepted here.
+    """
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str, now: float = None) -> Optional[dict]:
+        if now is None:
+            now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            deadline, session_data = entry
+            if now >= deadline:
+                del self._entries[session_id]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return session_data
+
+    def put(self, session_id: str, session_data: dict, expires_at: datetime, now: float = None) -> None:
+        if self.max_entries <= 0:
+            return
+        if now is None:
+            now = time.time()
+
+        deadline = min(now + self.ttl_seconds, expires_at.timestamp())
+        if deadline <= now:
+            return
+
+        with self._lock:
+            self._entries[session_id] = (deadline, session_data)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self):
+        """For testing"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+session_cache = SessionCache(
+    max_entries=settings.SESSION_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SESSION_CACHE_TTL_SECONDS,
+)
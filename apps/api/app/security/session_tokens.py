@@ -0,0 +1,161 @@
+"""
+Stateless signed session tokens (SESSION_MODE=signed).
+
+Token format: base64url(json payload) + "." + base64url(HMAC-SHA256(payload)).
+The payload carries sid, uid, email and exp (epoch seconds), so validation
+is pure CPU work. Logouts are recorded in the session_revocations collection,
+keyed by sid, and mirrored into an in-process set refreshed periodically.
+
+Prod refuses to start without SESSION_SIGNING_SECRET; elsewhere a secret
+generated per process stands in, so tokens don't survive a restart.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set
+
+from app.config import settings
+from app.repos.firestore import get_async_db
+
+logger = logging.getLogger(__name__)
+
+REVOCATIONS_COLLECTION = "session_revocations"
+
+_dev_secret = secrets.token_urlsafe(32)
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def _signing_key() -> bytes:
+    if settings.SESSION_SIGNING_SECRET:
+        return settings.SESSION_SIGNING_SECRET.encode()
+    if settings.is_prod:
+        raise RuntimeError("SESSION_SIGNING_SECRET is not configured")
+    return _dev_secret.encode()
+
+
+def _sign(payload_b64: str) -> str:
+    """Raises UnicodeEncodeError for a non-ASCII payload."""
+    return _b64encode(hmac.new(_signing_key(), payload_b64.encode("ascii"), hashlib.sha256).digest())
+
+
+def is_signed_token(value: str) -> bool:
+    # Firestore session ids come from token_urlsafe() and never contain "."
+    return "." in value
+
+
+def issue_token(session_id: str, uid: str, email: str, expires_at: datetime) -> str:
+    payload = {"sid": session_id, "uid": uid, "email": email, "exp": int(expires_at.timestamp())}
+    payload_b64 = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    return f"{payload_b64}.{_sign(payload_b64)}"
+
+
+def verify_token(token: str, now: float = None) -> Optional[dict]:
+    """
+    Return the payload of a well-signed, unexpired token, else None.
+    Does not consult the revocation set.
+    """
+    try:
+        payload_b64, signature = token.split(".", 1)
+        # Cookies are attacker-controlled: non-ASCII input is just a bad token
+        expected = _sign(payload_b64).encode()
+        if not hmac.compare_digest(signature.encode(), expected):
+            return None
+    except (ValueError, TypeError, RuntimeError):
+        return None
+    try:
+        payload = json.loads(_b64decode(payload_b64))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if now is None:
+        now = time.time()
+    if not isinstance(payload, dict) or not isinstance(payload.get("exp"), int) or now >= payload["exp"]:
+        return None
+    return payload
+
+
+class RevocationSet:
+    """In-process copy of the unexpired session_revocations ids."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sids: Set[str] = set()
+        self._local: Dict[str, float] = {}
+        self.refreshed_at: float = 0.0
+
+    def __contains__(self, sid: str) -> bool:
+        with self._lock:
+            return sid in self._sids
+
+    def add(self, sid: str, now: float = None) -> None:
+        with self._lock:
+            self._sids.add(sid)
+            self._local[sid] = time.time() if now is None else now
+
+    def replace(self, sids: Set[str], started_at: float) -> None:
+        """
+        Swap in a freshly loaded set. Local revocations made after the load
+        started may be missing from its results, so they are carried over.
+        """
+        with self._lock:
+            self._local = {sid: t for sid, t in self._local.items() if t >= started_at}
+            self._sids = set(sids) | set(self._local)
+            self.refreshed_at = started_at
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sids)
+
+    def clear(self):
+        """For testing"""
+        with self._lock:
+            self._sids.clear()
+            self._local.clear()
+            self.refreshed_at = 0.0
+
+revocations = RevocationSet()
+
+
+async def refresh_revocations() -> None:
+    started_at = time.time()
+    db = get_async_db()
+    now = datetime.now(timezone.utc)
+    query = db.collection(REVOCATIONS_COLLECTION).where("expiresAt", ">", now)
+    revocations.replace({doc.id async for doc in query.stream()}, started_at)
+
+
+async def revoke(payload: dict) -> None:
+    """Revoke a signed session until its own expiry."""
+    sid = payload["sid"]
+    revocations.add(sid)
+    db = get_async_db()
+    await db.collection(REVOCATIONS_COLLECTION).document(sid).set({
+        "sid": sid,
+        "uid": payload.get("uid"),
+        "revokedAt": datetime.now(timezone.utc),
+        "expiresAt": datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+    })
+
+
+async def run_revocation_refresher(interval_seconds: int) -> None:
+    """Background loop started from the app lifespan."""
+    while True:
+        try:
+            await refresh_revocations()
+        except Exception as e:
+            # Keep serving with the last known set
+            logger.warning(f"Session revocation refresh failed: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 from typing import Optional, Tuple, Any, Dict, List
-from app.repos import entitlements
+from app.repos import user_access
 
 def _to_utc_datetime(value: Any) -> Optional[datetime]:
     if value is None:
@@ -28,36 +28,59 @@ def is_active_entitlement(ent: Optional[Dict[str, Any]]) -> bool:
         return True
     return datetime.now(timezone.utc) < expires_at
 
-def has_active_membership(uid: str) -> Tuple[bool, Optional[datetime]]:
-    memb = entitlements.get_membership_entitlement(uid)
-    expires_at = _to_utc_datetime(memb.get("expiresAt")) if memb else None
-    return is_active_entitlement(memb), expires_at
+async def get_user_access(uid: str) -> Dict[str, Any]:
+    """
+    Single-read access state (user_access/{uid}).
+    Users whose access doc predates materialization get it rebuilt once.
+    """
+    access = await user_access.get_user_access(uid)
+    if access is None:
+        access = await user_access.rebuild_user_access(uid)
+    return access
 
-def can_access_course(uid: str, course_id: str) -> bool:
-    active, _ = has_active_membership(uid)
-    if active:
-        return True
-    course_ent = entitlements.get_course_entitlement(uid, course_id)
-    return is_active_entitlement(course_ent)
+def membership_active(access: Dict[str, Any]) -> bool:
+    return is_active_entitlement({
+        "status": access.get("membershipStatus"),
+        "expiresAt": access.get("membershipExpiresAt"),
+    })
+
+def course_active(access: Dict[str, Any], course_id: str) -> bool:
+    courses = access.get("courses") or {}
+    if course_id not in courses:
+        return False
+    return is_active_entitlement({"status": "active", "expiresAt": courses[course_id]})
 
-def get_access_summary(uid: str) -> dict:
-    memb = entitlements.get_membership_entitlement(uid)
-    membership_active = is_active_entitlement(memb)
-    membership_expires_at = _to_utc_datetime(memb.get("expiresAt")) if memb else None
+async def has_active_membership(uid: str) -> Tuple[bool, Optional[datetime]]:
+    access = await get_user_access(uid)
+    return membership_active(access), _to_utc_datetime(access.get("membershipExpiresAt"))
 
-    all_ents = entitlements.list_entitlements(uid)
-    entitled_course_ids: List[str] = []
-    for ent in all_ents:
-        if ent.get("kind") == "course" and is_active_entitlement(ent):
-            cid = ent.get("courseId")
-            if cid:
-                entitled_course_ids.append(cid)
+async def can_access_course(uid: str, course_id: str) -> bool:
+    access = await get_user_access(uid)
+    return membership_active(access) or course_active(access, course_id)
 
-    # de-dup + stable ordering
-    entitled_course_ids = sorted(set(entitled_course_ids))
+async def check_courses(uid: str, course_ids: List[str]) -> Dict[str, bool]:
+    """Answer many course checks from one access doc read."""
+    access = await get_user_access(uid)
+    if membership_active(access):
+        return {cid: True for cid in course_ids}
+    return {cid: course_active(access, cid) for cid in course_ids}
+
+def summarize_access(access: Dict[str, Any]) -> dict:
+    entitled_course_ids: List[str] = [
+        cid for cid in (access.get("courses") or {}) if course_active(access, cid)
+    ]
 
     return {
-        "membershipActive": membership_active,
-        "membershipExpiresAt": membership_expires_at,
-        "entitledCourseIds": entitled_course_ids,
+        "membershipActive": membership_active(access),
+        "membershipExpiresAt": _to_utc_datetime(access.get("membershipExpiresAt")),
+        # stable ordering
+        "entitledCourseIds": sorted(entitled_course_ids),
     }
+
+async def get_access_summary(uid: str) -> dict:
+    return summarize_access(await get_user_access(uid))
+
+async def get_access_summaries(uids: List[str]) -> Dict[str, dict]:
+    """Summaries for a page of users in a handful of round trips."""
+    docs = await user_access.get_many_user_access(uids)
+    return {uid: summarize_access(docs[uid]) for uid in uids}
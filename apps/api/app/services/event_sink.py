@@ -0,0 +1,131 @@
+"""
+Buffered, batched sink for fire-and-forget documents (activity events, admin audit).
+
+Handlers enqueue into a bounded in-memory buffer; a worker started from the
+app lifespan writes them with Firestore batch writes whenever EVENT_SINK_BATCH_SIZE
+documents are waiting or EVENT_SINK_FLUSH_MS has passed. When the buffer is
+full new documents are dropped and counted rather than slowing the request.
+Whatever is buffered at shutdown is flushed before the process exits.
+
+While the sink is not running (tests, scripts) callers write inline.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from app.config import settings
+from app.repos.firestore import get_async_db
+
+logger = logging.getLogger(__name__)
+
+# Firestore caps a write batch at 500 operations
+MAX_BATCH_WRITES = 500
+
+PendingDoc = Tuple[str, Optional[str], dict]
+
+
+class EventSink:
+    def __init__(self, max_buffer: int, batch_size: int, flush_interval_ms: int):
+        self.max_buffer = max_buffer
+        self.batch_size = min(batch_size, MAX_BATCH_WRITES)
+        self.flush_interval = flush_interval_ms / 1000
+        self._buffer: Deque[PendingDoc] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def enqueue(self, collection: str, doc_id: Optional[str], data: dict) -> bool:
+        """
+        Queue a document for a batched write (doc_id None = auto id).
+        Returns False if it was dropped because the buffer is full.
+        """
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            return False
+        self._buffer.append((collection, doc_id, data))
+        self.enqueued += 1
+        if len(self._buffer) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    async def _write_batch(self, items) -> None:
+        try:
+            # Inside the try: a client error must not kill the worker
+            db = get_async_db()
+            batch = db.batch()
+            for collection, doc_id, data in items:
+                ref = db.collection(collection).document(doc_id) if doc_id else db.collection(collection).document()
+                batch.set(ref, data)
+            await batch.commit()
+            self.written += len(items)
+        except Exception as e:
+            # Best-effort, like the inline writes this replaces
+            self.failed += len(items)
+            logger.error(f"Event sink batch write failed ({len(items)} docs): {e}", exc_info=True)
+
+    async def flush(self) -> None:
+        """Write everything currently buffered."""
+        while self._buffer:
+            take = min(self.batch_size, len(self._buffer))
+            items = [self._buffer.popleft() for _ in range(take)]
+            await self._write_batch(items)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop the worker and flush what is left (called from the lifespan).
+        The worker is woken and awaited rather than cancelled, so a batch it
+        is committing is not lost.
+        """
+        if self._worker is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._worker
+            self._worker = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "buffered": len(self._buffer),
+            "maxBuffer": self.max_buffer,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def clear(self):
+        """For testing"""
+        self._buffer.clear()
+        self.enqueued = self.written = self.dropped = self.failed = 0
+
+event_sink = EventSink(
+    max_buffer=settings.EVENT_SINK_MAX_BUFFER,
+    batch_size=settings.EVENT_SINK_BATCH_SIZE,
+    flush_interval_ms=settings.EVENT_SINK_FLUSH_MS,
+)
@@ -0,0 +1,73 @@
+"""
+HyperLogLog sketch for distinct counts (e.g. unique active users).
+
+2**precision one-byte registers; at the default precision of 12 a sketch is
+4 KiB with ~1.6% standard error. Sketches merge by register-wise max, so
+merging is commutative and idempotent: unions over days are exact merges
+and re-applying the same sketch is harmless.
+"""
+
+import hashlib
+import math
+from typing import Iterable, Optional
+
+DEFAULT_PRECISION = 12
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: Optional[bytes] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is not None and len(registers) != self.m:
+            raise ValueError("register count does not match precision")
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, value: str) -> bool:
+        """Add a value; True if the sketch changed."""
+        x = _hash64(value)
+        index = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other: "HyperLogLog") -> bool:
+        """Fold another sketch into this one; True if this sketch changed."""
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches of different precision")
+        merged = bytearray(map(max, self.registers, other.registers))
+        changed = merged != self.registers
+        self.registers = merged
+        return changed
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, precision: int = DEFAULT_PRECISION) -> "HyperLogLog":
+        return cls(precision, data)
+
+    @classmethod
+    def union(cls, sketches: Iterable["HyperLogLog"], precision: int = DEFAULT_PRECISION) -> "HyperLogLog":
+        out = cls(precision)
+        for sketch in sketches:
+            out.merge(sketch)
+        return out
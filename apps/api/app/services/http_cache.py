@@ -0,0 +1,103 @@
+"""
+Conditional GET helpers for the public catalog.
+
+ETags are strong validators derived from each document's id + updatedAt
+(documents without updatedAt fall back to a hash of their public fields),
+so they are identical across instances and safe to share through a CDN.
+Last-Modified (and If-Modified-Since) is only used for single documents:
+for a list, the newest updatedAt among the items still returned doesn't
+move when one is unpublished or deleted, while the ETag does.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.config import settings
+
+
+def _validator_parts(items: Iterable[BaseModel]) -> Tuple[List[str], Optional[datetime]]:
+    parts = []
+    newest = None
+    for item in items:
+        updated_at = getattr(item, "updatedAt", None)
+        if isinstance(updated_at, datetime):
+            if updated_at.tzinfo is None:
+                updated_at = updated_at.replace(tzinfo=timezone.utc)
+            parts.append(f"{item.id}@{updated_at.isoformat()}")
+            if newest is None or updated_at > newest:
+                newest = updated_at
+        else:
+            content = hashlib.sha256(item.model_dump_json().encode()).hexdigest()[:16]
+            parts.append(f"{item.id}#{content}")
+    return parts, newest
+
+
+def catalog_validators(kind: str, items: Iterable[BaseModel]) -> Tuple[str, Optional[datetime]]:
+    """Return (etag, last_modified) for a catalog payload of the given kind."""
+    parts, newest = _validator_parts(items)
+    digest = hashlib.sha256("\n".join([kind, *parts]).encode()).hexdigest()[:32]
+    return f'"{digest}"', newest
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    candidates = [c.strip() for c in header.split(",")]
+    return any(c.removeprefix("W/") == etag for c in candidates)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have one-second resolution
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.PUBLIC_CATALOG_MAX_AGE_SECONDS}, must-revalidate",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def conditional(
+    request: Request,
+    response: Response,
+    kind: str,
+    items: Iterable[BaseModel],
+    collection: bool = True,
+) -> Optional[Response]:
+    """
+    Set validators on `response`; return a bare 304 response if the client's
+    copy is current, so the caller can skip serialization entirely.
+    Pass collection=False for a single-document payload to add Last-Modified.
+    """
+    etag, last_modified = catalog_validators(kind, items)
+    if collection:
+        last_modified = None
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
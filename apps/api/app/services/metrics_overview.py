@@ -0,0 +1,93 @@
+"""
+Command Center overview counts.
+
+Counts come from Firestore count() aggregations (exact, no documents
+transferred), issued concurrently. The result is kept as an in-process
+snapshot: requests within METRICS_OVERVIEW_TTL_SECONDS are served from it,
+and an older snapshot is still returned immediately while a single
+background refresh replaces it.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.config import settings
+from app.repos.firestore import get_async_db
+
+logger = logging.getLogger(__name__)
+
+
+async def _count(query) -> int:
+    results = await query.count(alias="count").get()
+    return int(results[0][0].value)
+
+
+async def load_overview_counts() -> Dict[str, int]:
+    db = get_async_db()
+    queries = {
+        "users_total": db.collection("users"),
+        "courses_total": db.collection("courses"),
+        "courses_published": db.collection("courses").where("published", "==", True),
+        "lessons_total": db.collection("lessons"),
+        "lessons_published": db.collection("lessons").where("published", "==", True),
+        "plans_total": db.collection("plans"),
+        "plans_published": db.collection("plans").where("published", "==", True),
+        "purchases_total": db.collection("purchases"),
+        "subscriptions_total": db.collection("subscriptions"),
+        "entitlements_total": db.collection("entitlements"),
+    }
+    counts = await asyncio.gather(*(_count(q) for q in queries.values()))
+    return dict(zip(queries, counts))
+
+
+class CachedSnapshot:
+    """
+    Stale-while-revalidate holder for an expensive async computation.
+    Concurrent callers share one in-flight load.
+    """
+    def __init__(self, loader: Callable[[], Awaitable[Any]], ttl_seconds: int):
+        self._loader = loader
+        self.ttl_seconds = ttl_seconds
+        self._value: Any = None
+        self._generated_at: Optional[datetime] = None
+        self._loaded_at: float = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _load(self) -> Any:
+        value = await self._loader()
+        self._value = value
+        self._generated_at = datetime.now(timezone.utc)
+        self._loaded_at = time.monotonic()
+        return value
+
+    def _refresh_task(self) -> asyncio.Task:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._load())
+            self._task.add_done_callback(self._log_failure)
+        return self._task
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Snapshot refresh failed: {task.exception()}")
+
+    async def get(self) -> Tuple[Any, datetime]:
+        """Return (value, generated_at); only the very first call waits for a load."""
+        if self._generated_at is None:
+            await asyncio.shield(self._refresh_task())
+        elif time.monotonic() - self._loaded_at >= self.ttl_seconds:
+            self._refresh_task()
+        return self._value, self._generated_at
+
+    def clear(self):
+        """For testing"""
+        self._value = None
+        self._generated_at = None
+        self._loaded_at = 0.0
+        self._task = None
+
+overview_snapshot = CachedSnapshot(load_overview_counts, settings.METRICS_OVERVIEW_TTL_SECONDS)
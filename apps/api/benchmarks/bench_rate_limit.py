@@ -0,0 +1,77 @@
+"""
+Microbenchmark for the rate limiter engine.
+
+Drives RateLimiter.is_allowed from several threads in two shapes: many
+distinct keys (per-IP limits under a crawl) and a few hot keys with a large
+allowance (the webhook limit). Reports throughput and resident key count;
+the previous sliding-log engine (one global lock, list of timestamps per
+key) runs alongside for comparison.
+
+    python -m benchmarks.bench_rate_limit [--keys 100000] [--threads 8] [--calls 400000]
+"""
+
+import argparse
+import threading
+import time
+from typing import Dict, List
+
+from app.security.rate_limit import RateLimiter
+
+
+class SlidingLogLimiter:
+    """The engine RateLimiter replaced, kept here as the baseline."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._windows: Dict[str, List[float]] = {}
+
+    def is_allowed(self, key, max_requests, window_seconds, now=None):
+        now = time.monotonic() if now is None else now
+        cutoff = now - window_seconds
+        with self._lock:
+            valid = [t for t in self._windows.get(key, []) if t > cutoff]
+            allowed = len(valid) < max_requests
+            if allowed:
+                valid.append(now)
+            self._windows[key] = valid
+            return allowed, max(0, max_requests - len(valid)), window_seconds
+
+    def __len__(self):
+        return len(self._windows)
+
+
+def run(limiter, keys: int, threads: int, calls: int, max_requests: int) -> float:
+    per_thread = calls // threads
+
+    def worker(offset: int):
+        for i in range(per_thread):
+            limiter.is_allowed(f"rl:ip:bench:{(offset + i * 7919) % keys}", max_requests, 60)
+
+    pool = [threading.Thread(target=worker, args=(t * per_thread,)) for t in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=400_000)
+    parser.add_argument("--max-requests", type=int, default=600)
+    args = parser.parse_args()
+
+    scenarios = (
+        ("many keys", args.keys, 5),
+        ("hot keys", 16, args.max_requests),
+    )
+    for label, keys, max_requests in scenarios:
+        print(f"{label}: {keys:,} keys, {max_requests} per 60s, {args.threads} threads")
+        for name, limiter in (("gcra (sharded)", RateLimiter()), ("sliding log", SlidingLogLimiter())):
+            elapsed = run(limiter, keys, args.threads, args.calls, max_requests)
+            print(f"  {name:16} {args.calls / elapsed:>12,.0f} checks/s   {len(limiter):>8,} keys resident")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Microbenchmark for payment payload redaction.
+
+Redacts the PayPlus webhook fixtures (tests/fixtures/payplus) and large
+synthetic payloads (wide customer/item lists, deep nesting, card-like values)
+with the compiled Redactor, and with the previous engine (substring scan over
+every redact key, recursive, PAN/CVV checks via repeated str.replace) as the
+baseline. Both must produce identical output.
+
+    python -m benchmarks.bench_redact [--rounds 2000] [--items 500]
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Set
+
+from app.config import settings
+from app.payments.redact import get_redactor
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "payplus"
+
+
+def legacy_redact_payload(obj: Any, redact_keys: Set[str], max_depth: int = 6, current_depth: int = 0) -> Any:
+    """The engine Redactor replaced, kept here as the baseline."""
+    if current_depth > max_depth:
+        return "***max_depth_exceeded***"
+    if isinstance(obj, dict):
+        out = {}
+        for k, v in obj.items():
+            lk = str(k).lower()
+            if any(rk in lk for rk in redact_keys):
+                out[k] = "***redacted***"
+                continue
+            if isinstance(v, str):
+                v_clean = v.replace(" ", "").replace("-", "")
+                if v_clean.isdigit() and (
+                    13 <= len(v_clean) <= 19
+                    or (len(v_clean) in (3, 4) and ("cv" in lk or "sec" in lk or "code" in lk))
+                ):
+                    out[k] = "***redacted***"
+                    continue
+            out[k] = legacy_redact_payload(v, redact_keys, max_depth, current_depth + 1)
+        return out
+    if isinstance(obj, list):
+        return [legacy_redact_payload(item, redact_keys, max_depth, current_depth + 1) for item in obj]
+    if isinstance(obj, str) and len(obj) > 500:
+        return obj[:200] + "...(truncated)"
+    return obj
+
+
+def synthetic_payload(items: int) -> dict:
+    return {
+        "transaction": {
+            "uid": "txn_bench",
+            "payment_request_uid": "pp_req_bench",
+            "status_code": "000",
+            "card_information": {"four_digits": "1111", "expiry_month": "12", "card_holder_name": "A B"},
+            "notes": "x" * 800,
+        },
+        "customer": {"customer_name": "Bench", "email": "b@example.com", "phone": "050-0000000"},
+        "items": [
+            {
+                "name": f"item {i}",
+                "quantity": 1,
+                "price": i * 10,
+                "reference": f"4111-1111-1111-{i:04d}",
+                "security_code": f"{i % 1000:03d}",
+                "meta": {"sku": f"sku_{i}", "tags": ["a", "b"], "nested": {"deeper": {"deepest": {"x": i}}}},
+            }
+            for i in range(items)
+        ],
+    }
+
+
+def run(redact: Callable[[Any], Any], payloads, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for payload in payloads:
+            redact(payload)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=500)
+    args = parser.parse_args()
+
+    keys = set(settings.PAYPLUS_PAYLOAD_REDACT_KEYS)
+    redactor = get_redactor(keys)
+    fixtures = [json.loads(p.read_text(encoding="utf-8")) for p in sorted(FIXTURES.glob("*.json"))]
+    synthetic = [synthetic_payload(args.items)]
+
+    scenarios = (
+        (f"fixtures ({len(fixtures)} payplus payloads)", fixtures, args.rounds),
+        (f"synthetic ({args.items} items)", synthetic, max(1, args.rounds // 50)),
+    )
+    for label, payloads, rounds in scenarios:
+        for payload in payloads:
+            assert redactor.redact(payload) == legacy_redact_payload(payload, keys), label
+        print(f"{label}, {len(keys)} redact keys, {rounds} rounds")
+        timings = (
+            ("compiled", run(redactor.redact, payloads, rounds)),
+            ("substring scan", run(lambda p: legacy_redact_payload(p, keys), payloads, rounds)),
+        )
+        baseline = timings[-1][1]
+        for name, elapsed in timings:
+            print(f"  {name:16} {rounds * len(payloads) / elapsed:>12,.0f} payloads/s   {baseline / elapsed:>5.2f}x")
+
+if __name__ == "__main__":
+    main()
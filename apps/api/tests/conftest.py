@@ -33,6 +33,33 @@ def _reset_payments_state():
     repo_memory.reset()
     yield
 
+@pytest.fixture
+def memory_access(monkeypatch):
+    """
+    In-memory stand-in for the Firestore side of the entitlement write path:
+    entitlements merge and fold into user_access docs exactly as the
+    transactional writer does. Returns (entitlements, access) keyed by id/uid.
+    """
+    from app.repos import entitlements, user_access
+
+    ents: dict = {}
+    access: dict = {}
+
+    async def write(ent_id, data, require_existing=False, created_at=None):
+        if require_existing and ent_id not in ents:
+            raise KeyError(f"Entitlement {ent_id} not found")
+        merged = ents[ent_id] = {**ents.get(ent_id, {}), **data}
+        doc = access.setdefault(merged["uid"], user_access.empty_access(merged["uid"]))
+        user_access.apply_entitlement(doc, merged)
+        return merged
+
+    async def get_access(uid):
+        return access.get(uid) or user_access.empty_access(uid)
+
+    monkeypatch.setattr(entitlements, "_write_entitlement", write)
+    monkeypatch.setattr(user_access, "get_user_access", get_access)
+    return ents, access
+
 @pytest.fixture(scope="session")
 def client():
     from fastapi.testclient import TestClient
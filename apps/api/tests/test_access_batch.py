@@ -0,0 +1,66 @@
+"""
+Tests for POST /access/courses:batch.
+Firestore is replaced by an in-memory fake behind the request DocumentLoader.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.deps import get_db
+from app.repos import loader as loader_mod
+from tests.test_document_loader import FakeAsyncClient
+
+client = TestClient(app)
+HEADERS = {"X-Debug-Uid": "u1"}
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeAsyncClient({
+        "courses/c1": {"titleHe": "א"},
+        "courses/c2": {"titleHe": "ב"},
+        "courses/c3": {"titleHe": "ג"},
+        "user_access/u1": {"uid": "u1", "membershipStatus": "inactive", "courses": {"c2": None}},
+    })
+    monkeypatch.setattr(loader_mod, "get_async_db", lambda: db)
+    app.dependency_overrides[get_db] = lambda: db
+    yield db
+    app.dependency_overrides.clear()
+
+
+def test_batch_answers_every_course_in_one_round_trip(fake_db):
+    res = client.post(
+        "/access/courses:batch",
+        json={"courseIds": ["c1", "c2", "c3", "missing", "c2"]},
+        headers=HEADERS,
+    )
+    assert res.status_code == 200, res.text
+    data = res.json()
+    assert data["allowed"] == {"c1": False, "c2": True, "c3": False, "missing": False}
+    assert data["notFound"] == ["missing"]
+
+    assert len(fake_db.get_all_calls) == 1
+    assert fake_db.single_gets == 0
+
+
+def test_batch_membership_allows_all_existing(fake_db):
+    fake_db.docs["user_access/u1"]["membershipStatus"] = "active"
+    res = client.post("/access/courses:batch", json={"courseIds": ["c1", "c3"]}, headers=HEADERS)
+    assert res.status_code == 200
+    assert res.json()["allowed"] == {"c1": True, "c3": True}
+
+
+def test_batch_empty(fake_db):
+    res = client.post("/access/courses:batch", json={"courseIds": []}, headers=HEADERS)
+    assert res.status_code == 200
+    assert res.json() == {"allowed": {}, "notFound": []}
+
+
+def test_batch_requires_auth(fake_db):
+    res = client.post("/access/courses:batch", json={"courseIds": ["c1"]})
+    assert res.status_code == 401
+
+
+def test_batch_limit(fake_db):
+    res = client.post("/access/courses:batch", json={"courseIds": [f"c{i}" for i in range(101)]}, headers=HEADERS)
+    assert res.status_code == 422
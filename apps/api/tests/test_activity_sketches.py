@@ -0,0 +1,140 @@
+"""
+HyperLogLog sketches and the DAU/WAU/MAU pipeline built on them.
+Firestore is replaced by in-memory fakes.
+"""
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.repos import activity_sketches
+from app.services.hll import HyperLogLog
+
+
+@pytest.fixture(autouse=True)
+def clean_local():
+    activity_sketches.clear()
+    yield
+    activity_sketches.clear()
+
+
+def test_hll_estimates_within_error():
+    sketch = HyperLogLog()
+    for i in range(20000):
+        sketch.add(f"user-{i}")
+        sketch.add(f"user-{i}")  # duplicates do not count
+    assert abs(sketch.count() - 20000) / 20000 < 0.05
+
+    small = HyperLogLog()
+    for i in range(25):
+        small.add(f"u{i}")
+    assert small.count() == 25
+
+
+def test_hll_merge_is_union_and_idempotent():
+    a, b = HyperLogLog(), HyperLogLog()
+    for i in range(3000):
+        a.add(f"u{i}")
+    for i in range(2000, 5000):
+        b.add(f"u{i}")
+
+    union = HyperLogLog.union([a, b])
+    assert abs(union.count() - 5000) / 5000 < 0.05
+
+    again = HyperLogLog.from_bytes(union.to_bytes())
+    assert again.merge(a) is False
+    assert again.count() == union.count()
+
+    with pytest.raises(ValueError):
+        a.merge(HyperLogLog(precision=10))
+
+
+def test_flush_merges_dirty_days(monkeypatch):
+    store = {}
+
+    async def fake_merge(day, sketch):
+        store.setdefault(day, HyperLogLog()).merge(sketch)
+
+    monkeypatch.setattr(activity_sketches, "merge_into_store", fake_merge)
+    now = datetime.now(timezone.utc)
+    for uid in ("a", "b", "a"):
+        activity_sketches.record(uid, now)
+    activity_sketches.record("c", now - timedelta(days=5))
+
+    asyncio.run(activity_sketches.flush())
+    today = now.date().isoformat()
+    assert store[today].count() == 2
+    assert store[(now - timedelta(days=5)).date().isoformat()].count() == 1
+
+    # Nothing new: no further merges; old local days were dropped
+    store.clear()
+    asyncio.run(activity_sketches.flush())
+    assert store == {}
+    assert list(activity_sketches._local) == [today]
+
+
+def test_failed_flush_is_retried(monkeypatch):
+    calls = []
+
+    async def flaky_merge(day, sketch):
+        calls.append(day)
+        if len(calls) == 1:
+            raise RuntimeError("unavailable")
+
+    monkeypatch.setattr(activity_sketches, "merge_into_store", flaky_merge)
+    activity_sketches.record("a")
+    asyncio.run(activity_sketches.flush())
+    asyncio.run(activity_sketches.flush())
+    assert len(calls) == 2
+
+
+class FakeSnap:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data else None
+
+
+class FakeDb:
+    def __init__(self, docs):
+        self.docs = docs
+        self.get_all_calls = []
+
+    def collection(self, name):
+        assert name == "activity_sketches"
+        return self
+
+    def document(self, doc_id):
+        return doc_id
+
+    async def get_all(self, refs):
+        self.get_all_calls.append(list(refs))
+        for ref in refs:
+            yield FakeSnap(ref, self.docs.get(ref))
+
+
+def test_active_users_merge_daily_sketches(monkeypatch):
+    as_of = date(2024, 6, 30)
+    docs = {}
+    for offset in range(40):
+        sketch = HyperLogLog()
+        # 100 regulars every day plus 10 one-off users per day
+        for i in range(100):
+            sketch.add(f"regular-{i}")
+        for i in range(10):
+            sketch.add(f"day{offset}-{i}")
+        docs[(as_of - timedelta(days=offset)).isoformat()] = {"precision": 12, "registers": sketch.to_bytes()}
+    db = FakeDb(docs)
+    monkeypatch.setattr(activity_sketches, "get_async_db", lambda: db)
+
+    result = asyncio.run(activity_sketches.get_active_users(as_of))
+
+    assert result["date"] == "2024-06-30"
+    assert abs(result["dau"] - 110) <= 3
+    assert abs(result["wau"] - 170) <= 6
+    assert abs(result["mau"] - 400) <= 16
+    # One batched read of 30 docs, independent of event volume
+    assert len(db.get_all_calls) == 1 and len(db.get_all_calls[0]) == 30
@@ -47,9 +47,11 @@ def test_activity_forbidden_for_non_admin(test_client):
 
 def test_activity_returns_list_for_admin(test_client, monkeypatch):
     """GET /admin/activity returns a list of events for admin users."""
+    async def fake_list_recent(limit=50):
+        return FAKE_EVENTS
+
     monkeypatch.setattr(
-        admin_activity.activity_events, "list_recent",
-        lambda limit=50: FAKE_EVENTS,
+        admin_activity.activity_events, "list_recent", fake_list_recent,
     )
 
     r = test_client.get(
@@ -66,9 +68,11 @@ def test_activity_returns_list_for_admin(test_client, monkeypatch):
 
 def test_activity_empty_when_no_events(test_client, monkeypatch):
     """GET /admin/activity returns empty list when no events exist."""
+    async def fake_list_recent(limit=50):
+        return []
+
     monkeypatch.setattr(
-        admin_activity.activity_events, "list_recent",
-        lambda limit=50: [],
+        admin_activity.activity_events, "list_recent", fake_list_recent,
     )
 
     r = test_client.get(
@@ -21,17 +21,20 @@ def mock_entitlements_repo(monkeypatch):
 
     state = RepoState()
 
-    def mock_upsert(*args, **kwargs):
+    async def mock_upsert(*args, **kwargs):
         state.last_upsert_kwargs = kwargs
 
-    def mock_get(uid):
+    async def mock_get(uid):
         return state.current_entitlement
 
     monkeypatch.setattr("app.repos.entitlements.upsert_membership_entitlement", mock_upsert)
     monkeypatch.setattr("app.repos.entitlements.get_membership_entitlement", mock_get)
     
     # Also mock audit log to prevent hits
-    monkeypatch.setattr("app.repos.admin_audit.write_audit", lambda *a, **k: None)
+    async def mock_write_audit(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr("app.repos.admin_audit.write_audit", mock_write_audit)
 
     return state
 
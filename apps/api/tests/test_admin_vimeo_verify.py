@@ -3,7 +3,7 @@ Unit tests for Vimeo admin verification (Phase 2.7).
 Mocks outer httpx calls to ensure no real network traffic.
 """
 import pytest
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -42,7 +42,7 @@ def test_verification_disabled():
     assert response.json() == {"detail": "vimeo_verify_disabled"}
 
 
-@patch("app.routers.admin_vimeo.lessons_repo")
+@patch("app.routers.admin_vimeo.lessons_repo", new_callable=AsyncMock)
 @patch("app.services.vimeo_verify.vimeo_client.get_embed_domains")
 @patch("app.services.vimeo_verify.vimeo_client.get_video")
 def test_verify_success(mock_get_video, mock_get_domains, mock_repo):
@@ -68,7 +68,7 @@ def test_verify_success(mock_get_video, mock_get_domains, mock_repo):
     assert args[1]["vimeoVerifyOk"] is True
 
 
-@patch("app.routers.admin_vimeo.lessons_repo")
+@patch("app.routers.admin_vimeo.lessons_repo", new_callable=AsyncMock)
 @patch("app.services.vimeo_verify.vimeo_client.get_embed_domains")
 @patch("app.services.vimeo_verify.vimeo_client.get_video")
 def test_verify_missing_domains(mock_get_video, mock_get_domains, mock_repo):
@@ -89,7 +89,7 @@ def test_verify_missing_domains(mock_get_video, mock_get_domains, mock_repo):
     mock_repo.update_lesson_verification.assert_called_once()
 
 
-@patch("app.routers.admin_vimeo.lessons_repo")
+@patch("app.routers.admin_vimeo.lessons_repo", new_callable=AsyncMock)
 @patch("app.services.vimeo_verify.vimeo_client.get_embed_domains")
 @patch("app.services.vimeo_verify.vimeo_client.get_video")
 def test_verify_bad_embed_mode(mock_get_video, mock_get_domains, mock_repo):
@@ -121,7 +121,7 @@ def test_normalize_domain():
     assert vimeo_verify._normalize_domain("https://www.ironmind.app/") == "www.ironmind.app"
     assert vimeo_verify._normalize_domain("ironmind.app:8080") == "ironmind.app"
 
-@patch("app.routers.admin_vimeo.lessons_repo")
+@patch("app.routers.admin_vimeo.lessons_repo", new_callable=AsyncMock)
 @patch("app.services.vimeo_verify.vimeo_client.get_video")
 def test_verify_api_error_maps_to_403(mock_get_video, mock_repo):
     mock_repo.get_lesson_admin.return_value = {"id": MOCK_LESSON_ID, "vimeoVideoId": MOCK_VIDEO_ID}
@@ -133,7 +133,7 @@ def test_verify_api_error_maps_to_403(mock_get_video, mock_repo):
     assert response.status_code == 403
     assert response.json()["detail"].startswith("Vimeo API Error:")
 
-@patch("app.routers.admin_vimeo.lessons_repo")
+@patch("app.routers.admin_vimeo.lessons_repo", new_callable=AsyncMock)
 @patch("app.services.vimeo_verify.vimeo_client.get_video")
 def test_verify_api_error_maps_to_502(mock_get_video, mock_repo):
     mock_repo.get_lesson_admin.return_value = {"id": MOCK_LESSON_ID, "vimeoVideoId": MOCK_VIDEO_ID}
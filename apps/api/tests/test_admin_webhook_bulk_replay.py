@@ -0,0 +1,228 @@
+"""
+Test: bulk replay of stored payment_events.
+
+Verifies:
+- Dry runs apply against a shadow repo and leave stored data untouched
+- Live runs re-apply stored events under a replay-scoped id, so an event
+  stored as unknown_intent applies once its intent exists; dry runs
+  report the same outcomes
+- Applied and already replayed events are skipped, so a replay never
+  overrides newer state; one subject's events replay in receivedAt order
+- Filters select the events to replay
+- The verify mode is per call; the global setting never changes
+- Live runs are audited and bounded by the concurrency limit
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.deps import require_admin
+from app.main import app
+from app.models import UserContext
+from app.payments import repo_memory, service
+from app.payments.models import PaymentIntent
+from app.repos import admin_audit
+from tests.helpers.fixture_loader import load_json_fixture
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def bulk_replay_env(monkeypatch):
+    monkeypatch.setattr(settings, "PAYMENTS_PROVIDER", "payplus")
+    monkeypatch.setattr(settings, "PAYPLUS_SECRET_KEY", "test_secret_key")
+    monkeypatch.setattr(settings, "PAYPLUS_WEBHOOK_VERIFY_MODE", "log_only")
+    app.dependency_overrides[require_admin] = lambda: UserContext(uid="test_admin", is_admin=True)
+    repo_memory.reset()
+    yield
+    repo_memory.reset()
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def audits(monkeypatch):
+    entries = []
+
+    async def record(action, entity_type, entity_id, admin_uid, payload=None):
+        entries.append((action, entity_id, admin_uid, payload))
+
+    monkeypatch.setattr(admin_audit, "write_audit", record)
+    return entries
+
+
+def _deliver(fixture_path: str) -> dict:
+    body = json.dumps(load_json_fixture(fixture_path)).encode()
+    return asyncio.run(service.handle_webhook(body, {"hash": "replay"}))
+
+
+def _create_intent(provider_ref: str) -> None:
+    asyncio.run(repo_memory.MemoryIntentsRepo.create_intent(PaymentIntent(
+        id="pi_bulk", uid="u_bulk", kind="one_time", scope="course", courseId="alpha-protocol",
+        provider="payplus", providerRef=provider_ref,
+    )))
+
+
+def _bulk(**body):
+    res = client.post("/admin/payments/replay/bulk", json=body)
+    assert res.status_code == 200, res.text
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    return lines[:-1], lines[-1]["summary"]
+
+
+def test_dry_run_applies_against_shadow_repo(memory_access):
+    # Arrived before its intent existed, so it was recorded as unknown_intent
+    assert _deliver("payplus/approved.json")["unknown_intent"] is True
+    assert _deliver("payplus/unmapped.json")["unmapped"] is True
+    _create_intent("pp_req_ok_001")
+    stored_events = {k: dict(v) for k, v in repo_memory._events.items()}
+
+    items, summary = _bulk()
+    outcomes = {item["type"]: item["outcome"] for item in items}
+    assert outcomes == {"payment.succeeded": "applied", "payplus.unmapped": "unmapped"}
+    assert summary["total"] == 2 and summary["replayed"] == 2 and summary["dry_run"] is True
+    assert summary["shadow_writes"] == {"events": 2, "intents": 1, "subscriptions": 0, "entitlements": 1}
+
+    # Nothing real changed
+    assert repo_memory._events == stored_events
+    assert repo_memory._intents["pi_bulk"]["status"] == "pending"
+    assert memory_access == ({}, {})
+
+
+def test_live_replay_applies_once_intent_exists(audits, memory_access):
+    assert _deliver("payplus/approved.json")["unknown_intent"] is True
+    _deliver("payplus/unmapped.json")
+    _create_intent("pp_req_ok_001")
+
+    dry_items, _ = _bulk()
+    items, summary = _bulk(dry_run=False)
+    outcomes = {item["type"]: item["outcome"] for item in items}
+    assert outcomes == {"payment.succeeded": "applied", "payplus.unmapped": "unmapped"}
+    assert outcomes == {item["type"]: item["outcome"] for item in dry_items}
+
+    assert repo_memory._intents["pi_bulk"]["status"] == "succeeded"
+    assert memory_access[0]["ent_course_u_bulk_alpha-protocol"]["status"] == "active"
+    replays = [e for e in repo_memory._events.values() if e.get("replayOf")]
+    assert len(replays) == 2
+    assert all(e["id"].endswith(f":replay:{summary['replay_id']}") for e in replays)
+
+    # Replay records are never selected again; an applied original is not replayed twice
+    items, _ = _bulk(dry_run=False)
+    assert len(items) == 2
+    statuses = {item["type"]: (item["status"], item.get("reason")) for item in items}
+    assert statuses["payment.succeeded"] == ("skipped", "already_replayed")
+    assert statuses["payplus.unmapped"] == ("replayed", None)
+
+
+def _stub_event(event_id, event_type, provider_ref):
+    body = {"event_id": event_id, "event_type": event_type, "provider_ref": provider_ref,
+            "payload": {"provider_subscription_id": "sub_1"}}
+    return asyncio.run(service.handle_webhook(json.dumps(body).encode(), {}))
+
+
+def _create_membership_intent(provider_ref):
+    asyncio.run(repo_memory.MemoryIntentsRepo.create_intent(PaymentIntent(
+        id="pi_member", uid="u_member", kind="subscription", scope="membership",
+        provider="stub", providerRef=provider_ref,
+    )))
+
+
+def test_replay_never_overrides_newer_state(monkeypatch, audits, memory_access):
+    monkeypatch.setattr(settings, "PAYMENTS_PROVIDER", "stub")
+    _create_membership_intent("stub:pi_member")
+    for i, event_type in enumerate(["subscription.renewed", "subscription.canceled", "subscription.renewed"]):
+        _stub_event(f"evt_sub_{i}", event_type, "stub:pi_member")
+    ents, access = memory_access
+    assert access["u_member"]["membershipStatus"] == "active"
+
+    items, summary = _bulk(provider="stub", event_type="subscription.canceled", dry_run=False)
+    assert [(item["status"], item["reason"]) for item in items] == [("skipped", "original_applied")]
+    assert summary["skipped"] == 1
+    assert access["u_member"]["membershipStatus"] == "active"
+
+
+def test_subject_events_replay_in_order(monkeypatch, audits, memory_access):
+    monkeypatch.setattr(settings, "PAYMENTS_PROVIDER", "stub")
+    # Both arrived before the intent existed
+    assert _stub_event("evt_early_renew", "subscription.renewed", "stub:pi_member")["unknown_intent"] is True
+    assert _stub_event("evt_early_cancel", "subscription.canceled", "stub:pi_member")["unknown_intent"] is True
+    _create_membership_intent("stub:pi_member")
+
+    real_replay = service.handle_webhook
+
+    async def slow_first(raw_body, headers, **kwargs):
+        # Would let the later cancel finish first if they ran concurrently
+        if b"renewed" in raw_body:
+            await asyncio.sleep(0.05)
+        return await real_replay(raw_body, headers, **kwargs)
+
+    monkeypatch.setattr(service, "handle_webhook", slow_first)
+    items, _ = _bulk(provider="stub", dry_run=False, concurrency=4)
+    assert [item["type"] for item in items] == ["subscription.renewed", "subscription.canceled"]
+    assert memory_access[1]["u_member"]["membershipStatus"] == "inactive"
+
+
+def test_filters_select_events():
+    _deliver("payplus/approved.json")
+    _deliver("payplus/unmapped.json")
+
+    items, _ = _bulk(unmapped=True)
+    assert [item["type"] for item in items] == ["payplus.unmapped"]
+    items, _ = _bulk(event_type="payment.succeeded")
+    assert [item["outcome"] for item in items] == ["unknown_intent"]
+
+    _, summary = _bulk(until=(datetime.now(timezone.utc) - timedelta(hours=1)).isoformat())
+    assert summary["total"] == 0
+    res = client.post("/admin/payments/replay/bulk", json={"since": "2026-01-02T00:00:00", "until": "2026-01-01T00:00:00"})
+    assert res.status_code == 422
+
+
+def test_verify_mode_is_per_call(monkeypatch):
+    _deliver("payplus/approved.json")
+    monkeypatch.setattr(settings, "PAYPLUS_WEBHOOK_VERIFY_MODE", "enforce")
+
+    items, _ = _bulk(force_log_only=True)
+    assert items[0]["status"] == "replayed"
+    items, summary = _bulk(force_log_only=False)
+    assert items[0]["status"] == "error" and "signature" in items[0]["error"]
+    assert summary["error"] == 1
+    assert settings.PAYPLUS_WEBHOOK_VERIFY_MODE == "enforce"
+
+
+def test_live_run_is_audited_and_bounded(monkeypatch, audits):
+    monkeypatch.setattr(settings, "PAYMENTS_PROVIDER", "stub")
+    for i in range(6):
+        asyncio.run(repo_memory.MemoryEventsRepo.create_event_if_absent(
+            "stub", f"evt_{i}", {"provider": "stub", "type": "payment.failed", "outcome": "unknown_intent",
+                                 "payload": {"provider_ref": f"stub:pi_{i}"}},
+        ))
+
+    in_flight, peak, seen = 0, 0, []
+    real_handle = service.handle_webhook
+
+    async def tracking_handle(raw_body, headers, verify_mode=None, repos=None, replay_id=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        seen.append((verify_mode, repos, replay_id))
+        return await real_handle(raw_body, headers, verify_mode=verify_mode, repos=repos, replay_id=replay_id)
+
+    monkeypatch.setattr(service, "handle_webhook", tracking_handle)
+
+    items, summary = _bulk(provider="stub", dry_run=False, concurrency=2)
+    assert peak == 2
+    assert seen == [(None, None, summary["replay_id"])] * 6
+    # No intents behind these refs: recorded again under the replay id, nothing applied
+    assert {item["outcome"] for item in items} == {"unknown_intent"}
+    assert summary["unknown_intent"] == 6 and "shadow_writes" not in summary
+    assert len(repo_memory._events) == 12
+    assert audits[0][:3] == ("bulk_replay_webhooks", "stub", "test_admin")
+    assert audits[0][3]["matched"] == 6
+    assert audits[0][3]["replayId"] == summary["replay_id"]
@@ -6,6 +6,7 @@ from app.main import app
 from app.config import settings
 from app.deps import require_admin
 from app.payments import service
+from app.payments.models import IntentRef, PaymentIntent
 
 client = TestClient(app)
 
@@ -30,7 +31,7 @@ def test_webhook_replay_requires_admin():
 
 def test_webhook_replay_success(override_admin_auth, monkeypatch):
     """Ensure an admin can replay a valid webhook and results propagate."""
-    def mock_handle_webhook(raw_body, headers):
+    async def mock_handle_webhook(raw_body, headers, verify_mode=None):
         assert b"test_payload" in raw_body
         assert headers["hash"] == "replay"
         return {"ok": True, "duplicate": False, "ignored": True}
@@ -60,34 +61,28 @@ def test_webhook_replay_too_large(override_admin_auth):
     assert res.status_code == 413
     assert "too large" in res.json()["detail"].lower()
 
-def test_webhook_replay_force_log_only_restores_setting(override_admin_auth, monkeypatch):
-    """Ensure force_log_only temporarily modifies the setting and restores it."""
-    
-    original = getattr(settings, "PAYPLUS_WEBHOOK_VERIFY_MODE", "log_only")
-    settings.PAYPLUS_WEBHOOK_VERIFY_MODE = "enforce"
-    
-    settings_during_call = []
+def test_webhook_replay_force_log_only_is_per_call(override_admin_auth, monkeypatch):
+    """Ensure force_log_only is passed to the handler without touching the global setting."""
+    monkeypatch.setattr(settings, "PAYPLUS_WEBHOOK_VERIFY_MODE", "enforce")
 
-    def mock_handle_webhook(raw_body, headers):
-        settings_during_call.append(settings.PAYPLUS_WEBHOOK_VERIFY_MODE)
+    calls = []
+
+    async def mock_handle_webhook(raw_body, headers, verify_mode=None):
+        calls.append((verify_mode, settings.PAYPLUS_WEBHOOK_VERIFY_MODE))
         return {"ok": True}
 
     monkeypatch.setattr(service, "handle_webhook", mock_handle_webhook)
-    
-    try:
-        res = client.post("/admin/payments/replay", json={
-            "provider": "payplus",
-            "force_log_only": True,
-            "payload": {"test": True}
-        })
-        
-        assert res.status_code == 200
-        assert settings_during_call[0] == "log_only"
-        
-        # Must be restored!
-        assert settings.PAYPLUS_WEBHOOK_VERIFY_MODE == "enforce"
-    finally:
-        settings.PAYPLUS_WEBHOOK_VERIFY_MODE = original
+
+    res = client.post("/admin/payments/replay", json={
+        "provider": "payplus",
+        "force_log_only": True,
+        "payload": {"test": True}
+    })
+
+    assert res.status_code == 200
+    assert calls == [("log_only", "enforce")]
+    assert "verify_mode_forced_log_only" in res.json()["notes"]
+    assert settings.PAYPLUS_WEBHOOK_VERIFY_MODE == "enforce"
 
 
 def test_webhook_replay_intent_lookup(override_admin_auth, monkeypatch):
@@ -97,19 +92,27 @@ def test_webhook_replay_intent_lookup(override_admin_auth, monkeypatch):
     unmapped_payload = load_json_fixture("payplus/unmapped.json")
 
     # Mock handle_webhook to simulate real behavior
-    def mock_handle_webhook(raw_body, headers):
+    async def mock_handle_webhook(raw_body, headers, verify_mode=None):
         if b"txn_unmapped_001" in raw_body:
             return {"ok": True, "duplicate": False, "ignored": True, "unmapped": True}
         return {"ok": True, "duplicate": False}
     
     monkeypatch.setattr(service, "handle_webhook", mock_handle_webhook)
 
+    intent = PaymentIntent(
+        id="pi_123", uid="u1", kind="one_time", scope="course", courseId="c1",
+        status="succeeded", provider="payplus", providerRef="pp_req_ok_001",
+    )
+
     class MockIntentsRepo:
-        def find_by_provider_ref(self, provider, provider_ref):
+        async def find_by_provider_ref(self, provider, provider_ref):
             if provider_ref == "pp_req_ok_001":
-                return {"id": "pi_123", "status": "pending"}
+                return IntentRef(**intent.model_dump())
             return None
 
+        async def get_intent(self, intent_id):
+            return intent if intent_id == intent.id else None
+
     class MockRepos:
         intents = MockIntentsRepo()
 
@@ -125,6 +128,7 @@ def test_webhook_replay_intent_lookup(override_admin_auth, monkeypatch):
     data = res.json()
     assert data["intent_found"] is True
     assert data["intent_id"] == "pi_123"
+    assert data["intent_status"] == "succeeded"
     assert data["mutation_risk"] == "may_mutate"
     assert data["provider_ref"] == "pp_req_ok_001"
     
@@ -0,0 +1,157 @@
+"""
+stats_daily rollups: incremental counters, windowed reads and backfill.
+Uses an in-memory fake AsyncClient — no real Firestore.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from google.cloud import firestore
+
+from app.repos import analytics
+
+
+class FakeSnap:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeDocRef:
+    def __init__(self, db, collection, doc_id):
+        self._db, self.collection, self.id = db, collection, doc_id
+
+    async def set(self, data, merge=False):
+        self._db.apply(self.collection, self.id, data, merge)
+
+
+class FakeQuery:
+    def __init__(self, db, collection, field, value):
+        self._db, self._collection, self._field, self._value = db, collection, field, value
+
+    async def stream(self):
+        self._db.streams += 1
+        for doc_id, data in self._db.data[self._collection].items():
+            if data.get(self._field) is not None and data[self._field] >= self._value:
+                yield FakeSnap(doc_id, data)
+
+
+class FakeCollection:
+    def __init__(self, db, name):
+        self._db, self._name = db, name
+
+    def document(self, doc_id):
+        return FakeDocRef(self._db, self._name, doc_id)
+
+    def where(self, field, op, value):
+        assert op == ">="
+        return FakeQuery(self._db, self._name, field, value)
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self._db, self._ops = db, []
+
+    def set(self, ref, data):
+        self._ops.append((ref, data))
+
+    async def commit(self):
+        self._db.commits += 1
+        for ref, data in self._ops:
+            self._db.apply(ref.collection, ref.id, data, merge=False)
+
+
+class FakeDb:
+    def __init__(self, users=None):
+        self.data = {"users": users or {}, "stats_daily": {}}
+        self.get_all_calls = []
+        self.streams = 0
+        self.commits = 0
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def apply(self, collection, doc_id, data, merge):
+        current = dict(self.data[collection].get(doc_id, {})) if merge else {}
+        for key, value in data.items():
+            if isinstance(value, firestore.Increment):
+                current[key] = current.get(key, 0) + value.value
+            else:
+                current[key] = value
+        self.data[collection][doc_id] = current
+
+    async def get_all(self, refs):
+        self.get_all_calls.append([r.id for r in refs])
+        for ref in refs:
+            yield FakeSnap(ref.id, self.data[ref.collection].get(ref.id))
+
+
+def _use(monkeypatch, db):
+    monkeypatch.setattr(analytics, "get_async_db", lambda: db)
+
+
+def test_signup_and_daily_active_counters(monkeypatch):
+    db = FakeDb()
+    _use(monkeypatch, db)
+    now = datetime.now(timezone.utc)
+    today = now.date().isoformat()
+
+    asyncio.run(analytics.record_signup(now))
+    # Returning user: counted once per day
+    asyncio.run(analytics.record_active(now, now - timedelta(days=2)))
+    asyncio.run(analytics.record_active(now, now - timedelta(minutes=1)))
+
+    doc = db.data["stats_daily"][today]
+    assert doc["signups"] == 1
+    assert doc["active"] == 2
+
+
+def test_growth_reads_only_window_docs(monkeypatch):
+    db = FakeDb()
+    _use(monkeypatch, db)
+    today = datetime.now(timezone.utc).date()
+    db.data["stats_daily"][today.isoformat()] = {"signups": 3, "active": 9}
+    db.data["stats_daily"][(today - timedelta(days=40)).isoformat()] = {"signups": 100, "active": 100}
+
+    points = asyncio.run(analytics.get_growth_data(7))
+
+    assert len(points) == 7
+    assert points[-1] == {"date": today.isoformat(), "signups": 3, "active": 9}
+    assert all(p["signups"] == 0 for p in points[:-1])
+    assert len(db.get_all_calls) == 1 and len(db.get_all_calls[0]) == 7
+    assert db.streams == 0
+
+
+def test_backfill_fills_only_days_without_live_rollups(monkeypatch):
+    now = datetime.now(timezone.utc)
+    day = lambda n: (now - timedelta(days=n)).date().isoformat()
+    users = {
+        "u1": {"createdAt": now - timedelta(days=1), "lastSeenAt": now - timedelta(days=1)},
+        "u2": {"createdAt": now - timedelta(days=2), "lastSeenAt": now - timedelta(days=1)},
+        "u3": {"createdAt": now - timedelta(days=400), "lastSeenAt": now - timedelta(days=3)},
+        "u4": {"createdAt": now, "lastSeenAt": now},
+    }
+    db = FakeDb(users)
+    _use(monkeypatch, db)
+    # Exact counters kept at sign-in: never replaced by the approximation
+    db.data["stats_daily"][day(0)] = {"signups": 5, "active": 9}
+    db.data["stats_daily"][day(2)] = {"signups": 7, "active": 8}
+    # An earlier backfill is recomputed
+    db.data["stats_daily"][day(3)] = {"signups": 50, "active": 50, "backfilledAt": now}
+
+    written = asyncio.run(analytics.backfill_daily_stats(4))
+
+    assert written == 2
+    assert db.commits == 1
+    points = {p["date"]: p for p in asyncio.run(analytics.get_growth_data(4))}
+    assert points[day(0)] == {"date": day(0), "signups": 5, "active": 9}
+    assert points[day(1)]["signups"] == 1 and points[day(1)]["active"] == 2
+    assert points[day(2)] == {"date": day(2), "signups": 7, "active": 8}
+    assert points[day(3)]["signups"] == 0 and points[day(3)]["active"] == 1
+    assert "backfilledAt" in db.data["stats_daily"][day(1)]
@@ -0,0 +1,112 @@
+"""
+Unit tests for the in-process catalog replica.
+Drives the snapshot callbacks directly with fake listeners — no real Firestore.
+"""
+import asyncio
+
+import pytest
+
+from app.repos import catalog_replica, courses, lessons, plans
+
+
+class FakeSnap:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = True
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeWatch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.is_active = True
+
+    def unsubscribe(self):
+        self.is_active = False
+
+
+class FakeCollection:
+    def __init__(self, db, name):
+        self._db = db
+        self._name = name
+
+    def on_snapshot(self, callback):
+        watch = FakeWatch(callback)
+        self._db.watches[self._name] = watch
+        return watch
+
+
+class FakeDb:
+    def __init__(self):
+        self.watches = {}
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def push(self, collection, docs):
+        snaps = [FakeSnap(doc_id, data) for doc_id, data in docs.items()]
+        self.watches[collection].callback(snaps, snaps, None)
+
+
+@pytest.fixture
+def fake_db():
+    db = FakeDb()
+    catalog_replica.start(db)
+    yield db
+    catalog_replica.stop()
+
+
+@pytest.fixture
+def no_firestore(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("Firestore should not be queried")
+    for mod in (courses, lessons, plans):
+        monkeypatch.setattr(mod, "get_async_db", fail)
+        monkeypatch.setattr(mod, "get_doc", fail)
+
+
+def _course(published=True):
+    return {"titleHe": "קורס", "descriptionHe": "תיאור", "type": "one_time", "published": published}
+
+
+def test_unhealthy_until_first_snapshot(fake_db):
+    assert catalog_replica.snapshot("courses") is None
+    fake_db.push("courses", {"c1": _course()})
+    assert catalog_replica.snapshot("courses") == {"c1": _course()}
+
+
+def test_inactive_listener_falls_back(fake_db):
+    fake_db.push("courses", {"c1": _course()})
+    fake_db.watches["courses"].is_active = False
+    assert catalog_replica.snapshot("courses") is None
+
+
+def test_public_reads_served_from_replica(fake_db, no_firestore):
+    fake_db.push("courses", {"c1": _course(), "c2": _course(published=False)})
+    fake_db.push("lessons", {
+        "l1": {"courseId": "c1", "titleHe": "סקוואט", "descriptionHe": "", "movementCategory": "legs",
+               "tags": [], "vimeoVideoId": "123", "orderIndex": 1, "published": True},
+        "l2": {"courseId": "c1", "titleHe": "טיוטה", "descriptionHe": "", "movementCategory": "legs",
+               "tags": [], "orderIndex": 2, "published": False},
+    })
+    fake_db.push("plans", {})
+
+    listed = asyncio.run(courses.list_published_courses())
+    assert [c.id for c in listed] == ["c1"]
+    assert asyncio.run(courses.get_published_course("c2")) is None
+
+    course_lessons = asyncio.run(lessons.list_published_lessons_by_course("c1"))
+    assert [l.id for l in course_lessons] == ["l1"]
+    assert course_lessons[0].vimeoVideoId is None
+    assert course_lessons[0].hasVideo is True
+
+    assert asyncio.run(plans.list_published_plans_by_course("c1")) == []
+
+
+def test_snapshot_replaces_previous_state(fake_db):
+    fake_db.push("courses", {"c1": _course()})
+    fake_db.push("courses", {"c2": _course()})
+    assert list(catalog_replica.snapshot("courses")) == ["c2"]
@@ -0,0 +1,98 @@
+"""
+Test: repeat checkouts reuse the pending intent and its payment link.
+
+Verifies:
+- A repeat checkout inside the window returns the same intent and URL
+  without calling the provider again
+- Different course, settled intents and expired windows get a new intent
+- Concurrent checkouts share a single provider call
+- CHECKOUT_REUSE_WINDOW_SECONDS=0 disables reuse
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.config import settings
+from app.payments import repo_memory, service
+from app.payments.providers.stub import StubProvider
+
+UID = "test-user-checkout-reuse"
+
+
+@pytest.fixture(autouse=True)
+def reset_memory_repos():
+    repo_memory.reset()
+    yield
+    repo_memory.reset()
+
+
+@pytest.fixture
+def provider_calls(monkeypatch):
+    calls = []
+    real = StubProvider.create_one_time_checkout
+
+    def counting(self, intent):
+        calls.append(intent.id)
+        return real(self, intent)
+
+    monkeypatch.setattr(StubProvider, "create_one_time_checkout", counting)
+    return calls
+
+
+def _checkout(course_id="alpha-protocol"):
+    return service.create_checkout(uid=UID, kind="one_time", scope="course", courseId=course_id)
+
+
+def test_repeat_checkout_reuses_pending_intent(provider_calls):
+    first = asyncio.run(_checkout())
+    second = asyncio.run(_checkout())
+    assert second == {**first, "reused": True}
+    assert provider_calls == [first["intentId"]]
+    assert len(repo_memory._intents) == 1
+
+    other = asyncio.run(_checkout("beta-protocol"))
+    assert other["intentId"] != first["intentId"]
+    assert len(provider_calls) == 2
+
+
+def test_settled_or_expired_intents_are_not_reused(provider_calls):
+    first = asyncio.run(_checkout())
+    repo_memory._intents[first["intentId"]]["status"] = "succeeded"
+    second = asyncio.run(_checkout())
+    assert second["intentId"] != first["intentId"]
+
+    repo_memory._intents[second["intentId"]]["createdAt"] = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.CHECKOUT_REUSE_WINDOW_SECONDS + 1
+    )
+    third = asyncio.run(_checkout())
+    assert third["intentId"] not in (first["intentId"], second["intentId"])
+    assert len(provider_calls) == 3
+
+
+def test_concurrent_checkouts_share_one_provider_call(monkeypatch):
+    calls = []
+
+    async def slow_checkout(self, intent):
+        calls.append(intent.id)
+        await asyncio.sleep(0.05)
+        return StubProvider().create_one_time_checkout(intent)
+
+    monkeypatch.setattr(StubProvider, "create_one_time_checkout_async", slow_checkout, raising=False)
+
+    async def scenario():
+        return await asyncio.gather(*(_checkout() for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert {r["intentId"] for r in results} == {calls[0]}
+    assert service._checkouts_in_flight == {}
+
+
+def test_reuse_disabled_with_zero_window(monkeypatch, provider_calls):
+    monkeypatch.setattr(settings, "CHECKOUT_REUSE_WINDOW_SECONDS", 0)
+    first = asyncio.run(_checkout())
+    second = asyncio.run(_checkout())
+    assert first["intentId"] != second["intentId"]
+    assert len(provider_calls) == 2
@@ -0,0 +1,112 @@
+"""
+GET /courses/{course_id}/bundle — course page in one request.
+Repos are monkeypatched — no real Firestore.
+"""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.deps import get_db
+from app.main import app
+from app.models import CoursePublic, LessonPublic, PlanPublic
+
+client = TestClient(app)
+
+UPDATED = datetime(2024, 5, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def bundle_repos(monkeypatch):
+    app.dependency_overrides[get_db] = lambda: object()
+    state = {"in_flight": 0, "max_in_flight": 0, "access_calls": []}
+
+    async def track(value):
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0)
+        state["in_flight"] -= 1
+        return value
+
+    async def get_published_course(cid):
+        course = CoursePublic(
+            id="course-1", titleHe="כוח", descriptionHe="תיאור", type="one_time",
+            published=True, updatedAt=UPDATED,
+        )
+        return await track(course if cid == "course-1" else None)
+
+    async def list_published_lessons_by_course(cid):
+        return await track([
+            LessonPublic(id="l1", courseId=cid, titleHe="א", descriptionHe="", movementCategory="squat", orderIndex=1, published=True),
+            LessonPublic(id="l2", courseId=cid, titleHe="ב", descriptionHe="", movementCategory="squat", orderIndex=2, published=True),
+        ])
+
+    async def list_published_plans_by_course(cid):
+        return await track([PlanPublic(id="p1", courseId=cid, titleHe="תוכנית", descriptionHe="", published=True)])
+
+    async def can_access_course(uid, cid):
+        state["access_calls"].append((uid, cid))
+        return await track(uid == "paid-user")
+
+    monkeypatch.setattr("app.routers.public.courses.get_published_course", get_published_course)
+    monkeypatch.setattr("app.routers.public.lessons.list_published_lessons_by_course", list_published_lessons_by_course)
+    monkeypatch.setattr("app.routers.public.plans.list_published_plans_by_course", list_published_plans_by_course)
+    monkeypatch.setattr("app.routers.public.access_service.can_access_course", can_access_course)
+    yield state
+    app.dependency_overrides.pop(get_db, None)
+
+
+def test_anonymous_bundle(bundle_repos):
+    res = client.get("/courses/course-1/bundle")
+    assert res.status_code == 200
+    body = res.json()
+    assert body["course"]["id"] == "course-1"
+    assert [l["id"] for l in body["lessons"]] == ["l1", "l2"]
+    assert [p["id"] for p in body["plans"]] == ["p1"]
+    assert body["hasAccess"] is None
+    assert bundle_repos["access_calls"] == []
+    # Queries were in flight together
+    assert bundle_repos["max_in_flight"] == 3
+    assert "etag" in res.headers
+    assert res.headers["vary"] == "Cookie"
+
+
+def test_anonymous_bundle_conditional_get(bundle_repos):
+    etag = client.get("/courses/course-1/bundle").headers["etag"]
+    res = client.get("/courses/course-1/bundle", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.headers["vary"] == "Cookie"
+
+
+def test_authenticated_bundle_includes_access(bundle_repos):
+    res = client.get("/courses/course-1/bundle", headers={"X-Debug-Uid": "paid-user"})
+    assert res.status_code == 200
+    assert res.json()["hasAccess"] is True
+    assert bundle_repos["access_calls"] == [("paid-user", "course-1")]
+    assert bundle_repos["max_in_flight"] == 4
+    assert res.headers["cache-control"] == "private, no-cache"
+    assert "etag" not in res.headers
+
+    res = client.get("/courses/course-1/bundle", headers={"X-Debug-Uid": "other-user"})
+    assert res.json()["hasAccess"] is False
+
+
+def test_invalid_session_is_treated_as_anonymous(bundle_repos, monkeypatch):
+    async def reject(session_id):
+        from fastapi import HTTPException
+        raise HTTPException(status_code=401, detail="Invalid session")
+
+    monkeypatch.setattr("app.deps._load_firestore_session", lambda db, sid: reject(sid))
+    client.cookies.set("ironmind_session", "bogus")
+    try:
+        res = client.get("/courses/course-1/bundle")
+    finally:
+        client.cookies.clear()
+    assert res.status_code == 200
+    assert res.json()["hasAccess"] is None
+
+
+def test_missing_course_404(bundle_repos):
+    res = client.get("/courses/nope/bundle")
+    assert res.status_code == 404
@@ -135,3 +135,20 @@ def test_seed_force_updates(patched_seed, fake_db):
     assert len(second["updated"]) > 0
     assert "course_demo_one_time" in second["updated"]
     assert len(second["skipped"]) == 0
+
+
+def test_seed_debug_entitlement_updates_user_access(monkeypatch, memory_access):
+    """The debug entitlement goes through the entitlement write path."""
+    import asyncio
+    from app.config import settings
+    from app.dev.seed import seed_debug_entitlement
+    from app.services import access_service
+
+    assert asyncio.run(seed_debug_entitlement()) is None
+
+    monkeypatch.setattr(settings, "SEED_DEBUG_UID", "debug-user")
+    ent_id = asyncio.run(seed_debug_entitlement())
+    ents, access = memory_access
+    assert ents[ent_id]["source"] == "seed"
+    assert "course_demo_one_time" in access["debug-user"]["courses"]
+    assert asyncio.run(access_service.can_access_course("debug-user", "course_demo_one_time")) is True
@@ -0,0 +1,163 @@
+"""
+Unit tests for the request-scoped DocumentLoader.
+Uses an in-memory fake AsyncClient — no real Firestore.
+"""
+import asyncio
+
+from app.context import document_loader_ctx
+from app.repos import loader as loader_mod
+from app.repos.loader import DocumentLoader
+from app.services import access_service
+
+
+class FakeSnap:
+    def __init__(self, path, data):
+        self.reference = type("Ref", (), {"path": path})()
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocRef:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+
+    async def get(self):
+        self._db.single_gets += 1
+        return FakeSnap(self.path, self._db.docs.get(self.path))
+
+
+class FakeCollection:
+    def __init__(self, db, name):
+        self._db = db
+        self._name = name
+
+    def document(self, doc_id):
+        return FakeDocRef(self._db, f"{self._name}/{doc_id}")
+
+
+class FakeAsyncClient:
+    def __init__(self, docs):
+        self.docs = docs
+        self.get_all_calls = []
+        self.single_gets = 0
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    async def get_all(self, refs):
+        self.get_all_calls.append([r.path for r in refs])
+        # Deliberately reversed: get_all does not guarantee order
+        for ref in reversed(refs):
+            yield FakeSnap(ref.path, self.docs.get(ref.path))
+
+
+def test_same_tick_reads_are_batched_into_one_get_all():
+    db = FakeAsyncClient({"lessons/l1": {"courseId": "c1"}, "plans/p1": {"courseId": "c1"}})
+    loader = DocumentLoader(db)
+
+    async def run():
+        return await asyncio.gather(
+            loader.load("lessons", "l1"),
+            loader.load("plans", "p1"),
+            loader.load("courses", "missing"),
+        )
+
+    lesson, plan, missing = asyncio.run(run())
+
+    assert lesson == {"courseId": "c1"}
+    assert plan == {"courseId": "c1"}
+    assert missing is None
+    assert len(db.get_all_calls) == 1
+    assert sorted(db.get_all_calls[0]) == ["courses/missing", "lessons/l1", "plans/p1"]
+
+
+def test_repeated_reads_are_memoized():
+    db = FakeAsyncClient({"courses/c1": {"published": True}})
+    loader = DocumentLoader(db)
+
+    async def run():
+        first = await loader.load("courses", "c1")
+        first["published"] = False  # callers get their own copy
+        second = await loader.load("courses", "c1")
+        return second
+
+    assert asyncio.run(run()) == {"published": True}
+    assert db.single_gets == 1
+    assert loader.round_trips == 1
+
+
+def test_forget_forces_reload():
+    db = FakeAsyncClient({"courses/c1": {"published": True}})
+    loader = DocumentLoader(db)
+
+    async def run():
+        await loader.load("courses", "c1")
+        db.docs["courses/c1"] = {"published": False}
+        loader.forget("courses", "c1")
+        return await loader.load("courses", "c1")
+
+    assert asyncio.run(run()) == {"published": False}
+    assert loader.round_trips == 2
+
+
+def test_forget_while_read_is_queued_drops_it():
+    db = FakeAsyncClient({"courses/c1": {"published": True}})
+    loader = DocumentLoader(db)
+
+    async def run():
+        first = asyncio.ensure_future(loader.load("courses", "c1"))
+        await asyncio.sleep(0)
+        assert ("courses", "c1") in loader._pending  # queued, not yet dispatched
+        loader.forget("courses", "c1")
+        # Same tick: shares the queued round trip
+        second = await loader.load("courses", "c1")
+        assert await first == second == {"published": True}
+
+        db.docs["courses/c1"] = {"published": False}
+        loader.forget("courses", "c1")
+        return await loader.load("courses", "c1")
+
+    assert asyncio.run(run()) == {"published": False}
+    assert loader.round_trips == 2
+
+
+def test_forgotten_queued_read_is_not_memoized():
+    db = FakeAsyncClient({"courses/c1": {"published": True}})
+    loader = DocumentLoader(db)
+
+    async def run():
+        first = asyncio.ensure_future(loader.load("courses", "c1"))
+        await asyncio.sleep(0)
+        loader.forget("courses", "c1")
+        assert await first == {"published": True}
+        db.docs["courses/c1"] = {"published": False}
+        # The read queued before forget() is never served again
+        return await loader.load("courses", "c1")
+
+    assert asyncio.run(run()) == {"published": False}
+    assert loader.round_trips == 2
+
+
+def test_can_access_course_is_single_access_doc_read(monkeypatch):
+    db = FakeAsyncClient({
+        "user_access/u1": {"uid": "u1", "membershipStatus": "inactive", "courses": {"c1": None}},
+    })
+    monkeypatch.setattr(loader_mod, "get_async_db", lambda: db)
+
+    async def run():
+        token = document_loader_ctx.set(DocumentLoader())
+        try:
+            return await asyncio.gather(
+                access_service.can_access_course("u1", "c1"),
+                access_service.can_access_course("u1", "c2"),
+            )
+        finally:
+            document_loader_ctx.reset(token)
+
+    assert asyncio.run(run()) == [True, False]
+    assert db.single_gets == 1
+    assert db.get_all_calls == []
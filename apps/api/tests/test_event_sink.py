@@ -0,0 +1,187 @@
+"""
+Background event sink: buffering, batching, backpressure and shutdown flush.
+Uses a fake AsyncClient that records batch commits — no real Firestore.
+"""
+import asyncio
+
+import pytest
+
+from app.repos import activity_events, admin_audit
+from app.services import event_sink as sink_mod
+from app.services.event_sink import EventSink
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self._db, self._ops = db, []
+
+    def set(self, ref, data):
+        self._ops.append((ref, data))
+
+    async def commit(self):
+        if self._db.fail:
+            raise RuntimeError("unavailable")
+        self._db.commits.append(list(self._ops))
+
+
+class FakeCollection:
+    def __init__(self, name):
+        self._name = name
+
+    def document(self, doc_id=None):
+        return (self._name, doc_id or "auto")
+
+
+class FakeDb:
+    def __init__(self):
+        self.commits = []
+        self.fail = False
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def collection(self, name):
+        return FakeCollection(name)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDb()
+    monkeypatch.setattr(sink_mod, "get_async_db", lambda: db)
+    return db
+
+
+def test_flushes_when_batch_size_reached(fake_db):
+    sink = EventSink(max_buffer=100, batch_size=3, flush_interval_ms=60_000)
+
+    async def run():
+        sink.start()
+        for i in range(3):
+            sink.enqueue("activity_events", f"e{i}", {"n": i})
+        await asyncio.sleep(0.01)
+        committed = list(fake_db.commits)
+        await sink.stop()
+        return committed
+
+    committed = asyncio.run(run())
+    assert len(committed) == 1
+    assert [ref for ref, _ in committed[0]] == [("activity_events", "e0"), ("activity_events", "e1"), ("activity_events", "e2")]
+    assert sink.stats()["written"] == 3
+
+
+def test_flushes_on_interval(fake_db):
+    sink = EventSink(max_buffer=100, batch_size=50, flush_interval_ms=10)
+
+    async def run():
+        sink.start()
+        sink.enqueue("admin_audit", None, {"action": "x"})
+        await asyncio.sleep(0.05)
+        committed = list(fake_db.commits)
+        await sink.stop()
+        return committed
+
+    assert len(asyncio.run(run())) == 1
+
+
+def test_full_buffer_drops_and_counts(fake_db):
+    sink = EventSink(max_buffer=2, batch_size=10, flush_interval_ms=60_000)
+    assert sink.enqueue("activity_events", "a", {}) is True
+    assert sink.enqueue("activity_events", "b", {}) is True
+    assert sink.enqueue("activity_events", "c", {}) is False
+    assert sink.stats() == {
+        "buffered": 2, "maxBuffer": 2, "enqueued": 2, "written": 0, "dropped": 1, "failed": 0,
+    }
+
+
+def test_stop_flushes_remaining_in_batches(fake_db):
+    sink = EventSink(max_buffer=1000, batch_size=200, flush_interval_ms=60_000)
+
+    async def run():
+        sink.start()
+        for i in range(450):
+            sink._buffer.append(("activity_events", f"e{i}", {}))
+        await sink.stop()
+
+    asyncio.run(run())
+    assert [len(c) for c in fake_db.commits] == [200, 200, 50]
+    assert not sink.running
+
+
+def test_stop_waits_for_batch_in_flight(fake_db, monkeypatch):
+    sink = EventSink(max_buffer=100, batch_size=5, flush_interval_ms=60_000)
+    real_commit = FakeBatch.commit
+
+    async def slow_commit(self):
+        await asyncio.sleep(0.05)
+        await real_commit(self)
+
+    monkeypatch.setattr(FakeBatch, "commit", slow_commit)
+
+    async def run():
+        sink.start()
+        for i in range(5):
+            sink.enqueue("activity_events", f"e{i}", {})
+        await asyncio.sleep(0.01)  # worker has popped the batch and is committing
+        assert sink.stats()["buffered"] == 0
+        await sink.stop()
+
+    asyncio.run(run())
+    assert [len(c) for c in fake_db.commits] == [5]
+    assert sink.stats()["written"] == 5
+
+
+def test_client_error_does_not_kill_worker(fake_db, monkeypatch):
+    sink = EventSink(max_buffer=100, batch_size=1, flush_interval_ms=60_000)
+
+    def broken_client():
+        raise RuntimeError("no credentials")
+
+    async def run():
+        sink.start()
+        monkeypatch.setattr(sink_mod, "get_async_db", broken_client)
+        sink.enqueue("activity_events", "a", {})
+        await asyncio.sleep(0.01)
+        assert sink.running
+        monkeypatch.setattr(sink_mod, "get_async_db", lambda: fake_db)
+        sink.enqueue("activity_events", "b", {})
+        await asyncio.sleep(0.01)
+        await sink.stop()
+
+    asyncio.run(run())
+    assert sink.stats()["failed"] == 1
+    assert sink.stats()["written"] == 1
+
+
+def test_failed_commit_is_counted(fake_db):
+    fake_db.fail = True
+    sink = EventSink(max_buffer=10, batch_size=10, flush_interval_ms=60_000)
+    sink.enqueue("activity_events", "a", {})
+    asyncio.run(sink.flush())
+    assert sink.stats()["failed"] == 1
+    assert sink.stats()["buffered"] == 0
+
+
+def test_writers_enqueue_while_sink_runs(fake_db, monkeypatch):
+    sink = EventSink(max_buffer=100, batch_size=100, flush_interval_ms=60_000)
+    monkeypatch.setattr(activity_events, "event_sink", sink)
+    monkeypatch.setattr(admin_audit, "event_sink", sink)
+
+    def no_inline_write():
+        raise AssertionError("should not write inline")
+
+    monkeypatch.setattr(activity_events, "get_async_db", no_inline_write)
+    monkeypatch.setattr(admin_audit, "get_async_db", no_inline_write)
+
+    async def run():
+        sink.start()
+        await activity_events.write_event("content_playback", "u1", course_id="c1", lesson_id="l1")
+        await admin_audit.write_audit("update_course", "course", "c1", "admin1", {"token": "x"})
+        buffered = list(sink._buffer)
+        await sink.stop()
+        return buffered
+
+    buffered = asyncio.run(run())
+    assert [c for c, _, _ in buffered] == ["activity_events", "admin_audit"]
+    assert buffered[0][2]["type"] == "content_playback"
+    assert buffered[1][2]["payloadSummary"] == {"token": "***"}
+    assert len(fake_db.commits) == 1
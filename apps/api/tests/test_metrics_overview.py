@@ -0,0 +1,130 @@
+"""
+Admin metrics overview: count() aggregations and the cached snapshot.
+Uses fake aggregation queries — no real Firestore.
+"""
+import asyncio
+
+import pytest
+
+from app.services import metrics_overview
+from app.services.metrics_overview import CachedSnapshot
+
+
+class FakeAggregation:
+    def __init__(self, db, key):
+        self._db, self._key = db, key
+
+    async def get(self):
+        self._db.in_flight += 1
+        self._db.max_in_flight = max(self._db.max_in_flight, self._db.in_flight)
+        await asyncio.sleep(0)
+        self._db.in_flight -= 1
+        result = type("AggregationResult", (), {"alias": "count", "value": self._db.counts[self._key]})()
+        return [[result]]
+
+
+class FakeQuery:
+    def __init__(self, db, key):
+        self._db, self._key = db, key
+
+    def where(self, field, op, value):
+        return FakeQuery(self._db, f"{self._key}?{field}{op}{value}")
+
+    def count(self, alias=None):
+        return FakeAggregation(self._db, self._key)
+
+    def stream(self):
+        raise AssertionError("documents should not be streamed")
+
+
+class FakeDb:
+    def __init__(self, counts):
+        self.counts = counts
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def collection(self, name):
+        return FakeQuery(self, name)
+
+
+def test_overview_uses_concurrent_count_aggregations(monkeypatch):
+    counts = {name: 5000 + i for i, name in enumerate(
+        ["users", "courses", "lessons", "plans", "purchases", "subscriptions", "entitlements"]
+    )}
+    for name in ("courses", "lessons", "plans"):
+        counts[f"{name}?published==True"] = 7
+    db = FakeDb(counts)
+    monkeypatch.setattr(metrics_overview, "get_async_db", lambda: db)
+
+    overview = asyncio.run(metrics_overview.load_overview_counts())
+
+    # Exact counts, no 1000 cap
+    assert overview["users_total"] == 5000
+    assert overview["entitlements_total"] == 5006
+    assert overview["lessons_published"] == 7
+    assert len(overview) == 10
+    assert db.max_in_flight == 10
+
+
+@pytest.fixture
+def loads():
+    return []
+
+
+def _snapshot(loads, ttl):
+    async def loader():
+        loads.append(len(loads))
+        await asyncio.sleep(0)
+        return {"n": len(loads)}
+    return CachedSnapshot(loader, ttl)
+
+
+def test_snapshot_serves_cached_value_within_ttl(loads):
+    snapshot = _snapshot(loads, ttl=60)
+
+    async def run():
+        first = await asyncio.gather(snapshot.get(), snapshot.get(), snapshot.get())
+        again = await snapshot.get()
+        return first, again
+
+    first, again = asyncio.run(run())
+    # Concurrent first callers share one load
+    assert loads == [0]
+    assert [value for value, _ in first] == [{"n": 1}] * 3
+    assert again[0] == {"n": 1}
+
+
+def test_stale_snapshot_is_served_while_refreshing(loads):
+    snapshot = _snapshot(loads, ttl=0)
+
+    async def run():
+        first, _ = await snapshot.get()
+        stale, _ = await snapshot.get()      # returns immediately, refresh scheduled
+        await asyncio.sleep(0.01)
+        return first, stale, snapshot._value
+
+    first, stale, refreshed = asyncio.run(run())
+    assert first == {"n": 1}
+    assert stale == {"n": 1}
+    assert refreshed == {"n": 2}
+
+
+def test_failed_refresh_keeps_last_snapshot():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        if len(calls) > 1:
+            raise RuntimeError("firestore unavailable")
+        return {"n": 1}
+
+    snapshot = CachedSnapshot(loader, ttl_seconds=0)
+
+    async def run():
+        await snapshot.get()
+        await snapshot.get()
+        await asyncio.sleep(0.01)
+        return await snapshot.get()
+
+    value, _ = asyncio.run(run())
+    assert value == {"n": 1}
@@ -0,0 +1,99 @@
+"""
+Test: a webhook body is parsed and redacted once per request.
+
+Verifies:
+- handle_webhook decodes the JSON once and redacts once, shared by
+  verification, payload capture and the capture log line
+- Redaction is skipped entirely when nothing needs it
+- Candidates match the per-fixture expectations
+"""
+
+import asyncio
+import json
+import logging
+
+import pytest
+
+from app.config import settings
+from app.payments import parsed_webhook, repo_memory
+from app.payments.errors import WebhookPayloadError
+from app.payments.parsed_webhook import ParsedWebhook
+from app.payments.providers import payplus
+from app.payments.service import handle_webhook
+from tests.helpers.fixture_loader import load_json_fixture
+from tests.test_payplus_golden_mapping import FIXTURE_EXPECTATIONS
+
+
+@pytest.fixture(autouse=True)
+def payplus_settings(monkeypatch):
+    monkeypatch.setattr(settings, "PAYMENTS_PROVIDER", "payplus")
+    monkeypatch.setattr(settings, "PAYMENTS_REPO", "memory")
+    monkeypatch.setattr(settings, "PAYPLUS_SECRET_KEY", "test_secret_key")
+    monkeypatch.setattr(settings, "PAYPLUS_WEBHOOK_VERIFY_MODE", "log_only")
+    repo_memory.reset()
+    yield
+    repo_memory.reset()
+
+
+def _count_calls(monkeypatch) -> dict:
+    counts = {"loads": 0, "redact": 0}
+    real_loads, real_redact = parsed_webhook.json.loads, parsed_webhook.redact_payload
+
+    def loads(*args, **kwargs):
+        counts["loads"] += 1
+        return real_loads(*args, **kwargs)
+
+    def redact(*args, **kwargs):
+        counts["redact"] += 1
+        return real_redact(*args, **kwargs)
+
+    monkeypatch.setattr(parsed_webhook.json, "loads", loads)
+    monkeypatch.setattr(parsed_webhook, "redact_payload", redact)
+    return counts
+
+
+def _body(path="payplus/approved.json") -> bytes:
+    return json.dumps(load_json_fixture(path)).encode()
+
+
+def test_parse_and_redact_once_per_webhook(monkeypatch):
+    body = _body()
+    counts = _count_calls(monkeypatch)
+    monkeypatch.setattr(settings, "PAYPLUS_CAPTURE_WEBHOOK_PAYLOADS", True)
+    monkeypatch.setattr(payplus.logger, "isEnabledFor", lambda level: True)
+
+    result = asyncio.run(handle_webhook(body, {"hash": "replay"}))
+    assert result["unknown_intent"] is True
+    assert counts == {"loads": 1, "redact": 1}
+
+    event = next(iter(repo_memory._events.values()))
+    assert event["providerRefCandidate"] == "pp_req_ok_001"
+    assert event["payload_keys"]
+    assert event["payload_raw_redacted"]
+
+
+def test_redaction_skipped_when_unused(monkeypatch):
+    body = _body()
+    counts = _count_calls(monkeypatch)
+    monkeypatch.setattr(settings, "PAYPLUS_CAPTURE_WEBHOOK_PAYLOADS", False)
+    monkeypatch.setattr(payplus.logger, "isEnabledFor", lambda level: level > logging.INFO)
+
+    asyncio.run(handle_webhook(body, {"hash": "replay"}))
+    assert counts == {"loads": 1, "redact": 0}
+    event = next(iter(repo_memory._events.values()))
+    assert "payload_raw_redacted" not in event
+
+
+@pytest.mark.parametrize("fixture_path, _event, provider_ref, txn_uid, sub_id", FIXTURE_EXPECTATIONS)
+def test_candidates_per_fixture(fixture_path, _event, provider_ref, txn_uid, sub_id):
+    candidates = ParsedWebhook(_body(fixture_path)).candidates
+    assert candidates["providerRefCandidate"] == provider_ref
+    assert candidates["transactionUidCandidate"] == txn_uid
+    assert candidates["providerSubscriptionIdCandidate"] == sub_id
+
+
+def test_invalid_or_non_object_body():
+    with pytest.raises(WebhookPayloadError):
+        ParsedWebhook(b"{not json").data
+    with pytest.raises(WebhookPayloadError):
+        payplus.PayPlusProvider().verify_webhook(b"[1, 2]", {"hash": "replay"})
@@ -33,7 +33,7 @@ class FakeIntentsRepo:
             }
         }
     
-    def get_intent(self, intent_id: str):
+    async def get_intent(self, intent_id: str):
         # Return a mock object mimicking the firestore document structure
         # In the real code, get_intent returns a dict or similar object
         # Based on how get_intent is typed, let's create a dummy class
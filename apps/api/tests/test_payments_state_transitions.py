@@ -0,0 +1,115 @@
+"""
+Test: webhook state transitions are applied in one commit.
+
+Verifies:
+- Each canonical event type records the event and all its writes together
+- Entitlements go through the user_access write path, so access checks see them
+- Duplicates apply nothing
+- A failing transition leaves no event record and no partial writes
+"""
+
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.payments import repo_memory
+from app.payments.models import PaymentIntent
+from app.services import access_service
+
+client = TestClient(app)
+
+UID = "test-user-transitions"
+
+
+@pytest.fixture(autouse=True)
+def reset_memory_repos():
+    repo_memory.reset()
+    yield
+    repo_memory.reset()
+
+
+def _create_intent(scope: str = "course", kind: str = "one_time") -> str:
+    now = datetime.now(timezone.utc)
+    asyncio.run(repo_memory.MemoryIntentsRepo.create_intent(PaymentIntent(
+        id=f"pi_{scope}", uid=UID, kind=kind, scope=scope,
+        courseId="alpha-protocol" if scope == "course" else None,
+        status="pending", provider="stub", providerRef=f"stub:pi_{scope}",
+        createdAt=now, updatedAt=now,
+    )))
+    return f"stub:pi_{scope}"
+
+
+def _send(event_id: str, event_type: str, provider_ref: str, **payload):
+    body = {"event_id": event_id, "event_type": event_type, "provider_ref": provider_ref, "payload": payload}
+    r = client.post("/webhooks/payments", content=json.dumps(body), headers={"Content-Type": "application/json"})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_course_payment_applies_intent_and_entitlement_together(memory_access):
+    ents, _ = memory_access
+    ref = _create_intent()
+    assert _send("evt_tr_course", "payment.succeeded", ref) == {"ok": True, "duplicate": False}
+
+    assert repo_memory._intents["pi_course"]["status"] == "succeeded"
+    ent = ents[f"ent_course_{UID}_alpha-protocol"]
+    assert ent["status"] == "active" and ent["source"] == "one_time"
+    assert "stub:evt_tr_course" in repo_memory._events
+
+    assert _send("evt_tr_course", "payment.succeeded", ref) == {"ok": True, "duplicate": True}
+
+
+def test_succeeded_webhook_grants_access(memory_access):
+    ref = _create_intent()
+    assert asyncio.run(access_service.can_access_course(UID, "alpha-protocol")) is False
+
+    _send("evt_tr_access", "payment.succeeded", ref)
+    assert asyncio.run(access_service.can_access_course(UID, "alpha-protocol")) is True
+    assert asyncio.run(access_service.check_courses(UID, ["alpha-protocol", "beta-protocol"])) == {
+        "alpha-protocol": True, "beta-protocol": False,
+    }
+
+
+def test_subscription_lifecycle_transitions(memory_access):
+    ents, _ = memory_access
+    ref = _create_intent(scope="membership", kind="subscription")
+    _send("evt_tr_renew", "subscription.renewed", ref, provider_subscription_id="pp_sub_1")
+
+    sub_id = f"sub_{UID}_stub_pp_sub_1"
+    membership = f"ent_membership_{UID}"
+    assert repo_memory._subscriptions[sub_id]["status"] == "active"
+    assert ents[membership]["status"] == "active"
+    assert ents[membership]["billingSubscriptionId"] == "pp_sub_1"
+    # Renewals don't touch the intent
+    assert repo_memory._intents["pi_membership"]["status"] == "pending"
+
+    _send("evt_tr_past_due", "subscription.past_due", ref, provider_subscription_id="pp_sub_1")
+    assert repo_memory._subscriptions[sub_id]["status"] == "past_due"
+    assert ents[membership]["status"] == "active"
+
+    _send("evt_tr_cancel", "subscription.canceled", ref, provider_subscription_id="pp_sub_1")
+    assert repo_memory._subscriptions[sub_id]["status"] == "canceled"
+    assert ents[membership]["status"] == "inactive"
+
+
+def test_failed_transition_writes_nothing(monkeypatch, memory_access):
+    ents, _ = memory_access
+    ref = _create_intent()
+
+    async def lost_intent(provider, provider_ref):
+        # Intent lookup succeeds but the doc is gone by the time the transition applies
+        return PaymentIntent(
+            id="pi_missing", uid=UID, kind="one_time", scope="course", courseId="alpha-protocol",
+            status="pending", provider="stub", providerRef=provider_ref,
+        )
+
+    monkeypatch.setattr(repo_memory.MemoryIntentsRepo, "find_by_provider_ref", staticmethod(lost_intent))
+    with pytest.raises(KeyError):
+        _send("evt_tr_fail", "payment.succeeded", ref)
+
+    assert repo_memory._events == {}
+    assert ents == {}
@@ -0,0 +1,90 @@
+"""
+Unit tests for the pooled PayPlus HTTP client. No network: requests go
+through httpx.MockTransport installed as the shared client.
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.payments.models import PaymentIntent
+from app.payments.providers import payplus_client
+from app.payments.providers.payplus import PayPlusProvider
+from app.payments.providers.payplus_client import PayPlusClient, PayPlusClientError
+
+GENERATE_LINK_RESPONSE = {
+    "results": {"status": "success"},
+    "data": {"payment_page_link": "https://pay.example/p/1", "payment_request_uid": "pp_req_1"},
+}
+
+
+def _handler(requests):
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path.endswith("/fail"):
+            return httpx.Response(502, text="bad gateway")
+        return httpx.Response(200, json=GENERATE_LINK_RESPONSE)
+    return handle
+
+
+@pytest.fixture(autouse=True)
+def clean_pool():
+    payplus_client._sync_clients.clear()
+    payplus_client._async_clients.clear()
+    yield
+    payplus_client._sync_clients.clear()
+    payplus_client._async_clients.clear()
+
+
+def test_sync_client_is_shared_across_instances():
+    a = payplus_client.get_http_client(15)
+    assert payplus_client.get_http_client(15) is a
+    assert payplus_client.get_http_client(5) is not a
+
+    requests = []
+    payplus_client._sync_clients[15] = httpx.Client(transport=httpx.MockTransport(_handler(requests)))
+    for _ in range(3):
+        assert PayPlusClient(api_key="k", secret_key="s").post_json("/ok", {"x": 1}) == GENERATE_LINK_RESPONSE
+    assert len(requests) == 3
+    assert json.loads(requests[0].headers["Authorization"]) == {"api_key": "k", "secret_key": "s"}
+
+    with pytest.raises(PayPlusClientError) as exc:
+        PayPlusClient().post_json("/fail", {})
+    assert exc.value.status_code == 502
+
+
+def test_async_checkout_uses_pooled_async_client(monkeypatch):
+    monkeypatch.setattr(settings, "PAYPLUS_PAYMENT_PAGE_UID_ONE_TIME", "page_1")
+    intent = PaymentIntent(id="pi_1", uid="u1", kind="one_time", scope="course", courseId="c1", provider="payplus")
+    requests = []
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        shared = httpx.AsyncClient(transport=httpx.MockTransport(_handler(requests)))
+        payplus_client._async_clients[settings.PAYPLUS_TIMEOUT_SECONDS] = (loop, shared)
+        first = await PayPlusProvider().create_one_time_checkout_async(intent)
+        second = await PayPlusProvider().create_one_time_checkout_async(intent)
+        assert payplus_client.get_async_http_client(settings.PAYPLUS_TIMEOUT_SECONDS) is shared
+        await payplus_client.close_http_clients()
+        assert shared.is_closed
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.provider_ref == second.provider_ref == "pp_req_1"
+    assert len(requests) == 2
+    assert json.loads(requests[0].content)["payment_page_uid"] == "page_1"
+    assert payplus_client._async_clients == {}
+
+
+def test_http2_falls_back_without_h2(monkeypatch):
+    monkeypatch.setattr(settings, "PAYPLUS_HTTP2", True)
+    try:
+        import h2  # noqa: F401
+        expected = True
+    except ImportError:
+        expected = False
+    assert payplus_client._http2_enabled() is expected
+    # Creating the client must not fail either way
+    payplus_client.get_http_client(15)
@@ -1,6 +1,7 @@
 import pytest
+import asyncio
 import json
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 
 from app.payments import service
 from app.payments import events
@@ -43,7 +44,7 @@ def test_handler_safety_for_unmapped_events():
         mock_get_provider.return_value = mock_provider
 
         # Setup mock repos
-        mock_repos = MagicMock()
+        mock_repos = AsyncMock()
         # Ensure it is not counted as duplicate
         mock_repos.events.create_event_if_absent.return_value = True
         
@@ -57,7 +58,7 @@ def test_handler_safety_for_unmapped_events():
             mock_entitlements.side_effect = Exception("GUARD FAILURE: entitlements modified!")
             
             # Action!
-            result = service.handle_webhook(raw_body, headers={"hash": "test"})
+            result = asyncio.run(service.handle_webhook(raw_body, headers={"hash": "test"}))
 
             # Assert unmapped short-circuit behavior
             assert result["ok"] is True
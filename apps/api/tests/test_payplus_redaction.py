@@ -64,3 +64,22 @@ def test_redact_payload_truncation():
     redacted = redact_payload(payload, REDACT_KEYS)
     assert len(redacted["notes"]) == 214 # 200 + 14 chars for "...(truncated)"
     assert redacted["notes"].endswith("...(truncated)")
+
+def test_redact_payload_depth_limit_and_order():
+    payload = {"a": {"b": {"c": "deep", "d": [1, {"e": 2}]}}, "z": 1, "card_no": "x"}
+    redacted = redact_payload(payload, REDACT_KEYS, max_depth=2)
+    assert list(redacted) == ["a", "z", "card_no"]
+    assert redacted["a"]["b"] == {"c": "***max_depth_exceeded***", "d": "***max_depth_exceeded***"}
+    assert redacted["card_no"] == "***redacted***"
+    # Iterative traversal: nesting far beyond the recursion limit is fine
+    deep = current = {}
+    for _ in range(5000):
+        current["n"] = current = {}
+    assert redact_payload(deep, REDACT_KEYS, max_depth=10_000) is not deep
+
+def test_compiled_redactor_is_reused_and_escapes_keys():
+    from app.payments.redact import get_redactor
+    assert get_redactor(REDACT_KEYS) is get_redactor(set(REDACT_KEYS))
+    redacted = redact_payload({"x.y": 1, "xzy": 2, "a+b": 3}, {"x.y", "a+b"})
+    assert redacted == {"x.y": "***redacted***", "xzy": 2, "a+b": "***redacted***"}
+    assert redact_payload({"email": "a"}, set()) == {"email": "a"}
@@ -1,6 +1,7 @@
+import asyncio
 import json
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 from app.payments.service import handle_webhook
 from app.payments.provider import VerifiedWebhook
 from app.payments import events
@@ -39,7 +40,7 @@ def test_payplus_schema_capture_extraction(
         mock_provider.verify_webhook.return_value = mock_verified
         mock_get_provider.return_value = mock_provider
         
-        mock_repos = MagicMock()
+        mock_repos = AsyncMock()
         mock_repos.events.create_event_if_absent.return_value = True
         
         # We don't care about intent updates for this test, dummy it out
@@ -49,7 +50,7 @@ def test_payplus_schema_capture_extraction(
         mock_get_repos.return_value = mock_repos
         
         # Call the service function
-        result = handle_webhook(raw_body, headers={"X-Signature": "test"})
+        result = asyncio.run(handle_webhook(raw_body, headers={"X-Signature": "test"}))
         
         # Verify capture was attempted
         mock_repos.events.create_event_if_absent.assert_called_once()
@@ -66,7 +66,7 @@ def reset_and_patch(monkeypatch):
 
 
 def _mock_post_json(path: str, payload: dict) -> dict:
-    """Mock PayPlusClient.post_json for generateLink."""
+    """Mock PayPlusClient.post_json_async for generateLink."""
     if "generateLink" in path:
         return MOCK_GENERATE_LINK_RESPONSE
     return {"results": {"status": "error"}, "data": {}}
@@ -74,7 +74,7 @@ def _mock_post_json(path: str, payload: dict) -> dict:
 
 def _create_subscription_checkout() -> str:
     """Helper: create a subscription checkout and return the providerRef."""
-    with patch.object(PayPlusClient, "post_json", side_effect=_mock_post_json):
+    with patch.object(PayPlusClient, "post_json_async", side_effect=_mock_post_json):
         response = client.post(
             "/checkout/session",
             headers=AUTH_HEADERS,
@@ -135,7 +135,7 @@ def _send_webhook(event_id: str, event_type: str, provider_ref: str,
 class TestSubscriptionLifecycle:
     def test_subscription_checkout_creates_payplus_intent(self):
         """Subscription checkout creates intent with provider=payplus."""
-        with patch.object(PayPlusClient, "post_json", side_effect=_mock_post_json):
+        with patch.object(PayPlusClient, "post_json_async", side_effect=_mock_post_json):
             response = client.post(
                 "/checkout/session",
                 headers=AUTH_HEADERS,
@@ -151,7 +151,7 @@ class TestSubscriptionLifecycle:
 
     def test_sub_renewed_activates_entitlement(self):
         """SUB_RENEWED webhook sets membership entitlement to active."""
-        with patch.object(PayPlusClient, "post_json", side_effect=_mock_post_json):
+        with patch.object(PayPlusClient, "post_json_async", side_effect=_mock_post_json):
             provider_ref = _create_subscription_checkout()
 
         result = _send_webhook(
@@ -171,7 +171,7 @@ class TestSubscriptionLifecycle:
 
     def test_duplicate_webhook_is_idempotent(self):
         """Same event_id sent twice: second is duplicate."""
-        with patch.object(PayPlusClient, "post_json", side_effect=_mock_post_json):
+        with patch.object(PayPlusClient, "post_json_async", side_effect=_mock_post_json):
             provider_ref = _create_subscription_checkout()
 
         r1 = _send_webhook(
@@ -194,7 +194,7 @@ class TestSubscriptionLifecycle:
 
     def test_sub_canceled_deactivates_entitlement(self):
         """SUB_CANCELED webhook sets membership entitlement to inactive."""
-        with patch.object(PayPlusClient, "post_json", side_effect=_mock_post_json):
+        with patch.object(PayPlusClient, "post_json_async", side_effect=_mock_post_json):
             provider_ref = _create_subscription_checkout()
 
         # First: renew to activate
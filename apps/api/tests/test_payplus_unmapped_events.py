@@ -8,8 +8,9 @@ Verifies:
 - Mapped events still flow normally (control test)
 """
 
+import asyncio
 import json
-from unittest.mock import patch, MagicMock, call
+from unittest.mock import patch, AsyncMock, MagicMock, call
 
 from app.payments import events
 from app.payments.service import handle_webhook
@@ -83,11 +84,11 @@ class TestUnmappedEventAcceptedAndFlagged:
             mock_provider.verify_webhook.return_value = _mock_verified_unmapped()
             mock_get_provider.return_value = mock_provider
 
-            mock_repos = MagicMock()
+            mock_repos = AsyncMock()
             mock_repos.events.create_event_if_absent.return_value = True
             mock_get_repos.return_value = mock_repos
 
-            result = handle_webhook(_make_raw_body(), headers={"hash": "test"})
+            result = asyncio.run(handle_webhook(_make_raw_body(), headers={"hash": "test"}))
 
             assert result["ok"] is True
             assert result["duplicate"] is False
@@ -103,11 +104,11 @@ class TestUnmappedEventAcceptedAndFlagged:
             mock_provider.verify_webhook.return_value = _mock_verified_unmapped()
             mock_get_provider.return_value = mock_provider
 
-            mock_repos = MagicMock()
+            mock_repos = AsyncMock()
             mock_repos.events.create_event_if_absent.return_value = True
             mock_get_repos.return_value = mock_repos
 
-            handle_webhook(_make_raw_body(), headers={"hash": "test"})
+            asyncio.run(handle_webhook(_make_raw_body(), headers={"hash": "test"}))
 
             mock_repos.events.create_event_if_absent.assert_called_once()
             call_kwargs = mock_repos.events.create_event_if_absent.call_args[1]
@@ -126,11 +127,11 @@ class TestUnmappedEventAcceptedAndFlagged:
             mock_provider.verify_webhook.return_value = _mock_verified_unmapped()
             mock_get_provider.return_value = mock_provider
 
-            mock_repos = MagicMock()
+            mock_repos = AsyncMock()
             mock_repos.events.create_event_if_absent.return_value = True
             mock_get_repos.return_value = mock_repos
 
-            handle_webhook(_make_raw_body(), headers={"hash": "test"})
+            asyncio.run(handle_webhook(_make_raw_body(), headers={"hash": "test"}))
 
             # Intent lookup + update should NEVER be called for unmapped events
             mock_repos.intents.find_by_provider_ref.assert_not_called()
@@ -150,11 +151,11 @@ class TestUnmappedEventIdempotency:
             mock_provider.verify_webhook.return_value = _mock_verified_unmapped()
             mock_get_provider.return_value = mock_provider
 
-            mock_repos = MagicMock()
+            mock_repos = AsyncMock()
             mock_repos.events.create_event_if_absent.return_value = False  # duplicate
             mock_get_repos.return_value = mock_repos
 
-            result = handle_webhook(_make_raw_body(), headers={"hash": "test"})
+            result = asyncio.run(handle_webhook(_make_raw_body(), headers={"hash": "test"}))
 
             assert result["ok"] is True
             assert result["duplicate"] is True
@@ -173,7 +174,7 @@ class TestMappedEventStillWorks:
             mock_provider.verify_webhook.return_value = _mock_verified_succeeded()
             mock_get_provider.return_value = mock_provider
 
-            mock_repos = MagicMock()
+            mock_repos = AsyncMock()
             mock_repos.events.create_event_if_absent.return_value = True
 
             mock_intent = MagicMock()
@@ -184,10 +185,10 @@ class TestMappedEventStillWorks:
             mock_repos.intents.find_by_provider_ref.return_value = mock_intent
             mock_get_repos.return_value = mock_repos
 
-            result = handle_webhook(
+            result = asyncio.run(handle_webhook(
                 json.dumps({"payment_request_uid": "pp_req_ok_1", "transaction": {"uid": "txn_ok_1", "status_code": "000", "status": "approved"}}).encode(),
                 headers={"hash": "test"},
-            )
+            ))
 
             assert result["ok"] is True
             assert "unmapped" not in result
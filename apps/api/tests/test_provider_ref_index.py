@@ -0,0 +1,170 @@
+"""
+Unit tests for the provider_refs mapping used to resolve webhooks to
+payment intents. No real Firestore.
+"""
+import asyncio
+from datetime import datetime, timezone
+
+from app.payments import repo_intents, repo_memory
+from app.payments.models import IntentRef, PaymentIntent
+
+
+def _intent(intent_id="pi_1", provider="payplus", provider_ref=None):
+    now = datetime.now(timezone.utc)
+    return PaymentIntent(
+        id=intent_id, uid="u1", kind="one_time", scope="course", courseId="c1",
+        provider=provider, providerRef=provider_ref, createdAt=now, updatedAt=now,
+    )
+
+
+class _Snap:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class _Doc:
+    def __init__(self, db, collection, doc_id):
+        self.db, self.key = db, (collection, doc_id)
+
+    async def get(self):
+        self.db.gets.append(self.key)
+        return _Snap(self.key[1], self.db.docs.get(self.key))
+
+    async def set(self, data):
+        self.db.docs[self.key] = dict(data)
+
+    async def update(self, patch):
+        self.db.docs[self.key].update(patch)
+
+
+class _Query:
+    def __init__(self, db, collection, filters=()):
+        self.db, self.collection, self.filters = db, collection, filters
+
+    def where(self, field, op, value):
+        return _Query(self.db, self.collection, self.filters + ((field, value),))
+
+    def limit(self, n):
+        return self
+
+    async def stream(self):
+        self.db.queries += 1
+        for (coll, doc_id), data in list(self.db.docs.items()):
+            if coll == self.collection and all(data.get(f) == v for f, v in self.filters):
+                yield _Snap(doc_id, data)
+
+
+class _Collection(_Query):
+    def document(self, doc_id):
+        return _Doc(self.db, self.collection, doc_id)
+
+
+class _Batch:
+    def __init__(self, db):
+        self.db, self.ops = db, []
+
+    def update(self, ref, patch):
+        self.ops.append(lambda: self.db.docs[ref.key].update(patch))
+
+    def set(self, ref, data):
+        self.ops.append(lambda: self.db.docs.__setitem__(ref.key, dict(data)))
+
+    async def commit(self):
+        self.db.commits += 1
+        for op in self.ops:
+            op()
+
+
+class _FakeDb:
+    def __init__(self):
+        self.docs, self.gets, self.queries, self.commits = {}, [], 0, 0
+
+    def collection(self, name):
+        return _Collection(self, name)
+
+    def batch(self):
+        return _Batch(self)
+
+
+def test_memory_index_follows_provider_ref_updates():
+    repo_memory.reset()
+    repo = repo_memory.MemoryIntentsRepo
+    asyncio.run(repo.create_intent(_intent()))
+    assert asyncio.run(repo.find_by_provider_ref("payplus", "pp_1")) is None
+
+    asyncio.run(repo.update_intent("pi_1", {"providerRef": "pp_1"}))
+    ref = asyncio.run(repo.find_by_provider_ref("payplus", "pp_1"))
+    assert isinstance(ref, IntentRef) and ref.id == "pi_1"
+    assert not hasattr(ref, "status")
+    assert asyncio.run(repo.find_by_provider_ref("stub", "pp_1")) is None
+
+    asyncio.run(repo.create_intent(_intent("pi_2", provider_ref="pp_2")))
+    assert asyncio.run(repo.find_by_provider_ref("payplus", "pp_2")).id == "pi_2"
+    repo_memory.reset()
+
+
+def test_firestore_mapping_written_with_provider_ref(monkeypatch):
+    db = _FakeDb()
+    monkeypatch.setattr(repo_intents, "get_async_db", lambda: db)
+    asyncio.run(repo_intents.create_intent(_intent()))
+
+    asyncio.run(repo_intents.update_intent("pi_1", {"providerRef": "pp/1"}, intent=_intent()))
+    assert db.commits == 1
+    assert db.docs[("provider_refs", "payplus:pp%2F1")]["intentId"] == "pi_1"
+
+    db.gets.clear()
+    intent = asyncio.run(repo_intents.find_by_provider_ref("payplus", "pp/1"))
+    assert isinstance(intent, IntentRef)
+    assert intent.id == "pi_1" and intent.providerRef == "pp/1"
+    assert (intent.uid, intent.scope, intent.courseId) == ("u1", "course", "c1")
+    # One document get resolves the webhook
+    assert db.gets == [("provider_refs", "payplus:pp%2F1")]
+    assert db.queries == 0
+
+
+def test_firestore_mapping_without_copy_is_backfilled(monkeypatch):
+    db = _FakeDb()
+    monkeypatch.setattr(repo_intents, "get_async_db", lambda: db)
+    asyncio.run(repo_intents.create_intent(_intent(provider_ref="pp_1")))
+    # Mapping written before it carried the intent
+    db.docs[("provider_refs", "payplus:pp_1")] = {"intentId": "pi_1", "provider": "payplus", "providerRef": "pp_1"}
+
+    assert asyncio.run(repo_intents.find_by_provider_ref("payplus", "pp_1")).id == "pi_1"
+    assert db.docs[("provider_refs", "payplus:pp_1")]["intent"]["uid"] == "u1"
+
+    db.gets.clear()
+    assert asyncio.run(repo_intents.find_by_provider_ref("payplus", "pp_1")).id == "pi_1"
+    assert db.gets == [("provider_refs", "payplus:pp_1")]
+
+
+def test_firestore_lookup_backfills_legacy_intents(monkeypatch):
+    db = _FakeDb()
+    monkeypatch.setattr(repo_intents, "get_async_db", lambda: db)
+    # Written before the mapping existed
+    asyncio.run(repo_intents.create_intent(_intent(provider_ref="pp_legacy")))
+
+    assert asyncio.run(repo_intents.find_by_provider_ref("payplus", "pp_legacy")).id == "pi_1"
+    assert db.queries == 1
+    assert db.docs[("provider_refs", "payplus:pp_legacy")]["intentId"] == "pi_1"
+
+    assert asyncio.run(repo_intents.find_by_provider_ref("payplus", "pp_legacy")).id == "pi_1"
+    assert db.queries == 1
+    assert asyncio.run(repo_intents.find_by_provider_ref("payplus", "pp_unknown")) is None
+
+
+def test_firestore_checkout_pointer_written_in_same_batch(monkeypatch):
+    db = _FakeDb()
+    monkeypatch.setattr(repo_intents, "get_async_db", lambda: db)
+    asyncio.run(repo_intents.create_intent(_intent()))
+    assert asyncio.run(repo_intents.get_checkout_intent("u1:one_time:course:c1:-:payplus")) is None
+
+    asyncio.run(repo_intents.update_intent(
+        "pi_1", {"providerRef": "pp_1"}, intent=_intent(), checkout_key="u1:one_time:course:c1:-:payplus",
+    ))
+    assert db.commits == 1
+    assert asyncio.run(repo_intents.get_checkout_intent("u1:one_time:course:c1:-:payplus")).id == "pi_1"
@@ -0,0 +1,119 @@
+"""
+Conditional GET (ETag / Last-Modified / 304) on the public catalog.
+Repos are monkeypatched — no real Firestore.
+"""
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import CoursePublic, LessonPublic
+
+client = TestClient(app)
+
+UPDATED = datetime(2024, 5, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def _course(course_id="course-1", updated_at=UPDATED, title="כוח"):
+    return CoursePublic(
+        id=course_id, titleHe=title, descriptionHe="תיאור", type="one_time",
+        published=True, updatedAt=updated_at,
+    )
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    state = {"courses": [_course()]}
+
+    async def list_published_courses():
+        return state["courses"]
+
+    async def get_published_course(cid):
+        return next((c for c in state["courses"] if c.id == cid), None)
+
+    monkeypatch.setattr("app.routers.public.courses.list_published_courses", list_published_courses)
+    monkeypatch.setattr("app.routers.public.courses.get_published_course", get_published_course)
+    return state
+
+
+def test_list_sets_validators(catalog):
+    res = client.get("/courses")
+    assert res.status_code == 200
+    assert res.headers["etag"].startswith('"')
+    # Lists are validated by ETag only
+    assert "last-modified" not in res.headers
+    assert "max-age=" in res.headers["cache-control"]
+
+
+def test_if_none_match_returns_304(catalog):
+    etag = client.get("/courses").headers["etag"]
+
+    res = client.get("/courses", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+    assert res.headers["etag"] == etag
+
+    # Weak form and lists are accepted too
+    res = client.get("/courses", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert res.status_code == 304
+
+
+def test_etag_changes_when_document_updated(catalog):
+    etag = client.get("/courses").headers["etag"]
+    catalog["courses"] = [_course(updated_at=UPDATED + timedelta(minutes=1))]
+
+    res = client.get("/courses", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["etag"] != etag
+
+
+def test_etag_changes_when_document_removed(catalog):
+    catalog["courses"] = [_course(), _course("course-2")]
+    etag = client.get("/courses").headers["etag"]
+    catalog["courses"] = [_course()]
+
+    assert client.get("/courses", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_unpublished_item_is_not_hidden_by_if_modified_since(catalog):
+    catalog["courses"] = [_course(), _course("course-2")]
+    since = format_datetime(UPDATED, usegmt=True)
+    # Unpublishing course-2 leaves the newest remaining updatedAt unchanged
+    catalog["courses"] = [_course()]
+
+    res = client.get("/courses", headers={"If-Modified-Since": since})
+    assert res.status_code == 200
+    assert [c["id"] for c in res.json()] == ["course-1"]
+
+
+def test_if_modified_since(catalog):
+    since = format_datetime(UPDATED, usegmt=True)
+    assert client.get("/courses/course-1", headers={"If-Modified-Since": since}).status_code == 304
+
+    earlier = format_datetime(UPDATED - timedelta(seconds=1), usegmt=True)
+    assert client.get("/courses/course-1", headers={"If-Modified-Since": earlier}).status_code == 200
+
+
+def test_if_none_match_takes_precedence(catalog):
+    since = format_datetime(UPDATED, usegmt=True)
+    res = client.get("/courses", headers={"If-None-Match": '"stale"', "If-Modified-Since": since})
+    assert res.status_code == 200
+
+
+def test_lesson_updated_at_drives_validators_but_is_not_exposed(monkeypatch):
+    lesson = LessonPublic(
+        id="lesson-1", courseId="course-1", titleHe="שיעור", descriptionHe="תיאור",
+        movementCategory="Strength", orderIndex=1, published=True, updatedAt=UPDATED,
+    )
+
+    async def get_published_lesson(lesson_id):
+        return lesson
+
+    monkeypatch.setattr("app.routers.public.lessons.get_published_lesson", get_published_lesson)
+    res = client.get("/lessons/lesson-1")
+    assert res.status_code == 200
+    assert "updatedAt" not in res.json()
+    assert res.headers["last-modified"] == format_datetime(UPDATED, usegmt=True)
+    assert "updatedAt" not in app.openapi()["components"]["schemas"]["LessonPublic"]["properties"]
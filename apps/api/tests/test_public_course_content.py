@@ -52,13 +52,18 @@ MOCK_PLAN_PDF = PlanPublic(
 
 @pytest.fixture
 def mock_repos(monkeypatch):
-    monkeypatch.setattr("app.routers.public.courses.get_published_course", lambda cid: MOCK_COURSE if cid == "course-1" else None)
+    def _async(fn):
+        async def wrapper(*args, **kwargs):
+            return fn(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr("app.routers.public.courses.get_published_course", _async(lambda cid: MOCK_COURSE if cid == "course-1" else None))
     
-    monkeypatch.setattr("app.routers.public.lessons.list_published_lessons_by_course", lambda cid: [MOCK_LESSON_VIDEO, MOCK_LESSON_NO_VIDEO] if cid == "course-1" else [])
-    monkeypatch.setattr("app.routers.public.lessons.get_published_lesson", lambda lid: MOCK_LESSON_VIDEO if lid == "lesson-1" else (MOCK_LESSON_NO_VIDEO if lid == "lesson-2" else None))
+    monkeypatch.setattr("app.routers.public.lessons.list_published_lessons_by_course", _async(lambda cid: [MOCK_LESSON_VIDEO, MOCK_LESSON_NO_VIDEO] if cid == "course-1" else []))
+    monkeypatch.setattr("app.routers.public.lessons.get_published_lesson", _async(lambda lid: MOCK_LESSON_VIDEO if lid == "lesson-1" else (MOCK_LESSON_NO_VIDEO if lid == "lesson-2" else None)))
     
-    monkeypatch.setattr("app.routers.public.plans.list_published_plans_by_course", lambda cid: [MOCK_PLAN_PDF] if cid == "course-1" else [])
-    monkeypatch.setattr("app.routers.public.plans.get_published_plan", lambda pid: MOCK_PLAN_PDF if pid == "plan-1" else None)
+    monkeypatch.setattr("app.routers.public.plans.list_published_plans_by_course", _async(lambda cid: [MOCK_PLAN_PDF] if cid == "course-1" else []))
+    monkeypatch.setattr("app.routers.public.plans.get_published_plan", _async(lambda pid: MOCK_PLAN_PDF if pid == "plan-1" else None))
 
 def test_get_course_lessons(mock_repos):
     res = client.get("/courses/course-1/lessons")
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -12,6 +12,7 @@ client = TestClient(app)
 @pytest.fixture
 def mock_db():
     mock = MagicMock()
+    mock.collection.return_value.document.return_value.set = AsyncMock()
     app.dependency_overrides[get_db] = lambda: mock
     yield mock
     app.dependency_overrides.clear()
@@ -84,3 +85,38 @@ def test_webhook_rate_limit_can_be_disabled(monkeypatch):
         # We expect a 400/401 webhook signature error, not 429
         res = client.post("/webhooks/payments", data=b"{}", headers={"X-Forwarded-For": "WEBHOOK_IP"})
         assert res.status_code != 429
+
+def test_gcra_burst_then_steady_refill():
+    from app.security.rate_limit import RateLimiter
+    rl = RateLimiter()
+
+    for i in range(5):
+        allowed, remaining, _ = rl.is_allowed("k", 5, 60, now=100.0)
+        assert allowed and remaining == 4 - i
+
+    allowed, remaining, retry_in = rl.is_allowed("k", 5, 60, now=100.0)
+    assert (allowed, remaining, retry_in) == (False, 0, 12)
+
+    # One request refills every window / max_requests seconds
+    assert rl.is_allowed("k", 5, 60, now=112.0)[0] is True
+    assert rl.is_allowed("k", 5, 60, now=112.0)[0] is False
+    # After a full window the whole burst is available again
+    assert rl.is_allowed("k", 5, 60, now=200.0)[1] == 4
+
+def test_idle_keys_are_evicted():
+    from app.security.rate_limit import RateLimiter
+    rl = RateLimiter(shards=4, sweep_interval_seconds=10)
+
+    for i in range(1000):
+        rl.is_allowed(f"ip:{i}", 5, 60, now=100.0)
+    assert len(rl) == 1000
+
+    # Each key's single request is still being paid back at t=105: nothing evicted
+    rl.is_allowed("other", 5, 60, now=105.0)
+    assert len(rl) == 1001
+
+    # Every earlier key is back at full capacity by t=200; shards touched
+    # after their sweep interval drop them
+    for i in range(100):
+        rl.is_allowed(f"new:{i}", 5, 60, now=200.0)
+    assert len(rl) == 100
@@ -0,0 +1,86 @@
+"""
+Distributed rate limiting: shared store + locally leased token batches.
+Several LeasedRateLimiter instances share a MemoryRateLimitStore to
+stand in for Cloud Run instances sharing Firestore.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.security import rate_limit
+from app.security.rate_limit import RateLimiter
+from app.security.rate_limit_distributed import (
+    LeasedRateLimiter, MemoryRateLimitStore, gcra_acquire,
+)
+
+
+def _allowed(instance, key, n, max_requests, window):
+    async def run():
+        results = [await instance.check(key, max_requests, window) for _ in range(n)]
+        return sum(1 for allowed, _, _ in results if allowed)
+    return asyncio.run(run())
+
+
+def test_gcra_acquire_grants_partial_batches():
+    grant, tat = gcra_acquire(None, 100.0, 50, 600, 60)
+    assert (grant.granted, grant.remaining) == (50, 550)
+
+    grant, tat = gcra_acquire(tat, 100.0, 600, 600, 60)
+    assert (grant.granted, grant.remaining) == (550, 0)
+
+    grant, tat = gcra_acquire(tat, 100.0, 50, 600, 60)
+    assert grant.granted == 0
+    assert grant.retry_in == pytest.approx(0.1)
+
+
+def test_limit_holds_across_instances():
+    store = MemoryRateLimitStore()
+    instances = [LeasedRateLimiter(store, lease_seconds=5) for _ in range(4)]
+
+    total = sum(_allowed(i, "rl:webhook:webhooks:1.2.3.4", 400, 600, 60) for i in instances)
+
+    # Per-process limiters would have allowed 4 x 400; the shared limit is 600
+    assert total == 600
+    # Leases of 50 tokens: most requests never reached the store
+    assert store.calls < 40
+
+
+def test_small_limits_lease_one_token():
+    store = MemoryRateLimitStore()
+    a, b = LeasedRateLimiter(store, lease_seconds=5), LeasedRateLimiter(store, lease_seconds=5)
+    assert a.lease_size(5, 60) == 1
+
+    assert _allowed(a, "rl:ip:auth_req:9.9.9.9", 3, 5, 60) == 3
+    assert _allowed(b, "rl:ip:auth_req:9.9.9.9", 5, 5, 60) == 2
+
+    allowed, remaining, retry_in = asyncio.run(b.check("rl:ip:auth_req:9.9.9.9", 5, 60))
+    assert (allowed, remaining) == (False, 0)
+    assert 1 <= retry_in <= 12
+
+
+def test_store_outage_falls_back_to_local_limiter():
+    class DownStore:
+        async def acquire(self, *args):
+            raise RuntimeError("unavailable")
+
+    instance = LeasedRateLimiter(DownStore(), lease_seconds=5, fallback=RateLimiter())
+    assert _allowed(instance, "k", 8, 5, 60) == 5
+
+
+def test_dependencies_use_configured_backend(monkeypatch):
+    store = MemoryRateLimitStore()
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_BACKEND", "firestore")
+    monkeypatch.setattr(rate_limit, "_distributed", LeasedRateLimiter(store, lease_seconds=5))
+
+    async def run():
+        for _ in range(5):
+            await rate_limit._enforce("rl:ip:auth_req:5.5.5.5", 5, 60)
+        with pytest.raises(HTTPException) as exc:
+            await rate_limit._enforce("rl:ip:auth_req:5.5.5.5", 5, 60)
+        return exc.value
+
+    exc = asyncio.run(run())
+    assert exc.status_code == 429
+    assert exc.headers["X-RateLimit-Remaining"] == "0"
+    assert store.calls == 6
@@ -0,0 +1,175 @@
+"""
+Unit tests for the in-memory Hebrew search index.
+No Firestore: the index is fed directly, or through the catalog replica's callbacks.
+"""
+import asyncio
+
+import pytest
+
+from app.repos import catalog_replica, courses, lessons, plans
+from app.repos import search_index as search_index_mod
+from app.repos.search_index import SearchIndex, search_index, tokenize, variants
+
+
+@pytest.fixture(autouse=True)
+def clean_index():
+    search_index.reset()
+    yield
+    search_index.reset()
+
+
+def _lesson(title, published=True, **extra):
+    return {
+        "courseId": "c1", "titleHe": title, "descriptionHe": "", "movementCategory": "",
+        "tags": [], "orderIndex": 0, "published": published, **extra,
+    }
+
+
+def test_normalization_strips_niqqud_and_folds_final_letters():
+    assert tokenize("שָׁלוֹם") == ["שלומ"]
+    # Final forms fold, so a prefix typed mid-word matches the full word
+    assert tokenize("אימון") == ["אימונ"]
+    assert tokenize("אימונים")[0].startswith(tokenize("אימון")[0])
+    assert tokenize('צה"ל, Deadlift-90') == ["צהל", "deadlift", "90"]
+
+
+def test_prefix_particles_are_stripped():
+    assert variants("והסקוואט") == ["והסקוואט", "הסקוואט", "סקוואט"]
+    assert variants("בית") == ["בית", "ית"]
+    # Never strip down to a single letter
+    assert variants("הר") == ["הר"]
+
+
+def test_search_matches_prefixes_particles_and_niqqud():
+    index = SearchIndex()
+    index.replace_collection("lessons", {
+        "l1": _lesson("סקוואט אחורי", tags=["רגליים"]),
+        "l2": _lesson("לחיצת חזה", movementCategory="press"),
+        "l3": _lesson("סקוואט קדמי", published=False),
+    })
+
+    assert [doc_id for doc_id, _ in index.search("lessons", "סקוו", 50)] == ["l1"]
+    assert [doc_id for doc_id, _ in index.search("lessons", "בסקוואט", 50)] == ["l1"]
+    assert [doc_id for doc_id, _ in index.search("lessons", "רגלַיִים", 50)] == ["l1"]
+    assert [doc_id for doc_id, _ in index.search("lessons", "PRESS", 50)] == ["l2"]
+    # Every token must match
+    assert index.search("lessons", "סקוואט חזה", 50) == []
+    # Unpublished docs and other collections are not returned
+    assert index.search("lessons", "קדמי", 50) == []
+    assert index.search("plans", "סקוואט", 50) is None
+
+
+def test_particle_stripped_query_needs_exact_term():
+    index = SearchIndex()
+    index.replace_collection("courses", {
+        "c1": _lesson("אימון קלאסי"),
+        "c2": _lesson("הרמת משקל"),
+    })
+    # "משקל" -> "קל" must not prefix-match "קלאסי"
+    assert [doc_id for doc_id, _ in index.search("courses", "משקל", 10)] == ["c2"]
+    assert [doc_id for doc_id, _ in index.search("courses", "והרמת", 10)] == ["c2"]
+    assert [doc_id for doc_id, _ in index.search("courses", "קלא", 10)] == ["c1"]
+
+
+def test_incremental_updates():
+    index = SearchIndex()
+    index.replace_collection("plans", {})
+
+    index.upsert("plans", "p1", {"titleHe": "תוכנית כוח", "descriptionHe": "", "published": True})
+    assert [d for d, _ in index.search("plans", "כוח", 50)] == ["p1"]
+
+    index.upsert("plans", "p1", {"titleHe": "תוכנית סיבולת", "descriptionHe": "", "published": True})
+    assert index.search("plans", "כוח", 50) == []
+    assert [d for d, _ in index.search("plans", "סיבולת", 50)] == ["p1"]
+
+    index.upsert("plans", "p1", {"titleHe": "תוכנית סיבולת", "descriptionHe": "", "published": False})
+    assert index.search("plans", "סיבולת", 50) == []
+
+    index.upsert("plans", "p1", {"titleHe": "תוכנית סיבולת", "descriptionHe": "", "published": True})
+    index.remove("plans", "p1")
+    assert index.search("plans", "תוכנית", 50) == []
+    assert index.stats() == {"terms": 0, "docs": 0}
+
+
+def test_repo_search_uses_index_and_falls_back_until_loaded(monkeypatch):
+    def no_firestore():
+        raise AssertionError("Firestore should not be queried")
+
+    search_index.replace_collection("lessons", {"l1": _lesson("דדליפט", vimeoVideoId="123")})
+    monkeypatch.setattr("app.repos.lessons.get_async_db", no_firestore)
+
+    found = asyncio.run(lessons.search_published_lessons("הדדליפט"))
+    assert [l.id for l in found] == ["l1"]
+    assert found[0].vimeoVideoId is None and found[0].hasVideo
+
+    # Not loaded: the repo falls back to its Firestore scan
+    monkeypatch.setattr("app.repos.plans.get_async_db", no_firestore)
+    with pytest.raises(AssertionError):
+        asyncio.run(plans.search_published_plans("כוח"))
+
+
+def test_replica_snapshots_feed_index():
+    from tests.test_catalog_replica import FakeDb
+
+    db = FakeDb()
+    catalog_replica.start(db)
+    try:
+        db.push("courses", {"c1": {"titleHe": "כוח בסיסי", "descriptionHe": "", "type": "one_time", "published": True}})
+        assert [c.id for c in asyncio.run(courses.search_published_courses("בסיס"))] == ["c1"]
+
+        db.push("courses", {
+            "c1": {"titleHe": "כוח מתקדם", "descriptionHe": "", "type": "one_time", "published": True},
+            "c2": {"titleHe": "כוח בסיסי", "descriptionHe": "", "type": "one_time", "published": True},
+        })
+        assert [c.id for c in asyncio.run(courses.search_published_courses("בסיס"))] == ["c2"]
+        assert [c.id for c in asyncio.run(courses.search_published_courses("כוח"))] == ["c1", "c2"]
+    finally:
+        catalog_replica.stop()
+    assert not search_index.is_ready("courses")
+
+
+def test_sync_respects_disabled_setting(monkeypatch):
+    monkeypatch.setattr(search_index_mod.settings, "SEARCH_INDEX_ENABLED", False)
+    search_index_mod.sync_collection("courses", {}, {"c1": {"titleHe": "כוח", "published": True}})
+    assert not search_index.is_ready("courses")
+
+
+def test_loader_covers_for_replica_that_is_not_serving(monkeypatch):
+    from tests.test_catalog_replica import FakeDb
+
+    class StopLoop(Exception):
+        pass
+
+    loads = []
+
+    async def fake_load_all():
+        loads.append(catalog_replica.is_serving())
+
+    async def one_round(_seconds):
+        raise StopLoop
+
+    monkeypatch.setattr(search_index_mod, "load_all", fake_load_all)
+    monkeypatch.setattr(search_index_mod.asyncio, "sleep", one_round)
+
+    def run_once():
+        with pytest.raises(StopLoop):
+            asyncio.run(search_index_mod.run_loader(60, skip=catalog_replica.is_serving))
+
+    # Replica enabled but never started: the loader builds the index
+    run_once()
+    assert loads == [False]
+
+    db = FakeDb()
+    catalog_replica.start(db)
+    try:
+        for collection in catalog_replica.CATALOG_COLLECTIONS:
+            db.push(collection, {})
+        run_once()
+        assert loads == [False]
+
+        # A listener drops: the loader takes over again
+        db.watches["lessons"].is_active = False
+        run_once()
+        assert loads == [False, False]
+    finally:
+        catalog_replica.stop()
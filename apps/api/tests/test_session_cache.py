@@ -0,0 +1,128 @@
+"""
+Tests for the session validation cache used by get_current_user_cookie.
+Uses a fake AsyncClient via dependency override — no real Firestore.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.deps import get_db
+from app.security.session_cache import SessionCache, session_cache
+
+client = TestClient(app)
+
+
+class FakeSnap:
+    def __init__(self, data):
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeDocRef:
+    def __init__(self, db, doc_id):
+        self._db = db
+        self._doc_id = doc_id
+
+    async def get(self):
+        self._db.reads += 1
+        return FakeSnap(self._db.sessions.get(self._doc_id))
+
+    async def delete(self):
+        self._db.sessions.pop(self._doc_id, None)
+
+
+class FakeDb:
+    def __init__(self):
+        self.sessions = {}
+        self.reads = 0
+
+    def collection(self, name):
+        assert name == "sessions"
+        db = self
+
+        class _Col:
+            def document(self, doc_id):
+                return FakeDocRef(db, doc_id)
+        return _Col()
+
+
+@pytest.fixture
+def fake_db():
+    db = FakeDb()
+    db.sessions["sess_1"] = {
+        "uid": "user_1",
+        "email": "user1@example.com",
+        "expiresAt": datetime.now(timezone.utc) + timedelta(days=1),
+    }
+    session_cache.clear()
+    app.dependency_overrides[get_db] = lambda: db
+    yield db
+    app.dependency_overrides.clear()
+    session_cache.clear()
+
+
+def test_repeated_requests_hit_cache(fake_db):
+    for _ in range(3):
+        res = client.get("/auth/session", cookies={"ironmind_session": "sess_1"})
+        assert res.status_code == 200
+        assert res.json()["uid"] == "user_1"
+
+    assert fake_db.reads == 1
+    stats = session_cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+
+
+def test_logout_invalidates_cached_session(fake_db):
+    assert client.get("/auth/session", cookies={"ironmind_session": "sess_1"}).status_code == 200
+
+    res = client.post("/auth/logout", cookies={"ironmind_session": "sess_1"})
+    assert res.status_code == 204
+
+    res = client.get("/auth/session", cookies={"ironmind_session": "sess_1"})
+    assert res.status_code == 401
+
+
+def test_invalid_session_is_not_cached(fake_db):
+    for _ in range(2):
+        res = client.get("/auth/session", cookies={"ironmind_session": "nope"})
+        assert res.status_code == 401
+    assert fake_db.reads == 2
+    assert session_cache.stats()["size"] == 0
+
+
+def test_entry_capped_at_session_expiry():
+    cache = SessionCache(max_entries=10, ttl_seconds=3600)
+    expires_at = datetime.fromtimestamp(1000, tz=timezone.utc)
+
+    cache.put("s", {"uid": "u"}, expires_at, now=990)
+    assert cache.get("s", now=995) == {"uid": "u"}
+    assert cache.get("s", now=1000) is None
+
+
+def test_entry_expires_after_ttl():
+    cache = SessionCache(max_entries=10, ttl_seconds=5)
+    expires_at = datetime.fromtimestamp(10_000, tz=timezone.utc)
+
+    cache.put("s", {"uid": "u"}, expires_at, now=100)
+    assert cache.get("s", now=104) is not None
+    assert cache.get("s", now=105) is None
+
+
+def test_lru_eviction():
+    cache = SessionCache(max_entries=2, ttl_seconds=60)
+    expires_at = datetime.fromtimestamp(10_000, tz=timezone.utc)
+
+    cache.put("a", {"uid": "a"}, expires_at, now=0)
+    cache.put("b", {"uid": "b"}, expires_at, now=0)
+    cache.get("a", now=1)  # a is now most recent
+    cache.put("c", {"uid": "c"}, expires_at, now=2)
+
+    assert cache.get("b", now=3) is None
+    assert cache.get("a", now=3) is not None
+    assert cache.get("c", now=3) is not None
@@ -0,0 +1,130 @@
+"""
+Tests for stateless signed session tokens (SESSION_MODE=signed).
+No Firestore: the db dependency is replaced with one that fails if touched.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.config import settings
+from app.deps import get_db
+from app.security import session_tokens
+
+client = TestClient(app)
+
+
+class ExplodingDb:
+    def collection(self, name):
+        raise AssertionError(f"Firestore should not be read (collection={name})")
+
+
+class FakeRevocationsDb:
+    def __init__(self):
+        self.written = {}
+
+    def collection(self, name):
+        assert name == session_tokens.REVOCATIONS_COLLECTION
+        db = self
+
+        class _Doc:
+            def __init__(self, doc_id):
+                self._doc_id = doc_id
+
+            async def set(self, data):
+                db.written[self._doc_id] = data
+
+        class _Col:
+            def document(self, doc_id):
+                return _Doc(doc_id)
+        return _Col()
+
+
+@pytest.fixture
+def signed_mode(monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_MODE", "signed")
+    monkeypatch.setattr(settings, "SESSION_SIGNING_SECRET", "test-secret")
+    session_tokens.revocations.clear()
+    app.dependency_overrides[get_db] = lambda: ExplodingDb()
+    yield
+    app.dependency_overrides.clear()
+    session_tokens.revocations.clear()
+
+
+def _token(sid="sid_1", expires_in=timedelta(days=1)):
+    return session_tokens.issue_token(
+        sid, "user_1", "user1@example.com", datetime.now(timezone.utc) + expires_in
+    )
+
+
+def test_roundtrip(signed_mode):
+    payload = session_tokens.verify_token(_token())
+    assert payload["uid"] == "user_1"
+    assert payload["sid"] == "sid_1"
+
+
+def test_tampered_token_rejected(signed_mode):
+    token = _token()
+    payload_b64, sig = token.split(".")
+    forged = session_tokens._b64encode(b'{"sid":"x","uid":"admin","email":"a@b.c","exp":9999999999}')
+    assert session_tokens.verify_token(f"{forged}.{sig}") is None
+    assert session_tokens.verify_token(f"{payload_b64}.{sig[:-2]}AA") is None
+
+
+def test_wrong_secret_rejected(signed_mode, monkeypatch):
+    token = _token()
+    monkeypatch.setattr(settings, "SESSION_SIGNING_SECRET", "other-secret")
+    assert session_tokens.verify_token(token) is None
+
+
+def test_expired_token_rejected(signed_mode):
+    assert session_tokens.verify_token(_token(expires_in=timedelta(seconds=-1))) is None
+
+
+def test_non_ascii_token_rejected(signed_mode):
+    for token in ("\xe9.abc", "abc.d\xe9f"):
+        assert session_tokens.verify_token(token) is None
+        res = client.get("/auth/session", headers={"Cookie": f"ironmind_session={token}".encode("latin-1")})
+        assert res.status_code == 401
+
+
+def test_dev_secret_without_configured_secret(signed_mode, monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_SIGNING_SECRET", "")
+    assert session_tokens.verify_token(_token())["uid"] == "user_1"
+
+    monkeypatch.setattr(settings, "ENV", "prod")
+    with pytest.raises(RuntimeError):
+        _token()
+
+
+def test_session_endpoint_validates_without_firestore(signed_mode):
+    res = client.get("/auth/session", cookies={"ironmind_session": _token()})
+    assert res.status_code == 200
+    assert res.json()["uid"] == "user_1"
+
+
+def test_logout_revokes_token(signed_mode, monkeypatch):
+    fake_db = FakeRevocationsDb()
+    monkeypatch.setattr(session_tokens, "get_async_db", lambda: fake_db)
+    token = _token(sid="sid_logout")
+
+    res = client.post("/auth/logout", cookies={"ironmind_session": token})
+    assert res.status_code == 204
+    assert fake_db.written["sid_logout"]["uid"] == "user_1"
+
+    res = client.get("/auth/session", cookies={"ironmind_session": token})
+    assert res.status_code == 401
+
+
+def test_refresh_keeps_revocations_added_during_load():
+    revs = session_tokens.RevocationSet()
+    revs.add("old", now=100)
+    revs.add("during_load", now=205)
+
+    # Load started at t=200 and only saw "remote"
+    revs.replace({"remote"}, started_at=200)
+
+    assert "remote" in revs
+    assert "during_load" in revs
+    assert "old" not in revs
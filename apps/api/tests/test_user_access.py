@@ -0,0 +1,162 @@
+"""
+Unit tests for the materialized user_access document and the access
+decisions derived from it. No real Firestore.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.repos import user_access
+from app.services import access_service
+
+
+def _ent(kind, status="active", course_id=None, expires_at=None):
+    ent = {"uid": "u1", "kind": kind, "status": status}
+    if course_id:
+        ent["courseId"] = course_id
+    if expires_at:
+        ent["expiresAt"] = expires_at
+    return ent
+
+
+def test_apply_course_grant_and_revoke():
+    access = user_access.empty_access("u1")
+    user_access.apply_entitlement(access, _ent("course", course_id="c1"))
+    user_access.apply_entitlement(access, _ent("course", course_id="c2"))
+    assert set(access["courses"]) == {"c1", "c2"}
+
+    user_access.apply_entitlement(access, _ent("course", status="inactive", course_id="c1"))
+    assert set(access["courses"]) == {"c2"}
+
+
+def test_apply_membership():
+    expires = datetime.now(timezone.utc) + timedelta(days=3)
+    access = user_access.empty_access("u1")
+    user_access.apply_entitlement(access, _ent("membership", expires_at=expires))
+    assert access["membershipStatus"] == "active"
+    assert access["membershipExpiresAt"] == expires
+
+    user_access.apply_entitlement(access, _ent("membership", status="inactive"))
+    assert access["membershipStatus"] == "inactive"
+
+
+def test_access_decisions_from_single_doc(monkeypatch):
+    past = datetime.now(timezone.utc) - timedelta(days=1)
+    access = user_access.empty_access("u1")
+    user_access.apply_entitlement(access, _ent("course", course_id="c1"))
+    user_access.apply_entitlement(access, _ent("course", course_id="c_expired", expires_at=past))
+
+    reads = []
+
+    async def fake_get(uid):
+        reads.append(uid)
+        return access
+
+    monkeypatch.setattr(user_access, "get_user_access", fake_get)
+
+    assert asyncio.run(access_service.can_access_course("u1", "c1")) is True
+    assert asyncio.run(access_service.can_access_course("u1", "c_expired")) is False
+    assert asyncio.run(access_service.can_access_course("u1", "c_other")) is False
+
+    summary = asyncio.run(access_service.get_access_summary("u1"))
+    assert summary["membershipActive"] is False
+    assert summary["entitledCourseIds"] == ["c1"]
+    assert reads == ["u1"] * 4
+
+
+def test_active_membership_grants_every_course(monkeypatch):
+    access = user_access.empty_access("u1")
+    user_access.apply_entitlement(access, _ent("membership"))
+
+    async def fake_get(uid):
+        return access
+
+    monkeypatch.setattr(user_access, "get_user_access", fake_get)
+    assert asyncio.run(access_service.can_access_course("u1", "any_course")) is True
+
+
+def test_missing_access_doc_is_rebuilt(monkeypatch):
+    rebuilt = []
+
+    async def fake_get(uid):
+        return None
+
+    async def fake_rebuild(uid):
+        rebuilt.append(uid)
+        access = user_access.empty_access(uid)
+        return user_access.apply_entitlement(access, _ent("course", course_id="c1"))
+
+    monkeypatch.setattr(user_access, "get_user_access", fake_get)
+    monkeypatch.setattr(user_access, "rebuild_user_access", fake_rebuild)
+
+    assert asyncio.run(access_service.can_access_course("u1", "c1")) is True
+    assert rebuilt == ["u1"]
+
+
+class _Snap:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class _Query:
+    def __init__(self, db, name, uids):
+        self._db, self._name, self._uids = db, name, uids
+
+    async def stream(self):
+        self._db.in_queries.append(list(self._uids))
+        for data in self._db.docs[self._name].values():
+            if data["uid"] in self._uids:
+                yield _Snap(None, data)
+
+
+class _Collection:
+    def __init__(self, db, name):
+        self._db, self._name = db, name
+
+    def document(self, doc_id):
+        return (self._name, doc_id)
+
+    def where(self, field, op, value):
+        assert (field, op) == ("uid", "in") and len(value) <= 30
+        return _Query(self._db, self._name, value)
+
+
+class _BatchDb:
+    def __init__(self, docs):
+        self.docs = docs
+        self.get_all_calls = 0
+        self.in_queries = []
+
+    def collection(self, name):
+        return _Collection(self, name)
+
+    async def get_all(self, refs):
+        self.get_all_calls += 1
+        for name, doc_id in refs:
+            yield _Snap(doc_id, self.docs[name].get(doc_id))
+
+
+def test_access_summaries_for_a_page_are_batched(monkeypatch):
+    materialized = user_access.empty_access("u0")
+    user_access.apply_entitlement(materialized, _ent("membership"))
+    entitlements = {
+        f"e{i}": {"uid": f"u{i}", "kind": "course", "status": "active", "courseId": "c1"}
+        for i in range(1, 65)
+    }
+    db = _BatchDb({"user_access": {"u0": materialized}, "entitlements": entitlements})
+    monkeypatch.setattr(user_access, "get_async_db", lambda: db)
+
+    uids = [f"u{i}" for i in range(0, 65)] + ["nobody"]
+    summaries = asyncio.run(access_service.get_access_summaries(uids))
+
+    assert list(summaries) == uids
+    assert summaries["u0"]["membershipActive"] is True
+    assert summaries["u7"]["entitledCourseIds"] == ["c1"]
+    assert summaries["nobody"] == {"membershipActive": False, "membershipExpiresAt": None, "entitledCourseIds": []}
+    # One get_all for the access docs, 65 missing users -> 3 chunked "in" queries
+    assert db.get_all_calls == 1
+    assert [len(q) for q in db.in_queries] == [30, 30, 5]
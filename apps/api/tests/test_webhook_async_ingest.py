@@ -0,0 +1,183 @@
+"""
+Test: async webhook ingestion (WEBHOOK_PROCESSING_MODE=async).
+
+Verifies:
+- The endpoint verifies, stores the raw event and acks without processing it
+- The worker processes queued entries and drops the raw body afterwards
+- Failed attempts are retried and eventually dead-lettered
+- Dead-lettered entries can be re-queued by an admin
+"""
+
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.deps import get_db
+from app.main import app
+from app.payments import repo_memory
+from app.payments import service as payments_service
+from app.payments.models import PaymentIntent
+from app.payments.worker import WebhookWorker
+
+client = TestClient(app)
+
+USER_HEADERS = {"X-Debug-Uid": "test-user-async-webhook", "X-Debug-Admin": "0"}
+ADMIN_HEADERS = {"X-Debug-Uid": "test-admin", "X-Debug-Admin": "1"}
+
+
+@pytest.fixture(autouse=True)
+def async_mode(monkeypatch):
+    monkeypatch.setattr(settings, "WEBHOOK_PROCESSING_MODE", "async")
+    app.dependency_overrides[get_db] = lambda: None
+    repo_memory.reset()
+    yield
+    repo_memory.reset()
+    app.dependency_overrides.pop(get_db, None)
+
+
+def _create_intent() -> str:
+    now = datetime.now(timezone.utc)
+    asyncio.run(repo_memory.MemoryIntentsRepo.create_intent(PaymentIntent(
+        id="pi_async", uid="test-user-async-webhook", kind="one_time", scope="course",
+        courseId="alpha-protocol", status="pending", provider="stub",
+        providerRef="stub:pi_async", createdAt=now, updatedAt=now,
+    )))
+    return "stub:pi_async"
+
+
+# payment.failed only touches the intent, so processing stays within the memory repos
+def _post(event_id: str, provider_ref: str, event_type: str = "payment.failed"):
+    body = {"event_id": event_id, "event_type": event_type, "provider_ref": provider_ref}
+    return client.post(
+        "/webhooks/payments",
+        content=json.dumps(body),
+        headers={"Content-Type": "application/json", "Cookie": "session=abc"},
+    )
+
+
+def _intent_status() -> str:
+    return list(repo_memory._intents.values())[0]["status"]
+
+
+def test_ingest_acks_and_defers_processing():
+    ref = _create_intent()
+    r = _post("evt_async_1", ref)
+    assert r.status_code == 200
+    assert r.json() == {"ok": True, "duplicate": False, "queued": True}
+
+    entry = repo_memory._inbox["stub:evt_async_1"]
+    assert entry["status"] == "queued"
+    assert json.loads(entry["rawBody"])["event_id"] == "evt_async_1"
+    assert "cookie" not in entry["headers"]
+    # Nothing processed yet
+    assert _intent_status() == "pending"
+    assert repo_memory._events == {}
+
+    worker = WebhookWorker(concurrency=1, max_attempts=3, retry_base_seconds=0)
+    assert asyncio.run(worker.process("stub:evt_async_1")) == "processed"
+    assert _intent_status() == "failed"
+    entry = repo_memory._inbox["stub:evt_async_1"]
+    assert entry["status"] == "processed"
+    assert entry["rawBody"] is None
+    # Already processed: not claimable again
+    assert asyncio.run(worker.process("stub:evt_async_1")) is None
+
+
+def test_duplicate_delivery_and_bad_payload():
+    ref = _create_intent()
+    assert _post("evt_async_dup", ref).json()["queued"] is True
+    r = _post("evt_async_dup", ref)
+    assert r.json() == {"ok": True, "duplicate": True, "queued": False}
+    assert len(repo_memory._inbox) == 1
+
+    r = client.post("/webhooks/payments", content=b"not json", headers={"Content-Type": "application/json"})
+    assert r.status_code == 400
+    assert len(repo_memory._inbox) == 1
+
+
+def test_retry_reprocesses_after_failure(monkeypatch):
+    ref = _create_intent()
+    _post("evt_async_retry", ref)
+
+    original = repo_memory.MemoryTransitionsRepo.apply_event
+    calls = {"n": 0}
+
+    async def flaky(*args):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise RuntimeError("firestore unavailable")
+        return await original(*args)
+
+    monkeypatch.setattr(repo_memory.MemoryTransitionsRepo, "apply_event", staticmethod(flaky))
+    worker = WebhookWorker(concurrency=1, max_attempts=3, retry_base_seconds=0)
+
+    assert asyncio.run(worker.process("stub:evt_async_retry")) == "queued"
+    entry = repo_memory._inbox["stub:evt_async_retry"]
+    assert entry["attempts"] == 1
+    assert entry["lastError"] == "firestore unavailable"
+    # Nothing was recorded, so the retry is not skipped as a duplicate
+    assert "stub:evt_async_retry" not in repo_memory._events
+
+    assert asyncio.run(worker.process("stub:evt_async_retry")) == "processed"
+    assert _intent_status() == "failed"
+    assert worker.retried == 1 and worker.processed == 1
+
+
+def test_dead_letter_and_admin_retry(monkeypatch):
+    ref = _create_intent()
+    _post("evt_async_dead", ref)
+
+    async def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(payments_service, "handle_webhook", broken)
+    worker = WebhookWorker(concurrency=1, max_attempts=2, retry_base_seconds=0)
+    assert asyncio.run(worker.process("stub:evt_async_dead")) == "queued"
+    assert asyncio.run(worker.process("stub:evt_async_dead")) == "dead_letter"
+    assert worker.dead_lettered == 1
+
+    r = client.get("/admin/payments/webhook-inbox", headers=ADMIN_HEADERS)
+    assert r.status_code == 200
+    listed = r.json()
+    assert [e["id"] for e in listed] == ["stub:evt_async_dead"]
+    assert "rawBody" not in listed[0]
+
+    assert client.post("/admin/payments/webhook-inbox/stub:evt_async_dead/retry", headers=USER_HEADERS).status_code == 403
+    r = client.post("/admin/payments/webhook-inbox/stub:evt_async_dead/retry", headers=ADMIN_HEADERS)
+    assert r.status_code == 200
+    entry = repo_memory._inbox["stub:evt_async_dead"]
+    assert entry["status"] == "queued" and entry["attempts"] == 0
+
+    monkeypatch.undo()
+    monkeypatch.setattr(settings, "WEBHOOK_PROCESSING_MODE", "async")
+    assert asyncio.run(worker.process("stub:evt_async_dead")) == "processed"
+    assert _intent_status() == "failed"
+
+
+def test_running_worker_drains_queue():
+    ref = _create_intent()
+
+    async def scenario():
+        from app.payments import worker as worker_module
+        worker = WebhookWorker(concurrency=2, max_attempts=3, retry_base_seconds=0)
+        original = worker_module.webhook_worker
+        worker_module.webhook_worker = worker
+        try:
+            worker.start()
+            body = json.dumps({"event_id": "evt_async_live", "event_type": "payment.failed", "provider_ref": ref})
+            result = await payments_service.ingest_webhook(body.encode(), {"content-type": "application/json"})
+            assert result["queued"] is True
+            await worker._queue.join()
+            stats = worker.stats()
+            await worker.stop()
+        finally:
+            worker_module.webhook_worker = original
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["processed"] == 1
+    assert _intent_status() == "failed"
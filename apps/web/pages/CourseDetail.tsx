@@ -1,8 +1,8 @@
 
 import React, { useEffect, useState } from 'react';
 import { useParams, Link } from 'react-router-dom';
-import { apiFetch, fetchCourse, fetchCourseLessons, fetchCoursePlans, checkCourseAccess, fetchPlanDownload } from '../lib/api';
-import { CoursePublic, LessonPublic, PlanPublic } from '../types';
+import { apiFetch, checkCourseAccess, fetchPlanDownload } from '../lib/api';
+import { CoursePublic, LessonPublic, PlanPublic, CourseBundle } from '../types';
 import { Loading, ErrorState } from '../components/Layout';
 import { toast } from '../components/toast';
 import { useNavigate } from 'react-router-dom';
@@ -27,26 +27,19 @@ const CourseDetail: React.FC = () => {
       setContentLoading(true);
       setAccessLoading(true);
 
-      // 1. Fetch public course details
-      const courseReq = await fetchCourse(id);
-      if (courseReq.status === 200 && courseReq.data) {
-        setCourse(courseReq.data);
+      // Course, lessons, plans and (when signed in) access in one request
+      const bundleReq = await apiFetch<CourseBundle>(`/courses/${id}/bundle`, { skipRedirect: true });
+      if (bundleReq.status === 200 && bundleReq.data) {
+        setCourse(bundleReq.data.course);
+        setLessons(bundleReq.data.lessons);
+        setPlans(bundleReq.data.plans);
+        setHasAccess(Boolean(bundleReq.data.hasAccess));
       } else {
-        setError({ status: courseReq.status, data: courseReq.error });
-        setLoading(false);
-        return;
+        setError({ status: bundleReq.status, data: bundleReq.error });
       }
-      setLoading(false); // Render structural page immediately
-
-      // 2. Fetch public content in parallel
-      Promise.all([fetchCourseLessons(id), fetchCoursePlans(id)]).then(([lessonsReq, plansReq]) => {
-        if (lessonsReq.status === 200 && lessonsReq.data) setLessons(lessonsReq.data);
-        if (plansReq.status === 200 && plansReq.data) setPlans(plansReq.data);
-        setContentLoading(false);
-      });
-
-      // 3. Check access
-      checkAccessStatus(id);
+      setLoading(false);
+      setContentLoading(false);
+      setAccessLoading(false);
     };
 
     loadData();
@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
 import { apiFetch } from '../lib/api';
-import { CoursePublic, AccessMeResponse } from '../types';
+import { CoursePublic, AccessMeResponse, AccessBatchResponse } from '../types';
 import { ErrorState } from '../components/Layout';
 import { routes } from '../lib/routes';
 
@@ -45,15 +45,15 @@ const Library: React.FC = () => {
                 }
             }
 
-            // 3) Fallback: N+1 access checks (only if /access/me failed)
-            const checks = await Promise.all(
-                allCourses.map(async (c) => {
-                    const checkRes = await apiFetch<{ allowed: boolean }>(`/access/courses/${c.id}`, { skipRedirect: true });
-                    return { course: c, allowed: Boolean(checkRes.data?.allowed) };
-                })
-            );
+            // 3) Fallback: one batched access check (only if /access/me failed)
+            const batchRes = await apiFetch<AccessBatchResponse>('/access/courses:batch', {
+                method: 'POST',
+                body: JSON.stringify({ courseIds: allCourses.map(c => c.id) }),
+                skipRedirect: true,
+            });
+            const allowed = batchRes.data?.allowed ?? {};
 
-            setCourses(checks.filter(x => x.allowed).map(x => x.course));
+            setCourses(allCourses.filter(c => allowed[c.id]));
             setLoading(false);
         };
 
@@ -15,6 +15,11 @@ export interface AccessMeResponse {
   entitledCourseIds: string[];
 }
 
+export interface AccessBatchResponse {
+  allowed: Record<string, boolean>;
+  notFound: string[];
+}
+
 export interface CoursePublic {
   id: string;
   titleHe: string;
@@ -61,6 +66,13 @@ export interface PlanPublic {
   published: boolean;
 }
 
+export interface CourseBundle {
+  course: CoursePublic;
+  lessons: LessonPublic[];
+  plans: PlanPublic[];
+  hasAccess: boolean | null;
+}
+
 export interface SearchResult {
   courses: CoursePublic[];
   lessons: LessonPublic[];
@@ -78,6 +90,7 @@ export interface MetricsOverview {
   purchases_total: number;
   subscriptions_total: number;
   entitlements_total: number;
+  generatedAt?: string | null;
 }
 
 export interface AccessCheckResponse {